@@ -1,511 +1,701 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
 import io
 import base64
+import importlib
 import re
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import matplotlib
-matplotlib.use('Agg')
+from importlib.machinery import ModuleSpec
+from comment_themes import cached_comment_themes
+from course_analytics import course_summary, histogram_shares, rating_scale
+from course_codes import CourseCodeResolver, load_learned_mappings, mapping_from_frame, save_learned_mappings
+from dataset_cache import content_hash, dataset_hash
+from dataset_registry import get_dataset_registry
+from feedback_pipeline import DEFAULT_QUALITY_RULES, FACULTY_COLUMN_PATTERNS, identify_course_columns, process_feedback_files, process_raw_feedback
+from job_runner import QUEUED, DONE, FAILED, CANCELLED, get_job_registry
+from profiling import PROFILE_BY_DEFAULT, RunProfiler, profile_stage, profiled
+from pivot_export import PIVOT_FORMATS, build_pivot_tables, export_pivots
+from program_info import extract_info_from_filename
+from report_content import ReportContext, department_report_pages, generate_faculty_report, report_file_details, report_overall_scores
+from processed_input import PROCESSED_FILE_TYPES, SCHEMA_DESCRIPTIONS, load_processed_ratings, read_processed_file
+from rating_stats import SCORE_METHODS, build_rating_cube, rollup_rating_cube, pivot_rating_cube, score_rating_cube, select_extremes
+from report_archive import ArchiveWriter
+from response_timeline import SETTLE_TOLERANCE, TIMELINE_FREQUENCIES, rating_drift, submission_timeline, timeline_chart_data
 
-# Function to convert Matplotlib figure to ReportLab Image
-def fig_to_image(fig):
-    """Convert a Matplotlib figure to a ReportLab Image"""
-    canvas = FigureCanvasAgg(fig)
-    buf = io.BytesIO()
-    canvas.print_png(buf)
-    buf.seek(0)
-    return Image(buf, width=7*inch, height=4*inch)
+# Fresh ingest worker processes re-run the main script on start-up unless its spec is named
+# '__main__'; naming this script's own module so keeps the app from running inside them
+__spec__ = ModuleSpec("__main__", None)
 
-# Function to extract semester and program from filename
-def extract_info_from_filename(filename):
-    """Extract semester and program information from feedback filename"""
-    info = {
-        'semester': None,
-        'program': None
+# Function to load the chart and PDF renderers on first use
+def renderers():
+    """Return the report_rendering module; Matplotlib and ReportLab load with it on the first render, not at startup"""
+    return importlib.import_module("report_rendering")
+
+# Cached low-resolution preview so reruns for the same selection skip rendering
+@st.cache_data(show_spinner=False, max_entries=64)
+def render_ratings_preview(avg_ratings, title, viz_type, _profiler=None):
+    """Render a low-resolution preview image of the selected visualization (profiled on cache misses)"""
+    rendering = renderers()
+    return profiled(_profiler, "Ratings preview", rendering.render_ratings_image, avg_ratings, title, viz_type, dpi=rendering.PREVIEW_DPI)
+
+# Cached low-resolution preview of a course chart
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_course_chart_preview(rows, label_column, title, scale, _profiler=None):
+    """Render a low-resolution preview of a course feedback chart (profiled on cache misses)"""
+    rendering = renderers()
+    with profile_stage(_profiler, "Course chart preview"):
+        return rendering.render_figure_png(rendering.generate_course_chart(rows, label_column, title, scale), rendering.PREVIEW_DPI)
+
+# Function to write a table as an Excel workbook
+def excel_bytes(df):
+    """Return the table as XLSX bytes; download buttons call this on click, so reruns skip writing it"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False)
+    return buffer.getvalue()
+
+# Function to render a course chart at export resolution
+def render_course_chart_image(rows, label_column, title, scale):
+    """Render a course feedback chart to PNG bytes for download"""
+    rendering = renderers()
+    return rendering.render_figure_png(rendering.generate_course_chart(rows, label_column, title, scale))
+
+# Cached low-resolution heatmap preview
+@st.cache_data(show_spinner=False, max_entries=16)
+def render_heatmap_preview(pivot, title, _profiler=None):
+    """Render a low-resolution preview image of a ratings heatmap (profiled on cache misses)"""
+    rendering = renderers()
+    with profile_stage(_profiler, "Heatmap preview"):
+        return rendering.render_figure_png(rendering.generate_heatmap(pivot, title), rendering.PREVIEW_DPI)
+
+# Function to render a ratings heatmap at export resolution
+def render_heatmap_image(pivot, title):
+    """Render a ratings heatmap to PNG bytes for download"""
+    rendering = renderers()
+    return rendering.render_figure_png(rendering.generate_heatmap(pivot, title))
+
+# Function to display the department-wide overview
+def show_department_overview(rating_cube):
+    """Show faculty × category and section × faculty matrices built from the rating cube"""
+    views = {"Faculty × Rating Category": ("Faculty Name", "Rating Category")}
+    if "Section" in rating_cube.columns:
+        views["Section × Faculty"] = ("Section", "Faculty Name")
+    
+    with st.expander("Department Overview"):
+        view = st.radio("Overview Matrix:", list(views), horizontal=True, key="overview_view")
+        index, columns = views[view]
+        
+        # One pivot of the aggregated cube covers every faculty at once
+        pivot = pivot_rating_cube(rating_cube, index, columns)
+        overall = rollup_rating_cube(rating_cube, [index]).set_index(index)["Rating"]
+        matrix = pivot.assign(Overall=overall.reindex(pivot.index))
+        
+        st.dataframe(
+            matrix.style.background_gradient(cmap="RdYlGn", vmin=1, vmax=5).format("{:.2f}", na_rep="")
+        )
+        
+        profiler = st.session_state.run_profiler
+        st.image(render_heatmap_preview(pivot, view, _profiler=profiler))
+        st.download_button(
+            label="Download Heatmap",
+            data=lambda: profiled(profiler, "Heatmap image", render_heatmap_image, pivot, view),
+            file_name=f"{index}_{columns}_heatmap.png".replace(" ", "_").lower(),
+            mime="image/png"
+        )
+        
+        # The cube can be loaded back in the processed-data mode without regrouping
+        st.download_button(
+            label="Download Rating Cube (Parquet)",
+            data=lambda: rating_cube.to_parquet(index=False),
+            file_name="rating_cube.parquet",
+            mime="application/octet-stream"
+        )
+
+# Cached pivots, so reruns on the same dataset skip rebuilding them
+@st.cache_data(show_spinner=False, max_entries=16)
+def session_pivot_tables(dataset_key, responses_known, _rating_cube, _course_cube=None):
+    """Build the standard pivots of a registered dataset (the key identifies the cubes)"""
+    return build_pivot_tables(_rating_cube, _course_cube, responses_known=responses_known)
+
+# Function to offer the standard pivots as one download
+def show_pivot_export(rating_cube, course_cube=None):
+    """Offer the faculty, section, course and response-count pivots as one workbook, or as CSV or Parquet files"""
+    with st.expander("Pivot Tables"):
+        st.write("The standard cross-tabs computed from the aggregated ratings, instead of pivoting the row-level downloads by hand.")
+        # Built once per dataset; the file itself is only written when it is downloaded
+        pivots = session_pivot_tables(st.session_state.dataset.key, session_responses_known(), rating_cube, course_cube)
+        labels = {"xlsx": "Excel workbook", "csv": "CSV files (ZIP)", "parquet": "Parquet files (ZIP)"}
+        file_format = st.radio("Pivot Format", list(PIVOT_FORMATS), format_func=labels.get, horizontal=True, key="pivot_format")
+        extension, mime = PIVOT_FORMATS[file_format]
+        st.caption(" · ".join(f"{name}: {len(pivot)} rows" for name, pivot in pivots.items()))
+        
+        profiler = st.session_state.run_profiler
+        st.download_button(
+            label="Download Pivot Tables",
+            data=lambda: profiled(profiler, "Pivot export", export_pivots, pivots, file_format)[0],
+            file_name=f"feedback_pivots.{extension}",
+            mime=mime
+        )
+
+# Function to display top/bottom-N faculty leaderboards
+def show_leaderboard(rating_cube):
+    """Show the lowest or highest rated faculty with response counts and percentiles"""
+    with st.expander("Faculty Leaderboard"):
+        categories = sorted(rating_cube["Rating Category"].dropna().unique())
+        has_sections = "Section" in rating_cube.columns
+        # Without response counts there is nothing to threshold, weight or shrink by
+        responses_known = session_responses_known()
+        if not responses_known:
+            st.caption("The file has no response counts, so every faculty is listed and ranked by the mean of their category averages.")
+        
+        lb_col1, lb_col2 = st.columns(2)
+        with lb_col1:
+            category = st.selectbox("Rating Category", ["All Categories"] + categories, key="leaderboard_category")
+            order = st.radio("Show", ["Lowest", "Highest"], horizontal=True, key="leaderboard_order")
+            rank_by = st.radio(
+                "Rank", ["Faculty", "Section-Faculty"] if has_sections else ["Faculty"],
+                horizontal=True, key="leaderboard_rank_by"
+            )
+        with lb_col2:
+            top_n = st.number_input("Number of Faculty", min_value=1, max_value=1000, value=10, key="leaderboard_n")
+            if responses_known:
+                min_responses = st.number_input("Minimum Responses", min_value=1, value=5, key="leaderboard_min_responses")
+                method = st.selectbox(
+                    "Score", list(SCORE_METHODS), index=list(SCORE_METHODS).index("weighted"),
+                    format_func=SCORE_METHODS.get, key="leaderboard_score_method"
+                )
+            else:
+                min_responses, method = 1, "mean"
+            percentile_scope = st.radio(
+                "Percentile Within", ["Department", "Section"] if rank_by == "Section-Faculty" else ["Department"],
+                horizontal=True, key="leaderboard_percentile"
+            )
+        
+        keys = ["Section", "Faculty Name"] if rank_by == "Section-Faculty" else ["Faculty Name"]
+        scores = score_rating_cube(
+            rating_cube,
+            keys=keys,
+            category=None if category == "All Categories" else category,
+            min_responses=min_responses,
+            percentile_within="Section" if percentile_scope == "Section" else None,
+            method=method,
+            shrink_toward="Section" if rank_by == "Section-Faculty" else None
+        )
+        leaderboard = select_extremes(scores, n=top_n, lowest=order == "Lowest")
+        if not responses_known:
+            leaderboard = leaderboard.drop(columns=["Responses"])
+        
+        if leaderboard.empty:
+            st.info("No faculty meet the minimum response count.")
+        else:
+            st.dataframe(leaderboard.style.format({"Rating": "{:.2f}", "Percentile": "{:.1f}"}))
+            st.download_button(
+                label="Download Leaderboard",
+                data=leaderboard.to_csv(index=False),
+                file_name=f"{order.lower()}_{len(leaderboard)}_faculty.csv",
+                mime="text/csv"
+            )
+
+# Department-wide builds run as background jobs: kind -> (job label, file name, MIME type)
+REPORT_BUILDS = {
+    "booklet": ("Department PDF", "department_feedback_reports.pdf", "application/pdf"),
+    "archive": ("Report Archive", "department_feedback_reports.zip", "application/zip")
+}
+
+# Function to display the combined department PDF and report archive downloads
+def show_department_booklet(rating_cube, comments_df=None):
+    """Build every faculty report into one bookmarked PDF, or a ZIP of every report, in the background"""
+    with st.expander("Department Booklet"):
+        st.write("One PDF with a contents page and a bookmarked report for every faculty.")
+        show_report_build("booklet", "Build Department PDF", rating_cube, comments_df)
+        
+        st.write("Or a ZIP with each faculty's PDF, text report and chart, plus a manifest of every file.")
+        show_report_build("archive", "Build Report Archive", rating_cube, comments_df)
+
+# Function to start, follow and download one department-wide build
+def show_report_build(kind, button_label, rating_cube, comments_df=None):
+    """Submit the build to the job registry, show its progress while it runs and offer the finished file"""
+    label, file_name, mime = REPORT_BUILDS[kind]
+    dataset = st.session_state.dataset
+    dataset_key = dataset.key if dataset is not None else None
+    
+    if kind in st.session_state.report_jobs:
+        show_report_job(kind)
+        return
+    
+    if st.button(button_label, key=f"build_{kind}"):
+        # The pages, context and profiler are taken now; the job does not touch session state
+        pages = list(department_report_pages(
+            rating_cube, comments_df, responses_known=session_responses_known(), dataset_key=dataset_key
+        ))
+        build = build_department_booklet if kind == "booklet" else build_report_archive
+        job = get_job_registry("reports").submit(label, build, pages, session_report_context(), profiler=st.session_state.run_profiler)
+        st.session_state.report_jobs[kind] = (job.id, dataset_key)
+        st.rerun()
+    
+    # Only the latest build of the dataset being shown is offered
+    result = st.session_state.report_results.get(kind)
+    if result is None or result[0] != dataset_key:
+        return
+    _, status, value = result
+    if status == DONE:
+        st.download_button(
+            label=f"Download {label}" + (f" ({value['files']} files)" if kind == "archive" else ""),
+            data=value["data"],
+            file_name=file_name,
+            mime=mime,
+            key=f"download_{kind}"
+        )
+    elif status == FAILED:
+        st.error(f"⚠️ {label} failed: {value}")
+    else:
+        st.warning(f"{label} was cancelled.")
+
+# Function to poll a department-wide build
+@st.fragment(run_every=1)
+def show_report_job(kind):
+    """Show stage progress of a build job, and keep its outcome for the session once it finishes"""
+    job_id, dataset_key = st.session_state.report_jobs[kind]
+    job = get_job_registry("reports").get(job_id)
+    if job is None or job.finished:
+        del st.session_state.report_jobs[kind]
+        job = get_job_registry("reports").take(job_id)
+        if job is not None:
+            value = job.result if job.status == DONE else job.error
+            st.session_state.report_results[kind] = (dataset_key, job.status, value)
+        st.rerun()
+    
+    show_job_progress(get_job_registry("reports"), job)
+    if st.button("Cancel", key=f"cancel_{kind}"):
+        job.cancel()
+
+# Function to show a background job's progress
+def show_job_progress(registry, job):
+    """Show the job's stage progress, or that it waits for a free worker while it is queued"""
+    if job.status == QUEUED:
+        ahead = registry.queued_ahead(job)
+        waiting = f", with {ahead} more waiting ahead of it" if ahead else ""
+        st.info(f"⏳ {job.label} is queued behind earlier jobs ({registry.max_workers} run at a time){waiting}; it starts when one finishes.")
+    else:
+        st.progress(job.progress, text=f"{job.label}: {job.stage}")
+
+# Function to report progress as report pages are consumed
+def _page_progress(pages, progress, share=1.0):
+    """Yield the pages, reporting 'Built n of N reports' after each one up to share of the job"""
+    for done, page in enumerate(pages, 1):
+        yield page
+        progress(f"Built {done} of {len(pages)} reports", share * done / len(pages))
+
+# Function to build the department booklet as a background job
+def build_department_booklet(pages, context, progress, profiler=None):
+    """
+    Render every faculty report into one bookmarked PDF.
+
+    Returns:
+    - Dict with 'data' (the PDF bytes)
+    """
+    def pages_then_layout():
+        yield from _page_progress(pages, progress, share=0.5)
+        # ReportLab then lays the whole story out twice to number the contents page
+        progress("Laying out pages", 0.5)
+    
+    with profile_stage(profiler, "Department PDF"):
+        booklet = renderers().generate_combined_pdf_report(pages_then_layout(), context, title="Faculty Feedback Reports")
+    return {"data": booklet.getvalue()}
+
+# Function to build the report archive as a background job
+def build_report_archive(pages, context, progress, profiler=None):
+    """
+    Write every faculty's PDF, text report and chart into a ZIP on disk, then read it back for the download.
+
+    Returns:
+    - Dict with 'data' (the ZIP bytes) and 'files' (members listed in the manifest)
+    """
+    # A cancelled or failed build removes its partial archive
+    with ArchiveWriter(prefix="department_reports_") as archive, profile_stage(profiler, "Report archive"):
+        write_report_archive(
+            archive, pages, context,
+            lambda done: progress(f"Built {done} of {len(pages)} reports", done / len(pages))
+        )
+    try:
+        with open(archive.path, "rb") as archive_file:
+            return {"data": archive_file.read(), "files": len(archive.manifest)}
+    finally:
+        archive.remove()
+
+# Function to write every faculty's artifacts into an archive
+def write_report_archive(archive, faculty_reports, context, progress=None):
+    """
+    Generate the PDF, text report and chart of each faculty and add them to the archive one at a time.
+
+    Parameters:
+    - archive: ArchiveWriter to add the files to
+    - faculty_reports: Iterable of (faculty_data, course_name, themes) tuples
+    - context: ReportContext for the report headers
+    - progress: Optional callback called with the number of faculty done so far
+    """
+    rendering = renderers()
+    report_theme = rendering.get_report_theme()
+    for done, (faculty_data, course_name, themes) in enumerate(faculty_reports, 1):
+        prefix, details = report_file_details(faculty_data, course_name)
+        artifacts = rendering.render_faculty_artifacts(faculty_data, course_name, context, themes, report_theme)
+        archive.add(f"{prefix}_ratings_report.pdf", artifacts["pdf"], kind="pdf", **details)
+        archive.add(f"{prefix}_ratings_report.txt", artifacts["text"], kind="text", **details)
+        archive.add(f"{prefix}_ratings_chart.png", artifacts["chart"], kind="chart", **details)
+        
+        if progress is not None:
+            progress(done)
+
+# Function to display the response quality rules
+def show_quality_rules():
+    """Let the user choose which low-quality submissions are excluded; returns the rules dict"""
+    with st.expander("Response Quality Rules"):
+        drop_duplicates = st.checkbox(
+            "Keep only the latest submission of each SRN",
+            value=DEFAULT_QUALITY_RULES["drop_duplicate_srn"], key="quality_drop_duplicates"
+        )
+        drop_straight_lined = st.checkbox(
+            "Exclude straight-lined submissions (the same answer to every question)",
+            value=DEFAULT_QUALITY_RULES["drop_straight_lined"], key="quality_drop_straight_lined"
+        )
+        max_variance = st.number_input(
+            "Answer variance treated as straight-lined (0 = identical answers only)",
+            min_value=0.0, max_value=4.0, step=0.05,
+            value=float(DEFAULT_QUALITY_RULES["max_variance"]), key="quality_max_variance"
+        )
+    return {
+        **DEFAULT_QUALITY_RULES,
+        "drop_duplicate_srn": drop_duplicates,
+        "drop_straight_lined": drop_straight_lined,
+        "max_variance": max_variance
     }
-    
-    # Look for pattern like 'Sem-3' in the filename
-    sem_match = re.search(r'Sem-(\d+)', filename)
-    if sem_match:
-        info['semester'] = sem_match.group(1)
-    
-    # Look for program code like 'BT-AIML' in the filename
-    prog_match = re.search(r'BT-([A-Z]+)', filename)
-    if prog_match:
-        info['program'] = prog_match.group(1)
-    
-    return info
 
-# Function to generate faculty report
-def generate_faculty_report(faculty_data):
-    """Generate a text report with rating categories and values"""
-    faculty_name = faculty_data["Faculty Name"].iloc[0]
-    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
-    
-    # Include section in the header if available
-    header = f"Faculty Rating Report for: {faculty_name}"
-    if section:
-        header = f"Faculty Rating Report for: Section {section} - {faculty_name}"
-    
-    report = header + "\n"
-    report += f"Generated on: {datetime.now().strftime('%Y-%m-%d')}\n"
-    report += "=" * 50 + "\n\n"
-    
-    # Add overall average
-    overall_avg = faculty_data["Rating"].mean()
-    report += f"OVERALL AVERAGE: {overall_avg:.2f} / 5.0\n\n"
-    report += "RATINGS BY CATEGORY:\n"
-    report += "-" * 50 + "\n\n"
-    
-    # Sort ratings from highest to lowest
-    sorted_data = faculty_data.sort_values(by="Rating", ascending=False)
-    
-    # Add each category and its rating
-    for _, row in sorted_data.iterrows():
-        category = row["Rating Category"].title()
-        rating = row["Rating"]
-        report += f"{category}: {rating:.2f}\n"
-    
-    return report
+# Function to display the submissions dropped by the quality rules
+def show_quality_report(quality_report):
+    """Show which submissions were excluded before aggregation and why"""
+    if quality_report is None or quality_report.empty:
+        st.info("No submissions were excluded by the response quality rules.")
+        return
+    
+    st.write(f"Excluded Submissions: {len(quality_report)} records")
+    st.dataframe(quality_report["Reason"].str.split(" (", regex=False).str[0].value_counts().rename("Submissions"))
+    st.dataframe(quality_report.style.format({"Variance": "{:.2f}"}))
+    st.download_button(
+        label="Download Quality Report",
+        data=quality_report.to_csv(index=False),
+        file_name="excluded_submissions.csv",
+        mime="text/csv"
+    )
 
-def generate_pdf_report(faculty_data, course_name):
-    """Generate a PDF report with ratings in table format"""
-    faculty_name = faculty_data["Faculty Name"].iloc[0]
-    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
-    
-    # Create buffer for PDF with reduced margins
-    pdf_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        pdf_buffer,
-        pagesize=letter,
-        rightMargin=36,  # 0.5 inch
-        leftMargin=36,   # 0.5 inch
-        topMargin=36,    # 0.5 inch
-        bottomMargin=36  # 0.5 inch
+# Function to display the response-arrival timeline
+def show_response_timeline(faculty_ratings_df, submissions):
+    """Show submissions over time and how average ratings drift as responses accumulate"""
+    with st.expander("Response Timeline"):
+        if submissions is None or submissions["Completed"].isna().all():
+            st.info("The uploaded file has no completion times.")
+            return
+        
+        tl_col1, tl_col2 = st.columns(2)
+        with tl_col1:
+            split = st.radio("Split By", ["None", "Section", "Course"], horizontal=True, key="timeline_split")
+        with tl_col2:
+            period = st.radio("Period", list(TIMELINE_FREQUENCIES), horizontal=True, key="timeline_period")
+        group_key = None if split == "None" else split
+        freq = TIMELINE_FREQUENCIES[period]
+        
+        if "Status" in submissions.columns and submissions["Status"].notna().any():
+            st.caption("Submission status: " + ", ".join(
+                f"{status} {count}" for status, count in submissions["Status"].value_counts().items()
+            ))
+        
+        timeline = submission_timeline(submissions, group_key, freq, ratings_df=faculty_ratings_df)
+        st.write("#### Submissions Received")
+        st.line_chart(timeline_chart_data(timeline, "Cumulative", group_key))
+        
+        drift, settled = rating_drift(faculty_ratings_df, submissions, group_key, freq)
+        st.write("#### Running Average Rating")
+        st.line_chart(timeline_chart_data(drift, "Running Average", group_key))
+        st.write(f"Settled On is the first {period.lower()} after which the running average stayed within ±{SETTLE_TOLERANCE} of the final average.")
+        st.dataframe(settled.style.format({"Final Average": "{:.2f}", "Settled On": lambda value: f"{value:%d-%m-%Y}" if pd.notna(value) else "-"}))
+        st.download_button(
+            label="Download Timeline",
+            data=drift.to_csv(index=False),
+            file_name=f"rating_timeline_{period.lower()}.csv",
+            mime="text/csv"
+        )
+
+# Function to display course-level feedback analytics
+def show_course_analytics(course_cube):
+    """Show per-course and per-question course feedback means, spread, answer shares, charts and PDFs"""
+    st.write("#### Course Feedback Summary")
+    scale = rating_scale(course_cube)
+    summary = course_summary(course_cube)
+    summary_view = pd.concat(
+        [summary[["Course", "Students", "Rating", "Std", "CI"]], histogram_shares(summary, scale)], axis=1
     )
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    try:
-        # Add logo (adjust path as needed)
-        logo = Image("REVA_logo.png", width=180, height=50)
-        logo.hAlign = 'RIGHT'  # Right align the logo
-        elements.append(logo)
-        elements.append(Spacer(1, 10))  # Add small space after logo
-    except:
-        # If logo file not found, continue without it
-        pass
-    
-    # Create custom styles for different alignments with reduced line spacing
-    center_style = ParagraphStyle(
-        'CenterHeader',
-        parent=styles['Heading1'],
-        fontSize=14,
-        alignment=1,  # Center alignment
-        spaceAfter=5
+    st.dataframe(summary_view.style.format(precision=2))
+    
+    profiler = st.session_state.run_profiler
+    preview_png = render_course_chart_preview(summary, "Course", "Average Course Feedback", scale, _profiler=profiler)
+    st.image(preview_png)
+    st.download_button(
+        label="Download Course Chart",
+        data=lambda: profiled(profiler, "Course chart image", render_course_chart_image, summary, "Course", "Average Course Feedback", scale),
+        file_name="course_feedback_chart.png",
+        mime="image/png"
     )
     
-    left_style = ParagraphStyle(
-        'LeftAligned',
-        parent=styles['Normal'],
-        fontSize=12,
-        alignment=0,  # Left alignment
-        spaceBefore=2,  # Reduced from 5
-        spaceAfter=2,   # Reduced from 5
-        leading=14      # Control line height
+    # Per-question breakdown of one course
+    course = st.selectbox("Select a Course", summary["Course"].tolist(), key="course_analytics_course")
+    question_rows = course_cube[course_cube["Course"] == course].sort_values("Rating", ascending=False)
+    question_view = pd.concat(
+        [question_rows[["Question", "Count", "Rating", "Std", "CI"]], histogram_shares(question_rows, scale)], axis=1
     )
-    
-    right_style = ParagraphStyle(
-        'RightAligned',
-        parent=styles['Normal'],
-        fontSize=12,
-        alignment=2,  # Right alignment
-        spaceBefore=2,  # Reduced from 5
-        spaceAfter=2,   # Reduced from 5
-        leading=14      # Control line height
+    st.dataframe(question_view.style.format(precision=2), hide_index=True)
+    st.image(render_course_chart_preview(question_rows, "Question", course.replace("Feedback on ", "").strip(), scale, _profiler=profiler))
+    
+    # PDFs are only rendered when downloaded; the context carries the session's header details
+    context = session_report_context()
+    pdf_col1, pdf_col2 = st.columns(2)
+    with pdf_col1:
+        st.download_button(
+            label="Download Course PDF",
+            data=lambda: profiled(profiler, "Course PDF", renderers().generate_course_pdf_report, course_cube, [course], context).getvalue(),
+            file_name=f"{course.replace('Feedback on ', '').strip()}_course_feedback.pdf",
+            mime="application/pdf"
+        )
+    with pdf_col2:
+        st.download_button(
+            label="Download All Courses PDF",
+            data=lambda: profiled(profiler, "All courses PDF", renderers().generate_course_pdf_report, course_cube, summary["Course"].tolist(), context).getvalue(),
+            file_name="course_feedback_reports.pdf",
+            mime="application/pdf"
+        )
+
+# Function to display the comment search box
+def show_comment_search(comment_index):
+    """Show keyword/phrase search over student comments with faculty and course facets"""
+    st.write("#### Search Comments")
+    query = st.text_input(
+        "Keywords, \"exact phrases\" or prefix* terms",
+        key="comment_query",
+        placeholder='e.g. pace, "good examples", explain*'
     )
     
-    # Clean course name for display
-    clean_course_name = course_name.replace("Feedback on ", "").strip()
-    
-    # CENTER ALIGNED HEADERS
-    # Add centered headers
-    elements.append(Paragraph("School of Computing and Information Technology", center_style))
-    elements.append(Paragraph(f"Academic Year {st.session_state.start_year}-{st.session_state.end_year}", center_style))
-    elements.append(Paragraph(f"Feedback on {clean_course_name}", center_style))
-    
-    # Add program name if available - MODIFY THIS SECTION
-    if st.session_state.program:
-        full_program = get_full_program_name(st.session_state.program)
-        elements.append(Paragraph(f"{full_program}", center_style))
-    
-    elements.append(Spacer(1, 10))
-    
-    # Create a table for the 3-column layout with tighter spacing
-    data = []
-    
-    # Row 1: Faculty name | Empty | Semester
-    row1 = [
-        Paragraph(f"Name of the Faculty: {faculty_name}", left_style),
-        "",
-        Paragraph(f"Semester: {st.session_state.semester}" if st.session_state.semester else "", right_style)
-    ]
-    data.append(row1)
-    
-    # Row 2: Course name | Empty | Section
-    row2 = [
-        Paragraph(f"Course name: {clean_course_name}", left_style),
-        "",
-        Paragraph(f"Section: {section}" if section else "", right_style)
-    ]
-    data.append(row2)
-    
-    # Row 3: Course code | Empty | Empty
-    course_code = st.session_state.course_code_mapping.get(clean_course_name, "")
-    if course_code:
-        row3 = [
-            Paragraph(f"Course Code: {course_code}", left_style),
-            "",
-            ""
-        ]
-        data.append(row3)
-    
-    # Create the table with further adjusted column widths - minimize center gap
-    header_table = Table(data, colWidths=[4.0*inch, 0.1*inch, 2.4*inch], rowHeights=[18]*len(data))
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  # Changed from TOP to MIDDLE
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 1),     # Reduced from 0
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),  # Reduced from 0
-    ]))
-    elements.append(header_table)
-    
-    elements.append(Spacer(1, 20))
-    
-    # Calculate overall average
-    overall_avg = faculty_data["Rating"].mean().round(2)
-    elements.append(Paragraph(f"Overall Average: {overall_avg:.2f} / 5.0", styles['Heading3']))
-    elements.append(Spacer(1, 20))
-    
-    # Prepare table data
-    sorted_data = faculty_data.sort_values(by="Rating", ascending=False)
-    table_data = [["Rating Category", "Score"]]  # Header row
-    
-    for _, row in sorted_data.iterrows():
-        # Split long category names into multiple lines if longer than 40 chars
-        category = row["Rating Category"].title()
-        if len(category) > 70:
-            # Split at space nearest to middle
-            mid = category[:70].rfind(' ')
-            if mid == -1:  # No space found, force split
-                mid = 70
-            category = category[:mid] + '\n' + category[mid:].strip()
-            
-        table_data.append([
-            category,
-            f"{row['Rating']:.2f}"
-        ])
-    
-    # Create table with increased width and automatic word wrapping
-    table = Table(table_data, colWidths=[5*inch, 1*inch])
-    
-    # Style the table with word wrap and vertical alignment
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  
-        ('ALIGN', (0, 1), (0, -1), 'LEFT'),    
-        ('ALIGN', (1, 1), (1, -1), 'CENTER'),  
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 2, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  
-        ('LEFTPADDING', (0, 0), (-1, -1), 6),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('WORDWRAP', (0, 0), (-1, -1), True),  
-    ])
-    
-    table.setStyle(style)
-    elements.append(table)
-    elements.append(Spacer(1, 30))
+    # Optional facet filters
+    facet_filters = {}
+    filter_cols = st.columns(len(comment_index.facets) or 1)
+    for filter_col, (column, (_, labels)) in zip(filter_cols, comment_index.facets.items()):
+        with filter_col:
+            choice = st.selectbox(column, ["All"] + sorted(labels), key=f"comment_filter_{column}")
+            if choice != "All":
+                facet_filters[column] = choice
+    
+    rows = comment_index.search(query, facet_filters)
+    st.write(f"{len(rows)} of {len(comment_index)} comments match")
+    
+    # Facet counts for the current matches
+    count_cols = st.columns(len(comment_index.facets) or 1)
+    for count_col, column in zip(count_cols, comment_index.facets):
+        with count_col:
+            st.dataframe(comment_index.facet_counts(rows, column))
+    
+    matches = comment_index.results(rows)
+    st.dataframe(matches.head(200))
+    if len(rows):
+        st.download_button(
+            label="Download Matching Comments",
+            data=matches.to_csv(index=False),
+            file_name="matching_comments.csv",
+            mime="text/csv"
+        )
 
-    # Create and add bar chart with increased height
-    fig, ax = plt.subplots(figsize=(10, 8))  # Increased height from 6 to 8
-    bars = ax.bar(faculty_data["Rating Category"], faculty_data["Rating"], color="skyblue", width=0.4)  # Reduced width for taller appearance
-    ax.set_title(f"Ratings Distribution", fontsize=12)
-    ax.set_xlabel("Rating Category", fontsize=10)
-    ax.set_ylabel("Rating", fontsize=10)
-    ax.set_ylim(0, 5.5)  # Set y-axis limit to make bars appear taller
-    plt.xticks(rotation=45, ha='right')
-    
-    # Add value labels on bars
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.2f}',
-                ha='center', va='bottom')
-    
-    plt.tight_layout()
-    
-    # Convert figure to ReportLab Image with increased height
-    chart_img = fig_to_image(fig)
-    chart_img.hAlign = 'CENTER'
-    chart_img._height = 5*inch  # Increase image height in the PDF
-    elements.append(chart_img)
-    plt.close(fig)  # Close the figure to free memory
-    
-    # Force the footer to appear at the bottom of the page
-    # First, calculate remaining space and add a spacer to push the footer down
-    # A typical US Letter page is 11 inches high (minus margins)
-    page_height = letter[1] - doc.topMargin - doc.bottomMargin
-    
-    # We already used about 7.5-8 inches (header + table + chart)
-    # Add a spacer that will push the footer to the bottom
-    elements.append(Spacer(1, 1.5*inch))  # Add extra space to push footer down
-    
-    # Add footer signatures with updated labels
-    footer_data = [["IQAC", "HOD", "DIRECTOR"]]
-    footer_table = Table(footer_data, colWidths=[2.0*inch, 2.0*inch, 2.0*inch])
-    footer_style = TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 30),  # Space for signature
-    ])
-    
-    footer_table.setStyle(footer_style)
-    elements.append(footer_table)
-    
-    # Build PDF
-    doc.build(elements)
-    pdf_buffer.seek(0)
-    return pdf_buffer
+# Cached course code resolution for the processed course names
+@st.cache_data(show_spinner=False, max_entries=16)
+def resolve_course_codes(mapping_items, course_names, learned_items):
+    """Resolve course names against the uploaded mapping and learned mappings in one pass"""
+    resolver = CourseCodeResolver(dict(mapping_items), learned=dict(learned_items))
+    return resolver.resolve_all(course_names)
 
-# Function to generate table visualization for faculty
-def generate_table_visualization(faculty_data):
-    """Generate a table visualization of faculty ratings as a figure"""
-    if faculty_data.empty:
-        return None
-    
-    faculty_name = faculty_data["Faculty Name"].iloc[0]
-    
-    # Calculate total average
-    total_avg = faculty_data['Rating'].mean().round(4)
-    
-    # Create new row for total average
-    new_row = pd.DataFrame({
-        'Faculty Name': [faculty_name],
-        'Rating Category': ['Total Average'],
-        'Rating': [total_avg]
-    })
-    
-    # Append new row to faculty data
-    viz_data = pd.concat([faculty_data, new_row], ignore_index=True)
-    
-    # Prepare data for table
-    headers = ['Rating Category', 'Average Rating']
-    data = viz_data[['Rating Category', 'Rating']].values.tolist()
-    
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.axis('off')  # Hide axes
-    
-    # Add title
-    plt.title(f"Ratings for {faculty_name}", fontsize=14, pad=20)
-    
-    # Create table
-    table = ax.table(
-        cellText=data,
-        colLabels=headers,
-        loc='center',
-        cellLoc='left',
-        colWidths=[0.7, 0.3]
+# Function to display and confirm course code resolution
+def show_course_code_resolution(course_names):
+    """Resolve course codes for the processed courses and let users confirm uncertain matches"""
+    learned = load_learned_mappings()
+    if not st.session_state.course_code_mapping and not learned:
+        st.session_state.resolved_course_codes = {}
+        return
+    
+    # Course names as they appear in reports
+    clean_names = tuple(sorted({name.replace("Feedback on ", "").strip() for name in course_names}))
+    resolution = resolve_course_codes(
+        tuple(sorted(st.session_state.course_code_mapping.items(), key=str)),
+        clean_names,
+        tuple(sorted(learned.items()))
     )
-    
-    # Set font size and padding
-    table.auto_set_font_size(False)
-    table.set_fontsize(12)
-    table.scale(1, 1.5)
-    
-    plt.tight_layout()
-    return fig
+    resolved = resolution.dropna(subset=["Course Code"])
+    st.session_state.resolved_course_codes = dict(zip(resolved["Course"], resolved["Course Code"]))
+    
+    uncertain = resolution["Match"].isin(["fuzzy", "ambiguous", "unmatched"])
+    with st.expander(f"Course Code Resolution ({int(uncertain.sum())} to review)", expanded=bool((resolution["Match"] == "ambiguous").any())):
+        st.info("Exact and learned matches are applied automatically. Edit the Course Code column to confirm or correct the rest, then save.")
+        edited = st.data_editor(
+            resolution,
+            disabled=["Course", "Match", "Matched Name", "Score", "Alternatives"],
+            key="course_code_editor"
+        )
+        if st.button("Save Course Code Mappings"):
+            confirmed = edited[edited["Match"] != "exact"].dropna(subset=["Course Code"])
+            confirmed = confirmed[confirmed["Course Code"].astype(str).str.strip() != ""]
+            save_learned_mappings(dict(zip(confirmed["Course"], confirmed["Course Code"].astype(str).str.strip())))
+            st.toast(f"✅ Saved {len(confirmed)} course code mappings for future uploads.")
+            st.rerun()
 
-# Function to verify data processing
-def verify_data_processing(faculty_ratings_df, comments_df, course_feedback_df):
-    """Print verification of data processing including course information"""
-    print("\nData Processing Verification:")
-    print("-" * 50)
-    
-    # Verify faculty ratings
-    print("\nFaculty Ratings Summary:")
-    print(f"Total records: {len(faculty_ratings_df)}")
-    print("\nUnique courses:")
-    for course in sorted(faculty_ratings_df['Course'].unique()):
-        course_data = faculty_ratings_df[faculty_ratings_df['Course'] == course]
-        print(f"- {course}: {len(course_data)} ratings")
-    
-    # Verify faculty-course combinations
-    faculty_course = faculty_ratings_df.groupby(['Faculty Name', 'Course']).size().reset_index()
-    print("\nFaculty-Course combinations:")
-    for _, row in faculty_course.iterrows():
-        print(f"- {row['Faculty Name']} - {row['Course']}")
-    
-    # Verify comments
-    if not comments_df.empty:
-        print("\nComments Summary:")
-        print(f"Total comments: {len(comments_df)}")
-        print("\nComments per course:")
-        for course in sorted(comments_df['Course'].unique()):
-            course_comments = comments_df[comments_df['Course'] == course]
-            print(f"- {course}: {len(course_comments)} comments")
-    
-    # Verify course feedback
-    if not course_feedback_df.empty:
-        print("\nCourse Feedback Summary:")
-        print(f"Total feedback entries: {len(course_feedback_df)}")
-        print("\nFeedback per course:")
-        for course in sorted(course_feedback_df['Course'].unique()):
-            course_fb = course_feedback_df[course_feedback_df['Course'] == course]
-            print(f"- {course}: {len(course_fb)} feedback entries")
+# Function to poll the background processing job
+@st.fragment(run_every=1)
+def show_processing_job():
+    """Show stage progress of the processing job and load its result into session state when done"""
+    job = get_job_registry().get(st.session_state.processing_job_id)
+    if job is None:
+        st.session_state.processing_job_id = None
+        st.rerun()
+    
+    # Picked-up jobs leave the registry, so the processed tables are held only by the dataset registry
+    if job.finished:
+        get_job_registry().take(job.id)
+    if job.status == DONE:
+        use_dataset(get_dataset_registry().register(st.session_state.processing_dataset_key, job.result))
+        st.session_state.processing_job_id = None
+        st.session_state.processing_notice = ("success", f"✅ {job.label} finished in {job.finished_at - job.started_at:.1f}s")
+        st.rerun()
+    elif job.status == FAILED:
+        st.session_state.processing_job_id = None
+        st.session_state.processing_notice = ("error", f"⚠️ Error processing the file: {job.error}")
+        st.rerun()
+    elif job.status == CANCELLED:
+        st.session_state.processing_job_id = None
+        st.session_state.processing_notice = ("warning", "Processing was cancelled.")
+        st.rerun()
+    
+    show_job_progress(get_job_registry(), job)
+    if st.button("Cancel Processing"):
+        job.cancel()
 
-# Function to extract section information from faculty name
-def extract_section_from_faculty_name(faculty_name):
-    """
-    Extract section information from faculty name field
-    Examples:
-    - "Section A - Dr. Smith" returns "A", "Dr. Smith"
-    - "Dr. Smith - Section B" returns "B", "Dr. Smith"
-    """
-    faculty_name = str(faculty_name).strip()
-    
-    # Try to match "Section X - Faculty Name" pattern
-    pattern1 = re.search(r'(?i)section\s+([A-Z0-9]+)\s*[-:]?\s*(.*)', faculty_name)
-    if pattern1:
-        section = pattern1.group(1).strip()
-        name = pattern1.group(2).strip()
-        return section, name
-    
-    # Try to match "Faculty Name - Section X" pattern - FIX: moved flag to beginning or use re.IGNORECASE
-    pattern2 = re.search(r'(?i)(.*?)\s*[-:]\s*section\s+([A-Z0-9]+)', faculty_name)
-    if pattern2:
-        name = pattern2.group(1).strip()
-        section = pattern2.group(2).strip()
-        return section, name
-        
-    # If no section info found, return None for section
-    return None, faculty_name
+# Cached overall scores, so reruns and report builds on the same dataset skip rescoring
+@st.cache_data(show_spinner=False, max_entries=16)
+def session_overall_scores(dataset_key, method, _rating_cube):
+    """Score every section-faculty pair and faculty of a registered dataset (the key identifies the cube)"""
+    return report_overall_scores(_rating_cube, method)
 
-# Add this function before the data processing section, for example after the extract_section_from_faculty_name function
+# Function to collect this session's report header details
+def session_report_context():
+    """Return a picklable ReportContext with the session's academic year, program, semester, course codes and score method"""
+    # Codes resolved by fuzzy matching take precedence over the raw mapping file
+    course_codes = dict(st.session_state.course_code_mapping)
+    course_codes.update({course: code for course, code in st.session_state.resolved_course_codes.items() if code})
+    # Every faculty is scored at once from the session's rating cube, once per dataset and method;
+    # response-based scores need response counts, so files without them fall back to the mean
+    score_method = st.session_state.get("score_method", "mean") if session_responses_known() else "mean"
+    dataset = st.session_state.dataset
+    return ReportContext(
+        start_year=st.session_state.start_year,
+        end_year=st.session_state.end_year,
+        program=st.session_state.program,
+        semester=st.session_state.semester,
+        course_codes=course_codes,
+        score_method=score_method,
+        overall_scores=session_overall_scores(dataset.key, score_method, dataset.rating_cube) if dataset is not None else {}
+    )
 
-def get_columns_for_faculty(all_columns, course_columns, faculty_col_idx):
-    """
-    Get columns that are likely related to the faculty at faculty_col_idx.
-    Uses proximity in the column layout to determine relevant columns.
-    
-    Parameters:
-    - all_columns: List of all column names in the dataframe
-    - course_columns: List of column indices for the current course
-    - faculty_col_idx: Index of the specific faculty column to process
-    
-    Returns:
-    - List of column indices relevant to this faculty
-    """
-    # Start with all columns in this course block
-    relevant_cols = course_columns.copy()
-    
-    # If there's only one faculty column, return all columns
-    faculty_cols = [i for i in course_columns if 'Name of the Faculty' in all_columns[i]]
-    if len(faculty_cols) <= 1:
-        return course_columns
-    
-    # Sort faculty columns
-    faculty_cols.sort()
-    
-    # Find boundaries of this faculty's section
-    # Find position of current faculty column in the sorted list
-    current_idx = faculty_cols.index(faculty_col_idx)
-    
-    # Set start boundary (beginning of course or after previous faculty)
-    start_boundary = 0 if current_idx == 0 else faculty_cols[current_idx - 1]
-    
-    # Set end boundary (end of course or before next faculty)
-    end_boundary = float('inf') if current_idx == len(faculty_cols) - 1 else faculty_cols[current_idx + 1]
-    
-    # Filter to columns between boundaries
-    relevant_cols = [col for col in course_columns if start_boundary <= col < end_boundary]
-    
-    return relevant_cols
+# Function to point this session at a registered dataset
+def use_dataset(handle):
+    """Replace the session's dataset handle, releasing its reference to the previous dataset"""
+    previous = st.session_state.dataset
+    st.session_state.dataset = handle
+    if previous is not None and previous is not handle:
+        previous.release()
 
-# Add this function after the other helper functions (like extract_section_from_faculty_name)
-# and before the Streamlit app initialization
+# Function to get the session's dataset if it came from the given kind of upload
+def session_dataset(kind):
+    """Return the session's dataset handle if its key is of this kind ('raw' or 'processed'), else None"""
+    handle = st.session_state.dataset
+    if handle is not None and handle.key[0] == kind:
+        return handle
+    return None
 
-def identify_course_columns(columns):
-    """
-    Identify which columns belong to which course/faculty block
-    
-    Parameters:
-    - columns: List of column names in the dataframe
-    
-    Returns:
-    - List of tuples with (course_name, [column_indices])
-    """
-    course_blocks = []
-    current_block = []
-    current_course = None
+# Function to tell whether the session's dataset has real response counts
+def session_responses_known():
+    """Return False if the session's dataset came from averages without response counts"""
+    handle = st.session_state.dataset
+    return handle is None or handle.responses_known is not False
 
-    for i, col in enumerate(columns):
-        if isinstance(col, str) and col.startswith('Feedback on '):
-            if current_block:
-                course_blocks.append((current_course, current_block))
-                current_block = []
-            current_course = col
-            current_block = []
-        elif current_course is not None:
-            current_block.append(i)
+# Function to show the outcome of the last processing job once
+def show_processing_notice():
+    """Display and clear the message left by the last finished processing job"""
+    if st.session_state.processing_notice is not None:
+        kind, message = st.session_state.processing_notice
+        getattr(st, kind)(message)
+        st.session_state.processing_notice = None
 
-    # Add the last block
-    if current_block:
-        course_blocks.append((current_course, current_block))
+# Function to start processing several raw feedback files as one dataset
+def show_multi_file_processing(uploaded_files):
+    """List the program and semester detected for each file and process all files together in the background"""
+    files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    detected = pd.DataFrame([{"File": name, **extract_info_from_filename(name)} for name, _ in files])
+    detected = detected.rename(columns={"program": "Program", "semester": "Semester"})
+    st.success(f"✅ {len(files)} raw data files uploaded; they will be processed in parallel and combined.")
+    st.dataframe(detected, hide_index=True)
+    
+    # Report headers name the program and semester only when every file shares them
+    programs = detected["Program"].dropna().unique()
+    semesters = detected["Semester"].dropna().unique()
+    st.session_state.program = programs[0] if len(programs) == 1 and detected["Program"].notna().all() else None
+    st.session_state.semester = semesters[0] if len(semesters) == 1 and detected["Semester"].notna().all() else None
+    
+    quality_rules = show_quality_rules()
+    if st.button("Process Raw Data"):
+        dataset_key = ("raw", content_hash(*(content for _, content in files)), tuple(sorted(quality_rules.items())))
+        shared = get_dataset_registry().acquire(dataset_key)
+        if shared is not None:
+            use_dataset(shared)
+            st.session_state.processing_notice = ("success", f"✅ These {len(files)} files were already processed; using the shared copy.")
+        else:
+            label = f"Processing {len(files)} files"
+            job = get_job_registry().submit(label, process_feedback_files, files, quality_rules=quality_rules, profiler=start_run_profiler(label))
+            st.session_state.processing_job_id = job.id
+            st.session_state.processing_dataset_key = dataset_key
 
-    return course_blocks
+# Function to start profiling a processing run if the user opted in
+def start_run_profiler(label):
+    """Return a new RunProfiler kept in session state when profiling is on, else None"""
+    if not st.session_state.get("profiling_enabled", PROFILE_BY_DEFAULT):
+        return None
+    st.session_state.run_profiler = RunProfiler(label)
+    return st.session_state.run_profiler
 
-# Add this dictionary after other helper functions but before app initialization
-def get_full_program_name(program_code):
-    """
-    Convert program code to full program name
-    """
-    program_mapping = {
-        "AIML": "B.Tech in Computer Science and Engineering (Artificial Intelligence and Machine Learning)",
-        "CSE": "B.Tech in Computer Science and Engineering",
-        "CSIT": "B.Tech in Computer Science and Information Technology",
-        "CSSE": "B.Tech in Computer Science and Systems Engineering", 
-        "ISE": "B.Tech in Information Science and Engineering",
-        "DS": "B.Tech in Computer Science and Engineering (Data Science)",
-        "CS": "B.Tech in Computer Science and Engineering",
-        "ECE": "B.Tech in Electronics and Communication Engineering",
-        "EEE": "B.Tech in Electrical and Electronics Engineering",
-        "MECH": "B.Tech in Mechanical Engineering",
-        "CIVIL": "B.Tech in Civil Engineering"
-    }
-    return program_mapping.get(program_code, program_code)
+# Function to display the profiling switch and the current run's profile
+def show_run_profile():
+    """Let users opt in to profiling and download the last run's stage timings and cProfile"""
+    with st.expander("Performance Profiling"):
+        st.checkbox(
+            "Profile the next processing run and the reports rendered from it",
+            value=PROFILE_BY_DEFAULT, key="profiling_enabled"
+        )
+        profiler = st.session_state.run_profiler
+        if profiler is None:
+            st.info("No run has been profiled in this session yet.")
+            return
+        
+        st.write(f"**{profiler.label}** (started {profiler.created_at:%H:%M:%S})")
+        stages = profiler.stage_table()
+        if not stages.empty:
+            st.dataframe(stages.style.format({"Seconds": "{:.3f}"}), hide_index=True)
+        # Built when downloaded, so renders done since this rerun are included
+        st.download_button(
+            label="Download Profile",
+            data=lambda: profiler.artifact(),
+            file_name=profiler.file_name(),
+            mime="application/zip"
+        )
 
 # Set page config
 st.set_page_config(
@@ -523,16 +713,25 @@ You can either upload raw feedback data for processing or analyze pre-processed
 """)
 
 # Initialize session state to store processed data
-if 'faculty_ratings_df' not in st.session_state:
-    st.session_state.faculty_ratings_df = None
-if 'comments_df' not in st.session_state:
-    st.session_state.comments_df = None  
-if 'course_feedback_df' not in st.session_state:
-    st.session_state.course_feedback_df = None
-if 'avg_ratings' not in st.session_state:
-    st.session_state.avg_ratings = None
+# (the tables themselves live once in the shared dataset registry; sessions keep a handle)
+if 'dataset' not in st.session_state:
+    st.session_state.dataset = None
+if 'processing_job_id' not in st.session_state:
+    st.session_state.processing_job_id = None
+if 'processing_dataset_key' not in st.session_state:
+    st.session_state.processing_dataset_key = None
+if 'processing_notice' not in st.session_state:
+    st.session_state.processing_notice = None
+if 'report_jobs' not in st.session_state:
+    st.session_state.report_jobs = {}
+if 'report_results' not in st.session_state:
+    st.session_state.report_results = {}
+if 'run_profiler' not in st.session_state:
+    st.session_state.run_profiler = None
 if 'course_code_mapping' not in st.session_state:
     st.session_state.course_code_mapping = {}
+if 'resolved_course_codes' not in st.session_state:
+    st.session_state.resolved_course_codes = {}
 if 'semester' not in st.session_state:
     st.session_state.semester = None
 if 'program' not in st.session_state:
@@ -556,6 +755,12 @@ with col2:
     end_year = st.number_input("Ending Year", min_value=2000, max_value=2100, value=st.session_state.end_year)
     st.session_state.end_year = end_year
 
+# How reports combine category ratings into the overall score
+st.selectbox(
+    "Overall Score in Reports", list(SCORE_METHODS), format_func=SCORE_METHODS.get, key="score_method",
+    help="Response-weighted scores count every answer once; shrunk scores also pull faculty with few responses toward their section's or the department's average."
+)
+
 # Create tabs
 tab1, tab2 = st.tabs(["Process & Visualize Data", "About"])
 
@@ -572,17 +777,12 @@ with tab1:
                 else:
                     mapping_df = pd.read_excel(course_mapping_file)
                 
-                # Check if dataframe has required columns
-                required_cols = ["course_name", "course_code"]
-                if not all(col.lower() in [c.lower() for c in mapping_df.columns] for col in required_cols):
-                    st.warning("The mapping file should have columns for 'course_name' and 'course_code'.")
+                # Find the course name and code columns (case insensitive)
+                try:
+                    mapping_dict = mapping_from_frame(mapping_df)
+                except ValueError as e:
+                    st.warning(str(e))
                 else:
-                    # Find the actual column names (case insensitive)
-                    course_name_col = next(col for col in mapping_df.columns if col.lower() == "course_name")
-                    course_code_col = next(col for col in mapping_df.columns if col.lower() == "course_code")
-                    
-                    # Create mapping dictionary
-                    mapping_dict = dict(zip(mapping_df[course_name_col], mapping_df[course_code_col]))
                     st.session_state.course_code_mapping = mapping_dict
                     
                     st.success(f"✅ Course mapping loaded successfully! {len(mapping_dict)} courses mapped.")
@@ -602,305 +802,196 @@ with tab1:
     )
     
     if process_mode == "Process Raw Feedback Data":
-        # Upload File - Raw Data
-        uploaded_file = st.file_uploader("Upload Raw Feedback Data (CSV or Excel)", type=["xlsx", "csv"])
+        # Upload File - Raw Data; several files are combined into one dataset
+        uploaded_files = st.file_uploader(
+            "Upload Raw Feedback Data (CSV or Excel) - select several files to combine programs or semesters",
+            type=["xlsx", "csv"],
+            accept_multiple_files=True
+        )
         
-        if uploaded_file is not None:
+        if uploaded_files:
             try:
-                # Extract semester and program from filename if possible
-                file_info = extract_info_from_filename(uploaded_file.name)
+                if len(uploaded_files) > 1:
+                    show_multi_file_processing(uploaded_files)
+                else:
+                    uploaded_file = uploaded_files[0]
+                    
+                    # Extract semester and program from filename if possible
+                    file_info = extract_info_from_filename(uploaded_file.name)
                 
-                if file_info['semester']:
-                    st.session_state.semester = file_info['semester']
-                    st.success(f"✅ Detected Semester {file_info['semester']} from filename")
+                    if file_info['semester']:
+                        st.session_state.semester = file_info['semester']
+                        st.success(f"✅ Detected Semester {file_info['semester']} from filename")
                 
-                if file_info['program']:
-                    st.session_state.program = file_info['program']
-                    st.success(f"✅ Detected Program {file_info['program']} from filename")
+                    if file_info['program']:
+                        st.session_state.program = file_info['program']
+                        st.success(f"✅ Detected Program {file_info['program']} from filename")
                 
-                # Read file
-                if uploaded_file.name.endswith(".csv"):
-                    raw_df = pd.read_csv(uploaded_file)
-                else:
-                    raw_df = pd.read_excel(uploaded_file)
+                    # Read file
+                    if uploaded_file.name.endswith(".csv"):
+                        raw_df = pd.read_csv(uploaded_file)
+                    else:
+                        raw_df = pd.read_excel(uploaded_file)
+                
+                    st.success("✅ Raw data file uploaded successfully!")
                 
-                st.success("✅ Raw data file uploaded successfully!")
+                    # Display raw data sample
+                    with st.expander("Preview Raw Data"):
+                        st.dataframe(raw_df.head())
                 
-                # Display raw data sample
-                with st.expander("Preview Raw Data"):
-                    st.dataframe(raw_df.head())
+                    # Exclusion rules applied before any rating is counted
+                    quality_rules = show_quality_rules()
                 
-                # Process button - add debug output for faculty columns
-                if st.button("Process Raw Data"):
-                    with st.spinner("Processing data... This may take a moment."):
+                    # Process button - add debug output for faculty columns
+                    if st.button("Process Raw Data"):
                         # Add debugging information about faculty columns
                         st.write("### Faculty Columns Detection")
                         faculty_cols_debug = {}
-                        
+                    
                         # Identify course blocks
                         course_blocks = identify_course_columns(raw_df.columns)
-                        
+                    
                         # Process each course block to identify faculty columns
                         for course_name, column_indices in course_blocks:
                             # Use broader pattern matching for faculty columns
                             faculty_cols_in_course = [i for i in column_indices if 
-                                                    any(pattern in raw_df.columns[i].lower() for pattern in 
-                                                    ["name of the faculty", "faculty name", "name of faculty"])]
-                            
+                                                    any(pattern in raw_df.columns[i].lower() for pattern in FACULTY_COLUMN_PATTERNS)]
+                    
                             if faculty_cols_in_course:
                                 faculty_cols_debug[course_name] = [raw_df.columns[i] for i in faculty_cols_in_course]
-                        
+                    
                         # Display detected faculty columns to the user
                         for course, faculty_cols in faculty_cols_debug.items():
                             st.write(f"**Course: {course}**")
                             for i, col in enumerate(faculty_cols, 1):
                                 st.write(f"  Faculty Column {i}: {col}")
-                        
+                    
                         # Show a sample row with faculty data
                         if len(raw_df) > 0:
                             st.write("### Sample Row with Faculty Names")
                             sample_row = raw_df.iloc[0]
-                            
+                    
                             # Create a sample dataframe of just faculty columns
                             sample_faculty_data = {}
                             for course_name, column_indices in course_blocks:
                                 faculty_cols = [i for i in column_indices if 
-                                            any(pattern in raw_df.columns[i].lower() for pattern in 
-                                                ["name of the faculty", "faculty name", "name of faculty"])]
-                                
+                                            any(pattern in raw_df.columns[i].lower() for pattern in FACULTY_COLUMN_PATTERNS)]
+                    
                                 for i in faculty_cols:
                                     col_name = raw_df.columns[i]
                                     sample_faculty_data[f"{course_name}: {col_name}"] = [sample_row[col_name]]
-                            
+                    
                             if sample_faculty_data:
                                 sample_df = pd.DataFrame(sample_faculty_data)
                                 st.dataframe(sample_df)
-                        
-                        # Also update the actual processing code to use broader pattern matching
-                        # Initialize empty lists to store the transformed data
-                        student_names = []
-                        srns = []
-                        sections = []
-                        faculty_names = []
-                        courses = []
-                        rating_types = []
-                        ratings = []
-                        course_feedbacks = []
-                        comments = []
-
-                        # Process each row
-                        for index, row in raw_df.iterrows():
-                            student_name = row.get('Name of the Student', None)
-                            srn = row.get('SRN', None)
-                            section = row.get('Section', None)  # This stays as a backup
-                            
-                            if pd.isna(student_name) or pd.isna(srn):
-                                continue
-                                
-                            # Process each course block
-                            for course_name, column_indices in course_blocks:
-                                # Use broader pattern matching for faculty columns
-                                faculty_cols = [i for i in column_indices if 
-                                            any(pattern in raw_df.columns[i].lower() for pattern in 
-                                                ["name of the faculty", "faculty name", "name of faculty"])]
-                                
-                                # Process each faculty in this course block
-                                for faculty_col_idx in faculty_cols:
-                                    # Extract faculty name
-                                    raw_faculty_name = str(row[raw_df.columns[faculty_col_idx]])
-                                    if pd.isna(raw_faculty_name) or raw_faculty_name.strip() == '':
-                                        continue
-                                        
-                                    # Extract section and clean faculty name
-                                    section_from_faculty, faculty_name = extract_section_from_faculty_name(raw_faculty_name)
-                                    
-                                    # Use section from faculty name if available, otherwise use the section column
-                                    effective_section = section_from_faculty if section_from_faculty else section
-                                    
-                                    # Find question columns related to this faculty
-                                    # Use column proximity to connect questions to faculty
-                                    relevant_cols = get_columns_for_faculty(raw_df.columns, column_indices, faculty_col_idx)
-                                    
-                                    # Extract rating questions for this faculty
-                                    question_cols = [i for i in relevant_cols if 'Please give a rating' in raw_df.columns[i]]
-                                    
-                                    # Process each question related to this faculty
-                                    for q_col in question_cols:
-                                        # ...existing code to process ratings...
-                                        question = raw_df.columns[q_col]
-                                        rating = row[raw_df.columns[q_col]]
-                                        
-                                        if not pd.isna(rating):
-                                            student_names.append(student_name)
-                                            srns.append(srn)
-                                            sections.append(effective_section)  # Use the extracted section
-                                            faculty_names.append(faculty_name)  # Use the clean faculty name
-                                            courses.append(course_name)
-                                            rating_types.append(question)
-                                            ratings.append(rating)
-                                            
-                                    # Get comments if available
-                                    comment_col = [i for i in relevant_cols if raw_df.columns[i] == 'Comments']
-                                    if comment_col:
-                                        comment = row[raw_df.columns[comment_col[0]]]
-                                        if not pd.isna(comment):
-                                            comments.append({
-                                                'Student': student_name,
-                                                'SRN': srn,
-                                                'Faculty': faculty_name,
-                                                'Course': course_name,
-                                                'Comment': comment
-                                            })
-
-                                    # Get course feedback questions
-                                    course_feedback_cols = [i for i in relevant_cols if 'The course' in raw_df.columns[i]]
-                                    for cf_col in course_feedback_cols:
-                                        question = raw_df.columns[cf_col]
-                                        rating = row[raw_df.columns[cf_col]]
-
-                                        if not pd.isna(rating):
-                                            course_feedbacks.append({
-                                                'Student': student_name,
-                                                'SRN': srn,
-                                                'Course': course_name,
-                                                'Question': question,
-                                                'Rating': rating
-                                            })
-
-                        # Create the main faculty ratings DataFrame
-                        faculty_ratings_df = pd.DataFrame({
-                            'Student Name': student_names,
-                            'SRN': srns,
-                            'Section': sections,
-                            'Faculty Name': faculty_names,
-                            'Course': courses,
-                            'Rating Category': rating_types,
-                            'Rating': ratings
-                        })
-
-                        # Create the comments DataFrame
-                        comments_df = pd.DataFrame(comments)
-
-                        # Create the course feedback DataFrame
-                        course_feedback_df = pd.DataFrame(course_feedbacks)
-                        
-                        # Clean faculty names
-                        faculty_ratings_df['Faculty Name'] = faculty_ratings_df['Faculty Name'].astype(str).str.replace(r"Section[ -]?[A-Z]?[ -]?", "", regex=True).str.strip()
-                        
-                        # Clean the rating categories
-                        faculty_ratings_df['Rating Category'] = (
-                            faculty_ratings_df['Rating Category']
-                            .str.strip()
-                            .str.lower()
-                            .str.replace(r"\s+", " ", regex=True)
-                            .str.split("(").str[0]
-                            .str.strip()
-                        )
-                        
-                        # Convert rating to numeric
-                        faculty_ratings_df['Rating'] = pd.to_numeric(faculty_ratings_df['Rating'], errors='coerce')
-                        
-                        # Save data to session state for persistence
-                        st.session_state.faculty_ratings_df = faculty_ratings_df
-                        st.session_state.comments_df = comments_df
-                        st.session_state.course_feedback_df = course_feedback_df
-                        
-                        # Compute averages for visualization
-                        avg_ratings = (
-                            faculty_ratings_df.groupby(["Faculty Name", "Rating Category"], as_index=False)
-                            .agg({"Rating": "mean"})
-                        )
-                        
-                        # Save averages to session state
-                        st.session_state.avg_ratings = avg_ratings
-                        
-                        # Verify data processing
-                        verify_data_processing(faculty_ratings_df, comments_df, course_feedback_df)
+                    
+                        # Reuse the dataset if any session already processed the same file;
+                        # otherwise hand the heavy processing to a background job so the page stays usable
+                        dataset_key = ("raw", dataset_hash(raw_df), tuple(sorted(quality_rules.items())))
+                        shared = get_dataset_registry().acquire(dataset_key)
+                        if shared is not None:
+                            use_dataset(shared)
+                            st.session_state.processing_notice = ("success", f"✅ {uploaded_file.name} was already processed; using the shared copy.")
+                        else:
+                            label = f"Processing {uploaded_file.name}"
+                            job = get_job_registry().submit(label, process_raw_feedback, raw_df, quality_rules=quality_rules, profiler=start_run_profiler(label))
+                            st.session_state.processing_job_id = job.id
+                            st.session_state.processing_dataset_key = dataset_key
                 
-                # Display processed data if available in session state
-                if st.session_state.faculty_ratings_df is not None:
+                # Show progress of a running job and pick up its result when it finishes
+                if st.session_state.processing_job_id is not None:
+                    show_processing_job()
+                show_processing_notice()
+                
+                # Display processed data if this session holds a processed raw dataset
+                dataset = session_dataset("raw")
+                if dataset is not None:
                     st.subheader("Processed Data")
                     
-                    # Debug: Check unique sections in the dataset
-                    unique_sections = st.session_state.faculty_ratings_df['Section'].unique()
-                    print(f"Debug - Unique sections in data: {unique_sections}")
-                    
                     # Create tabs for different datasets
-                    data_tabs = st.tabs(["Faculty Ratings", "Student Comments", "Course Feedback"])
+                    data_tabs = st.tabs(["Faculty Ratings", "Student Comments", "Course Feedback", "Response Quality"])
                     
                     with data_tabs[0]:
-                        st.write(f"Faculty Ratings: {len(st.session_state.faculty_ratings_df)} records")
-                        st.dataframe(st.session_state.faculty_ratings_df.head(10))
-                        
-                        # Download button for faculty ratings
-                        faculty_buffer = io.BytesIO()
-                        with pd.ExcelWriter(faculty_buffer, engine='openpyxl') as writer:
-                            st.session_state.faculty_ratings_df.to_excel(writer, index=False)
-                        faculty_buffer.seek(0)
+                        st.write(f"Faculty Ratings: {len(dataset.faculty_ratings_df)} records")
+                        st.dataframe(dataset.faculty_ratings_df.head(10))
                         
+                        # Download button for faculty ratings (written on click)
                         st.download_button(
                             label="Download Faculty Ratings Data",
-                            data=faculty_buffer,
+                            data=lambda table=dataset.faculty_ratings_df: excel_bytes(table),
                             file_name="faculty_ratings.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
                     
                     with data_tabs[1]:
-                        if not st.session_state.comments_df.empty:
-                            st.write(f"Student Comments: {len(st.session_state.comments_df)} records")
-                            st.dataframe(st.session_state.comments_df.head(10))
-                            
-                            # Download button for comments
-                            comments_buffer = io.BytesIO()
-                            with pd.ExcelWriter(comments_buffer, engine='openpyxl') as writer:
-                                st.session_state.comments_df.to_excel(writer, index=False)
-                            comments_buffer.seek(0)
+                        if not dataset.comments_df.empty:
+                            st.write(f"Student Comments: {len(dataset.comments_df)} records")
+                            st.dataframe(dataset.comments_df.head(10))
                             
+                            # Download button for comments (written on click)
                             st.download_button(
                                 label="Download Student Comments Data",
-                                data=comments_buffer,
+                                data=lambda table=dataset.comments_df: excel_bytes(table),
                                 file_name="student_comments.xlsx",
                                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                             )
+                            
+                            if dataset.comment_index is not None:
+                                show_comment_search(dataset.comment_index)
+                            
+                            # Recurring themes and sentiment per faculty and course
+                            st.write("#### Recurring Themes")
+                            themes_df, sentiment_df = cached_comment_themes(
+                                dataset.comments_df, group_keys=("Faculty", "Course"), dataset_key=dataset.key
+                            )
+                            if themes_df.empty:
+                                st.info("No theme is mentioned in more than one comment yet.")
+                            else:
+                                st.dataframe(themes_df)
+                            st.dataframe(sentiment_df.style.format({"Positive %": "{:.0f}", "Negative %": "{:.0f}", "Sentiment": "{:+.2f}"}))
                         else:
                             st.info("No student comments found in the data.")
                     
                     with data_tabs[2]:
-                        if not st.session_state.course_feedback_df.empty:
-                            st.write(f"Course Feedback: {len(st.session_state.course_feedback_df)} records")
-                            st.dataframe(st.session_state.course_feedback_df.head(10))
-                            
-                            # Download button for course feedback
-                            course_buffer = io.BytesIO()
-                            with pd.ExcelWriter(course_buffer, engine='openpyxl') as writer:
-                                st.session_state.course_feedback_df.to_excel(writer, index=False)
-                            course_buffer.seek(0)
+                        if not dataset.course_feedback_df.empty:
+                            st.write(f"Course Feedback: {len(dataset.course_feedback_df)} records")
+                            st.dataframe(dataset.course_feedback_df.head(10))
                             
+                            # Download button for course feedback (written on click)
                             st.download_button(
                                 label="Download Course Feedback Data",
-                                data=course_buffer,
+                                data=lambda table=dataset.course_feedback_df: excel_bytes(table),
                                 file_name="course_feedback_ratings.xlsx",
                                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                             )
+                            
+                            if dataset.course_cube is not None:
+                                show_course_analytics(dataset.course_cube)
                         else:
                             st.info("No course feedback found in the data.")
                     
+                    with data_tabs[3]:
+                        show_quality_report(dataset.quality_report)
+                    
+                    # Resolve course codes for every processed course at once
+                    show_course_code_resolution(dataset.faculty_ratings_df["Course"].dropna().unique())
+                    
+                    # Department-wide overview of every faculty in one view
+                    if dataset.rating_cube is not None:
+                        show_department_overview(dataset.rating_cube)
+                        show_pivot_export(dataset.rating_cube, dataset.course_cube)
+                        show_leaderboard(dataset.rating_cube)
+                        show_department_booklet(dataset.rating_cube, dataset.comments_df)
+                        show_response_timeline(dataset.faculty_ratings_df, dataset.submissions)
+                    
                     # Visualization section
                     st.subheader("Visualize Faculty Ratings")
                     
                     # Group by Section and Faculty - improved logic
-                    if "Section" in st.session_state.faculty_ratings_df.columns:
-                        # Make sure section values are properly extracted
-                        st.session_state.faculty_ratings_df['Section'] = st.session_state.faculty_ratings_df['Section'].astype(str).fillna('')
-                        
+                    if "Section" in dataset.faculty_ratings_df.columns:
                         # Create combined labels for faculty selection with clearer section extraction
-                        section_faculty_groups = st.session_state.faculty_ratings_df.groupby(["Section", "Faculty Name"]).size().reset_index()
+                        section_faculty_groups = dataset.faculty_ratings_df.groupby(["Section", "Faculty Name"]).size().reset_index()
                         
-                        # Debug: Show unique section-faculty combinations
-                        print("Debug - Section-Faculty combinations:")
-                        for _, row in section_faculty_groups.iterrows():
-                            print(f"  Section: '{row['Section']}' - Faculty: '{row['Faculty Name']}'")
-                            
                         # Create labels for dropdown, ensuring section is clearly shown
                         section_faculty_labels = []
                         for _, row in section_faculty_groups.iterrows():
@@ -923,17 +1014,17 @@ with tab1:
                         
                         # Filter Data for Selected Faculty and Section
                         if section:
-                            faculty_data = st.session_state.faculty_ratings_df[
-                                (st.session_state.faculty_ratings_df["Faculty Name"] == faculty) &
-                                (st.session_state.faculty_ratings_df["Section"] == section)
+                            faculty_data = dataset.faculty_ratings_df[
+                                (dataset.faculty_ratings_df["Faculty Name"] == faculty) &
+                                (dataset.faculty_ratings_df["Section"] == section)
                             ].copy()
                         else:
-                            faculty_data = st.session_state.faculty_ratings_df[
-                                st.session_state.faculty_ratings_df["Faculty Name"] == faculty
+                            faculty_data = dataset.faculty_ratings_df[
+                                dataset.faculty_ratings_df["Faculty Name"] == faculty
                             ].copy()
                     else:
                         # Fall back to original faculty selection if Section is not available
-                        faculties = st.session_state.avg_ratings["Faculty Name"].unique()
+                        faculties = dataset.avg_ratings["Faculty Name"].unique()
                         
                         if len(faculties) == 0:
                             st.error("❌ No faculty names detected! Please check your data.")
@@ -941,19 +1032,19 @@ with tab1:
                             selected_faculty = st.selectbox("🎓 Select a Faculty", faculties)
                             
                             # Filter Data for Selected Faculty
-                            faculty_data = st.session_state.faculty_ratings_df[
-                                st.session_state.faculty_ratings_df["Faculty Name"] == selected_faculty
+                            faculty_data = dataset.faculty_ratings_df[
+                                dataset.faculty_ratings_df["Faculty Name"] == selected_faculty
                             ].copy()
                             section = ""
                     
                     # Get unique course name for this faculty
                     course_name = faculty_data["Course"].iloc[0].replace("Feedback on ", "") if len(faculty_data) > 0 else "N/A"
                     
-                    # Update averages computation to include Section if available
+                    # Compute averages with counts, spread and CI in one pass, including Section if available
                     if "Section" in faculty_data.columns:
-                        avg_ratings = faculty_data.groupby(["Section", "Faculty Name", "Rating Category"], as_index=False).agg({"Rating": "mean"})
+                        avg_ratings = build_rating_cube(faculty_data, keys=["Section", "Faculty Name", "Rating Category"])
                     else:
-                        avg_ratings = faculty_data.groupby(["Faculty Name", "Rating Category"], as_index=False).agg({"Rating": "mean"})
+                        avg_ratings = build_rating_cube(faculty_data, keys=["Faculty Name", "Rating Category"])
                     
                     # Select visualization type
                     viz_type = st.radio(
@@ -963,76 +1054,43 @@ with tab1:
                     )
                     
                     # For visualizations, update the titles to include section if available
-                    if viz_type == "Bar Chart":
-                        # Plot Ratings using avg_ratings
-                        fig, ax = plt.subplots(figsize=(12, 8))  # Increased height from 6 to 8
-                        bars = ax.bar(avg_ratings["Rating Category"], avg_ratings["Rating"], color="skyblue", width=0.6)
-
-                        # Include section in title if available
-                        if "Section" in avg_ratings.columns and avg_ratings["Section"].iloc[0]:
-                            title = f"📈 Average Ratings for Section {avg_ratings['Section'].iloc[0]} - {avg_ratings['Faculty Name'].iloc[0]}"
-                        else:
-                            title = f"📈 Average Ratings for {avg_ratings['Faculty Name'].iloc[0]}"
-                            
-                        ax.set_title(title, fontsize=14)
-                        ax.set_xlabel("Rating Category", fontsize=12)
-                        ax.set_ylabel("Average Rating (1-5)", fontsize=12)
-                        ax.set_ylim(0, 5.5)  # Keep the same y-limit
-                        plt.xticks(rotation=45, ha="right", fontsize=10)
-                        
-                        # Add labels on bars
-                        for bar, category, rating in zip(bars, avg_ratings["Rating Category"], avg_ratings["Rating"]):
-                            ax.text(bar.get_x() + bar.get_width()/2, bar.get_height(), f"{rating:.2f}", ha="center", va="bottom", fontsize=10)
-                        
-                        plt.tight_layout()
-                        st.pyplot(fig)
-                        
-                        # Save figure option
-                        save_fig_buffer = io.BytesIO()
-                        fig.savefig(save_fig_buffer, format='png', dpi=300, bbox_inches='tight')
-                        save_fig_buffer.seek(0)
+                    if "Section" in avg_ratings.columns and avg_ratings["Section"].iloc[0]:
+                        title = f"📈 Average Ratings for Section {avg_ratings['Section'].iloc[0]} - {avg_ratings['Faculty Name'].iloc[0]}"
+                    else:
+                        title = f"📈 Average Ratings for {avg_ratings['Faculty Name'].iloc[0]}"
+                    
+                    # Show a cached low-resolution preview; the high-dpi image is only rendered on download
+                    profiler = st.session_state.run_profiler
+                    preview_png = render_ratings_preview(avg_ratings, title, viz_type, _profiler=profiler)
+                    if preview_png:
+                        st.image(preview_png)
                         
                         # Create filename based on section and faculty
+                        image_kind = "chart" if viz_type == "Bar Chart" else "table"
                         if section:
-                            filename = f"Section_{section}_{faculty}_ratings_chart.png"
+                            filename = f"Section_{section}_{faculty}_ratings_{image_kind}.png"
                         else:
-                            filename = f"{faculty}_ratings_chart.png"
+                            filename = f"{faculty}_ratings_{image_kind}.png"
                         
                         st.download_button(
-                            label="Download Chart",
-                            data=save_fig_buffer,
+                            label="Download Chart" if viz_type == "Bar Chart" else "Download Table Image",
+                            data=lambda: profiled(profiler, "Ratings image", renderers().render_ratings_image, avg_ratings, title, viz_type),
                             file_name=filename,
                             mime="image/png"
                         )
-                    else:  # Table visualization
-                        # Generate table visualization using avg_ratings
-                        table_fig = generate_table_visualization(avg_ratings)
-                        if table_fig:
-                            st.pyplot(table_fig)
-                            
-                            # Save table figure option
-                            table_buffer = io.BytesIO()
-                            table_fig.savefig(table_buffer, format='png', dpi=300, bbox_inches='tight')
-                            table_buffer.seek(0)
-                            
-                            # Create filename based on section and faculty
-                            if section:
-                                filename = f"Section_{section}_{faculty}_ratings_table.png"
-                            else:
-                                filename = f"{faculty}_ratings_table.png"
-                            
-                            st.download_button(
-                                label="Download Table Image",
-                                data=table_buffer,
-                                file_name=filename,
-                                mime="image/png"
-                            )
                     
                     # Add horizontal line for visual separation
                     st.markdown("---")
                     
-                    # Generate text report for rating categories
-                    faculty_report = generate_faculty_report(avg_ratings)
+                    # Recurring themes from this faculty's comments (cached per dataset)
+                    faculty_themes = None
+                    if dataset.comments_df is not None and not dataset.comments_df.empty:
+                        all_themes, _ = cached_comment_themes(dataset.comments_df, dataset_key=dataset.key)
+                        faculty_themes = all_themes[all_themes["Faculty"] == faculty]
+                    
+                    # Generate text report for rating categories; the context carries the session's header details and score method
+                    context = session_report_context()
+                    faculty_report = generate_faculty_report(avg_ratings, faculty_themes, context)
 
                     # Create columns for layout
                     report_col1, report_col2 = st.columns([1, 2])
@@ -1054,11 +1112,10 @@ with tab1:
                             mime="text/plain"
                         )
                         
-                        # Add PDF report download button
-                        pdf_buffer = generate_pdf_report(avg_ratings, course_name)
+                        # Add PDF report download button; the PDF is rendered when downloaded
                         st.download_button(
                             label="Download PDF Report",
-                            data=pdf_buffer,
+                            data=lambda: profiled(profiler, "Faculty PDF", renderers().generate_pdf_report, avg_ratings, course_name, context, faculty_themes).getvalue(),
                             file_name=pdf_filename,
                             mime="application/pdf"
                         )
@@ -1073,23 +1130,17 @@ with tab1:
                 st.exception(e)
                 
     else:  # Analyze Processed Data
-        # Clear session state when switching to the other mode
-        if st.session_state.faculty_ratings_df is not None:
-            st.session_state.faculty_ratings_df = None
-            st.session_state.comments_df = None
-            st.session_state.course_feedback_df = None
-            st.session_state.avg_ratings = None
+        # Release the raw dataset when switching to the other mode
+        if session_dataset("raw") is not None:
+            use_dataset(None)
             
         # Upload File - Processed Data
-        uploaded_file = st.file_uploader("Upload Processed Faculty Ratings (CSV or Excel)", type=["xlsx", "csv"])
+        uploaded_file = st.file_uploader("Upload Processed Faculty Ratings (CSV, Excel, Parquet or Feather)", type=PROCESSED_FILE_TYPES)
         
         if uploaded_file is not None:
             try:
-                # Read file
-                if uploaded_file.name.endswith(".csv"):
-                    df = pd.read_csv(uploaded_file, encoding="utf-8")
-                else:
-                    df = pd.read_excel(uploaded_file, engine="openpyxl")
+                # Read file by its type
+                df = read_processed_file(uploaded_file)
                 
                 st.success("✅ File uploaded successfully!")
                 
@@ -1097,57 +1148,35 @@ with tab1:
                 with st.expander("Preview Data"):
                     st.dataframe(df.head())
                 
-                # Identify Faculty Name Column
-                faculty_col = [col for col in df.columns if "faculty" in col.lower()]
-                if not faculty_col:
-                    st.error("❌ No Faculty Name column found! Check your file.")
-                    st.stop()
-                faculty_col = faculty_col[0]
-                
-                # Clean Faculty Names if not already cleaned
-                if "Faculty Name" not in df.columns:
-                    df["Faculty Name"] = df[faculty_col].astype(str).str.replace(r"Section[ -]?[A-Z]?[ -]?", "", regex=True).str.strip()
-                
-                # Drop rows with missing faculty names
-                df = df.dropna(subset=["Faculty Name"])
-                
-                # Extract Rating Columns Dynamically
-                rating_cols = [col for col in df.columns if any(x in col.lower() for x in ["course", "rating", "evaluation"])]
-                if not rating_cols and "Rating Category" not in df.columns:
-                    st.error("❌ No Rating columns found! Check your file.")
-                    st.stop()
-                
-                # Process data if it's not already in the right format
-                if "Rating Category" not in df.columns or "Rating" not in df.columns:
-                    # Melt Data for Analysis
-                    melted_df = df.melt(id_vars=["Faculty Name"], value_vars=rating_cols, var_name="Rating Category", value_name="Rating")
-                    
-                    # Fix Duplicate Questions: Normalize Category Names
-                    melted_df["Rating Category"] = (
-                        melted_df["Rating Category"]
-                        .str.strip()
-                        .str.lower()
-                        .str.replace(r"\s+", " ", regex=True)
-                        .str.split("(").str[0]
-                        .str.strip()
+                # Reuse the ratings if any session already loaded the same file
+                dataset_key = ("processed", dataset_hash(df))
+                dataset = session_dataset("processed")
+                if dataset is None or dataset.key != dataset_key:
+                    dataset = get_dataset_registry().acquire(dataset_key)
+                if dataset is None:
+                    # Detect which export shape this is; aggregated files are loaded without regrouping
+                    try:
+                        profiler = start_run_profiler(f"Loading {uploaded_file.name}")
+                        tables = profiled(profiler, "Load processed file", load_processed_ratings, df)
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+                        st.stop()
+                    dataset = get_dataset_registry().register(dataset_key, tables)
+                use_dataset(dataset)
+                avg_ratings = dataset.avg_ratings
+                st.info(f"ℹ️ Detected {SCHEMA_DESCRIPTIONS[dataset.schema]}.")
+                if not session_responses_known():
+                    st.info(
+                        "ℹ️ The file has no Count column, so response counts are unknown and every average counts once. "
+                        "The leaderboard has no minimum response count, and reports use the mean of category averages "
+                        "instead of response-weighted or shrunk scores."
                     )
-                    
-                    melted_df = melted_df.dropna(subset=["Rating"])
-                    
-                    # Convert Rating to Numeric
-                    melted_df["Rating"] = pd.to_numeric(melted_df["Rating"], errors="coerce")
-                    
-                    # Compute Averages
-                    avg_ratings = (
-                        melted_df.groupby(["Faculty Name", "Rating Category"], as_index=False)
-                        .agg({"Rating": "mean"})
-                    )
-                else:
-                    # If data is already in the right format
-                    avg_ratings = df
                 
-                # Store in session state
-                st.session_state.avg_ratings = avg_ratings
+                # Department-wide overview of every faculty in one view
+                show_department_overview(dataset.rating_cube)
+                show_pivot_export(dataset.rating_cube)
+                show_leaderboard(dataset.rating_cube)
+                show_department_booklet(dataset.rating_cube)
                 
                 # Select Faculty
                 faculties = avg_ratings["Faculty Name"].unique()
@@ -1168,58 +1197,27 @@ with tab1:
                     horizontal=True
                 )
                 
-                if viz_type == "Bar Chart":
-                    # Plot Ratings
-                    fig, ax = plt.subplots(figsize=(12, 8))  # Increased height from 6 to 8
-                    bars = ax.bar(faculty_data["Rating Category"], faculty_data["Rating"], color="skyblue", width=0.6)  # Added width parameter
-
-                    ax.set_title(f"📈 Average Ratings for {selected_faculty}", fontsize=14)
-                    ax.set_xlabel("Rating Category", fontsize=12)
-                    ax.set_ylabel("Average Rating (1-5)", fontsize=12)
-                    ax.set_ylim(0, 5.5)  # Keep the same y-limit
-                    plt.xticks(rotation=45, ha="right", fontsize=10)
-                    
-                    # Add labels on bars
-                    for bar, category, rating in zip(bars, faculty_data["Rating Category"], faculty_data["Rating"]):
-                        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height(), f"{rating:.2f}", ha="center", va="bottom", fontsize=10)
-                    
-                    plt.tight_layout()
-                    st.pyplot(fig)
-                    
-                    # Save figure option
-                    save_fig_buffer = io.BytesIO()
-                    fig.savefig(save_fig_buffer, format='png', dpi=300, bbox_inches='tight')
-                    save_fig_buffer.seek(0)
+                # Show a cached low-resolution preview; the high-dpi image is only rendered on download
+                title = f"📈 Average Ratings for {selected_faculty}"
+                profiler = st.session_state.run_profiler
+                preview_png = render_ratings_preview(faculty_data, title, viz_type, _profiler=profiler)
+                if preview_png:
+                    st.image(preview_png)
                     
+                    image_kind = "chart" if viz_type == "Bar Chart" else "table"
                     st.download_button(
-                        label="Download Chart",
-                        data=save_fig_buffer,
-                        file_name=f"{selected_faculty}_ratings_chart.png",
+                        label="Download Chart" if viz_type == "Bar Chart" else "Download Table Image",
+                        data=lambda: profiled(profiler, "Ratings image", renderers().render_ratings_image, faculty_data, title, viz_type),
+                        file_name=f"{selected_faculty}_ratings_{image_kind}.png",
                         mime="image/png"
                     )
-                else:  # Table visualization
-                    # Generate table visualization
-                    table_fig = generate_table_visualization(faculty_data)
-                    if table_fig:
-                        st.pyplot(table_fig)
-                        
-                        # Save table figure option
-                        table_buffer = io.BytesIO()
-                        table_fig.savefig(table_buffer, format='png', dpi=300, bbox_inches='tight')
-                        table_buffer.seek(0)
-                        
-                        st.download_button(
-                            label="Download Table Image",
-                            data=table_buffer,
-                            file_name=f"{selected_faculty}_ratings_table.png",
-                            mime="image/png"
-                        )
                 
                 # Add horizontal line for visual separation
                 st.markdown("---")
                 
-                # Generate text report for rating categories
-                faculty_report = generate_faculty_report(faculty_data)
+                # Generate text report for rating categories; the context carries the session's header details and score method
+                context = session_report_context()
+                faculty_report = generate_faculty_report(faculty_data, context=context)
 
                 # Create columns for layout
                 report_col1, report_col2 = st.columns([1, 2])
@@ -1233,11 +1231,10 @@ with tab1:
                         mime="text/plain"
                     )
                     
-                    # Add PDF report download button
-                    pdf_buffer = generate_pdf_report(faculty_data, "N/A")
+                    # Add PDF report download button; the PDF is rendered when downloaded
                     st.download_button(
                         label="Download PDF Report",
-                        data=pdf_buffer,
+                        data=lambda: profiled(profiler, "Faculty PDF", renderers().generate_pdf_report, faculty_data, "N/A", context).getvalue(),
                         file_name=f"{selected_faculty}_ratings_report.pdf",
                         mime="application/pdf"
                     )
@@ -1250,6 +1247,9 @@ with tab1:
             except Exception as e:
                 st.error(f"⚠️ Error processing the file: {e}")
                 st.exception(e)
+    
+    # Opt-in profiling of processing and rendering
+    show_run_profile()
 
 with tab2:
     st.header("About This App")
@@ -1264,8 +1264,23 @@ with tab2:
     ### Features:
     
     - Clean and transform raw feedback data
+    - Exclude duplicate and straight-lined submissions before ratings are counted, with a report of what was dropped
+    - Process uploads in the background with progress and cancel; a file another user already processed opens instantly
+    - Upload several programs' or semesters' exports at once; they are reshaped in parallel and combined, with sections labelled by program and semester
     - Generate visualizations of faculty ratings (bar charts or tables)
-    - Download processed data as Excel files
+    - Compare all faculty at once in the Department Overview heatmaps
+    - Rank the lowest or highest rated faculty per category in the Faculty Leaderboard
+    - Score faculty by the mean of category averages, a response-weighted average, or a score shrunk toward the section or department average so small sections do not swing rankings and reports
+    - Build one bookmarked department PDF with a contents page for every faculty, in the background with progress and cancel
+    - Download every faculty's PDF, text report and chart as one ZIP archive with a manifest, also built in the background
+    - Follow submissions per day or week and see when average ratings settle in the Response Timeline
+    - Compare course feedback per course and question with charts and a course PDF
+    - Search student comments by keyword or phrase, broken down by faculty and course
+    - See recurring comment themes and sentiment per faculty, also listed in the reports
+    - Download processed data as Excel files, and the rating cube as Parquet
+    - Download the faculty × category, section × faculty, course × question and response-count pivots as one workbook, or as CSV or Parquet files
+    - Profile a slow file on demand: download stage timings and a cProfile of processing and rendering
+    - Re-open row-level, average or rating cube exports (CSV, Excel, Parquet or Feather); the file's shape is detected automatically
     - Download visualizations as PNG images
     - Create text reports with ratings information
     
@@ -0,0 +1,125 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+# Words are runs of letters, digits and apostrophes
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Columns that search results can be broken down by
+FACET_COLUMNS = ["Faculty", "Course"]
+
+# Function to split text into lowercase search tokens
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+# Function to split a query into phrases and single terms
+def parse_query(query):
+    """
+    Parse a search query into quoted phrases and single terms.
+
+    Examples:
+    - 'pace notes' returns [], ['pace', 'notes']
+    - '"too fast" board*' returns [['too', 'fast']], ['board*']
+    """
+    phrases = [tokenize(phrase) for phrase in re.findall(r'"([^"]+)"', query)]
+    remainder = re.sub(r'"[^"]*"?', " ", query).lower()
+    terms = re.findall(r"[a-z0-9']+\*?", remainder)
+    return [phrase for phrase in phrases if phrase], terms
+
+class CommentIndex:
+    """Inverted index from comment tokens to row positions, with faculty/course facets"""
+
+    def __init__(self, comments_df):
+        self.comments = comments_df.reset_index(drop=True)
+        if "Comment" in self.comments.columns:
+            texts = self.comments["Comment"].fillna("").astype(str).str.lower()
+        else:
+            texts = pd.Series([""] * len(self.comments), dtype=object)
+        self.texts = texts.to_numpy()
+
+        # Tokenize every comment at once and group row positions by token
+        tokens = texts.str.findall(TOKEN_PATTERN).explode().dropna()
+        pairs = pd.DataFrame({"token": tokens.to_numpy(), "row": tokens.index.to_numpy()}).drop_duplicates()
+        self.postings = {
+            token: rows.to_numpy(dtype=np.int64)
+            for token, rows in pairs.sort_values("row").groupby("token", sort=True)["row"]
+        }
+        self.vocabulary = sorted(self.postings)
+
+        # Factorize facet columns once so counts are a single bincount
+        self.facets = {}
+        for column in FACET_COLUMNS:
+            if column in self.comments.columns:
+                codes, labels = pd.factorize(self.comments[column].astype(str))
+                self.facets[column] = (codes, labels)
+
+    def __len__(self):
+        return len(self.comments)
+
+    def _rows_for_term(self, term):
+        """Return sorted row positions containing the term (a trailing * matches a prefix)"""
+        if not term.endswith("*"):
+            return self.postings.get(term, np.empty(0, dtype=np.int64))
+
+        prefix = term[:-1]
+        start = bisect_left(self.vocabulary, prefix)
+        matches = []
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(self.postings[token])
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(matches))
+
+    def search(self, query="", facet_filters=None):
+        """
+        Find comments matching every term and quoted phrase in the query.
+
+        Parameters:
+        - query: Keywords, "quoted phrases" and prefix* terms (empty matches all)
+        - facet_filters: Optional dict such as {'Faculty': 'Dr. Smith'}
+
+        Returns:
+        - Sorted numpy array of matching row positions
+        """
+        phrases, terms = parse_query(query)
+        term_rows = [self._rows_for_term(term) for term in terms]
+        term_rows += [self._rows_for_term(token) for phrase in phrases for token in phrase]
+
+        if term_rows:
+            # Intersect from the rarest term upwards to keep intermediate sets small
+            term_rows.sort(key=len)
+            rows = term_rows[0]
+            for other in term_rows[1:]:
+                rows = np.intersect1d(rows, other, assume_unique=True)
+        else:
+            rows = np.arange(len(self.comments))
+
+        # Confirm phrase order on the few remaining candidates
+        for phrase in phrases:
+            pattern = re.compile(r"\b" + r"\W+".join(map(re.escape, phrase)) + r"\b")
+            rows = rows[[bool(pattern.search(self.texts[row])) for row in rows]] if len(rows) else rows
+
+        for column, value in (facet_filters or {}).items():
+            if column in self.facets and value is not None:
+                codes, labels = self.facets[column]
+                matches = np.flatnonzero(labels == str(value))
+                rows = rows[codes[rows] == matches[0]] if len(matches) else rows[:0]
+        return rows
+
+    def facet_counts(self, rows, column):
+        """Count matching rows per facet value, most frequent first"""
+        if column not in self.facets:
+            return pd.Series(dtype=int)
+        codes, labels = self.facets[column]
+        counts = np.bincount(codes[rows], minlength=len(labels))
+        result = pd.Series(counts, index=labels, name="Comments")
+        return result[result > 0].sort_values(ascending=False)
+
+    def results(self, rows):
+        """Return the comment rows at the given positions"""
+        return self.comments.iloc[rows]
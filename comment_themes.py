@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from comment_search import TOKEN_PATTERN
+from dataset_cache import ResultCache, dataset_hash
+
+# Common English and feedback filler words that never make a theme on their own
+STOP_WORDS = {
+    "a", "about", "all", "also", "am", "an", "and", "any", "are", "as", "at", "be", "been",
+    "but", "by", "can", "class", "classes", "could", "did", "do", "does", "for", "from", "get",
+    "had", "has", "have", "he", "her", "him", "his", "i", "if", "in", "into", "is", "it", "its",
+    "just", "ma'am", "mam", "maam", "me", "more", "my", "na", "nil", "nill", "nothing", "of", "on",
+    "or", "our", "she", "should", "sir", "so", "subject", "teacher", "teaching", "that", "the",
+    "their", "them", "then", "there", "they", "this", "to", "us", "was", "we", "were", "what",
+    "when", "which", "while", "who", "will", "with", "would", "you", "your"
+}
+
+# Words that only carry meaning next to another word (kept for n-grams, not as themes)
+MODIFIERS = {"not", "no", "never", "too", "very", "more", "less", "much", "so"}
+
+# Small opinion lexicon for optional comment sentiment
+POSITIVE_WORDS = {
+    "good", "great", "excellent", "nice", "clear", "helpful", "best", "interesting", "well",
+    "understandable", "easy", "awesome", "amazing", "supportive", "friendly", "effective",
+    "useful", "patient", "engaging", "knowledgeable", "perfect", "fantastic", "wonderful"
+}
+NEGATIVE_WORDS = {
+    "bad", "poor", "boring", "unclear", "difficult", "confusing", "slow", "late", "rude",
+    "strict", "fast", "hard", "inaudible", "lagging", "worst", "lack", "lacks", "irregular"
+}
+NEGATIONS = {"not", "no", "never", "don't", "didn't", "doesn't", "isn't", "wasn't", "can't"}
+
+# Process-wide cache of theme results keyed by dataset key (or hash) and parameters
+THEME_CACHE = ResultCache(max_entries=16, cache_dir=os.environ.get("FEEDBACK_THEME_CACHE_DIR"))
+
+# Function to tokenize comments into one row per token
+def explode_tokens(comments):
+    """Return a DataFrame with one row per token, in comment order: comment row and token"""
+    texts = comments.fillna("").astype(str).str.lower()
+    tokens = texts.str.findall(TOKEN_PATTERN).explode().dropna()
+    return pd.DataFrame({"row": tokens.index.to_numpy(), "token": tokens.to_numpy()})
+
+# Function to extract recurring themes from comments
+def extract_themes(comments_df, group_keys=("Faculty",), top_n=5, min_mentions=2, max_ngram=3):
+    """
+    Count recurring words and phrases per group of comments.
+
+    Parameters:
+    - comments_df: DataFrame with a 'Comment' column and the group_keys columns
+    - group_keys: Columns to group themes by (e.g. ('Faculty',) or ('Faculty', 'Course'))
+    - top_n: Number of themes to keep per group
+    - min_mentions: Minimum number of comments a theme must appear in
+    - max_ngram: Longest phrase length to count
+
+    Returns:
+    - DataFrame with the group_keys columns plus 'Theme' and 'Mentions'
+    """
+    group_keys = [key for key in group_keys if key in comments_df.columns]
+    columns = group_keys + ["Theme", "Mentions"]
+    if comments_df.empty or "Comment" not in comments_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    comments = comments_df.reset_index(drop=True)
+    tokens = explode_tokens(comments["Comment"])
+    tokens = tokens[~tokens["token"].isin(STOP_WORDS - MODIFIERS)].reset_index(drop=True)
+
+    # Build n-grams by shifting the token column within each comment
+    ngrams = []
+    for n in range(1, max_ngram + 1):
+        same_comment = np.ones(len(tokens), dtype=bool)
+        parts = [tokens["token"]]
+        for offset in range(1, n):
+            same_comment &= (tokens["row"].shift(-offset) == tokens["row"]).to_numpy()
+            parts.append(tokens["token"].shift(-offset))
+
+        # A theme may not end with a modifier, so "too fast" counts but "too" does not
+        keep = same_comment & ~parts[-1].isin(MODIFIERS).to_numpy()
+        gram = parts[0].str.cat(parts[1:], sep=" ") if n > 1 else parts[0]
+        ngrams.append(pd.DataFrame({"row": tokens["row"], "Theme": gram, "Length": n})[keep])
+    ngrams = pd.concat(ngrams, ignore_index=True)
+
+    # Count each theme once per comment, then per group
+    ngrams = ngrams.drop_duplicates(subset=["row", "Theme"])
+    ngrams = ngrams.join(comments[group_keys], on="row")
+    counts = (
+        ngrams.groupby(group_keys + ["Theme", "Length"], sort=False, dropna=False)
+        .size()
+        .reset_index(name="Mentions")
+    )
+    counts = counts[counts["Mentions"] >= min_mentions]
+
+    # Drop words and phrases that only ever occur inside a longer theme ("pace" in "too fast pace")
+    longer = counts[counts["Length"] > 1]
+    covered = pd.DataFrame(
+        [
+            (*keys, " ".join(words[start:start + size]), mentions)
+            for *keys, theme, mentions in longer[group_keys + ["Theme", "Mentions"]].itertuples(index=False)
+            for words in [theme.split()]
+            for size in range(1, len(words))
+            for start in range(len(words) - size + 1)
+        ],
+        columns=group_keys + ["Theme", "Covered"]
+    ).groupby(group_keys + ["Theme"], sort=False, dropna=False)["Covered"].max()
+    # Themes not inside any longer one are covered 0 times (reindex leaves them NaN)
+    covered_mentions = covered.reindex(pd.MultiIndex.from_frame(counts[group_keys + ["Theme"]])).fillna(0).to_numpy()
+    counts = counts[~(covered_mentions >= counts["Mentions"].to_numpy())]
+
+    # Prefer frequent themes and, on ties, the longer phrase
+    counts = counts.sort_values(group_keys + ["Mentions", "Length"], ascending=[True] * len(group_keys) + [False, False])
+    top = counts.groupby(group_keys, sort=False, dropna=False).head(top_n)
+    return top[columns].reset_index(drop=True)
+
+# Function to score comment sentiment with the opinion lexicon
+def comment_sentiment(comments_df, group_keys=("Faculty",)):
+    """
+    Score each comment as positive (+1), negative (-1) or neutral (0) and summarize per group.
+
+    Returns:
+    - DataFrame with the group_keys columns plus 'Comments', 'Positive %', 'Negative %' and 'Sentiment'
+    """
+    group_keys = [key for key in group_keys if key in comments_df.columns]
+    columns = group_keys + ["Comments", "Positive %", "Negative %", "Sentiment"]
+    if comments_df.empty or "Comment" not in comments_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    comments = comments_df.reset_index(drop=True)
+    tokens = explode_tokens(comments["Comment"])
+
+    # Token polarity, flipped when the previous token in the same comment is a negation
+    polarity = np.where(tokens["token"].isin(POSITIVE_WORDS), 1, 0) - np.where(tokens["token"].isin(NEGATIVE_WORDS), 1, 0)
+    negated = (tokens["token"].shift(1).isin(NEGATIONS) & (tokens["row"].shift(1) == tokens["row"])).to_numpy()
+    polarity = np.where(negated, -polarity, polarity)
+
+    score = np.sign(np.bincount(tokens["row"].to_numpy(dtype=np.int64), weights=polarity, minlength=len(comments)))
+    scored = comments[group_keys].assign(
+        Score=score, Positive=(score > 0) * 100.0, Negative=(score < 0) * 100.0
+    )
+    summary = scored.groupby(group_keys, sort=True, dropna=False).agg(
+        Comments=("Score", "size"),
+        Positive=("Positive", "mean"),
+        Negative=("Negative", "mean"),
+        Sentiment=("Score", "mean")
+    ).reset_index()
+    return summary.rename(columns={"Positive": "Positive %", "Negative": "Negative %"})[columns]
+
+# Function to get themes and sentiment, reusing earlier results for the same dataset
+def cached_comment_themes(comments_df, group_keys=("Faculty",), top_n=5, min_mentions=2, dataset_key=None):
+    """
+    Return (themes, sentiment) for the comments, cached per dataset and parameters.
+
+    Pass the registered dataset's key as dataset_key so a cache hit costs no hashing of
+    the comments; without it the comments table is hashed on every call.
+    """
+    key = (dataset_key or dataset_hash(comments_df), tuple(group_keys), top_n, min_mentions)
+    return THEME_CACHE.get_or_compute(key, lambda: (
+        extract_themes(comments_df, group_keys, top_n=top_n, min_mentions=min_mentions),
+        comment_sentiment(comments_df, group_keys)
+    ))
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from rating_stats import HISTOGRAM_COLUMNS, build_rating_cube, rollup_rating_cube
+
+# Grouping levels of the course cube
+COURSE_CUBE_KEYS = ["Course", "Question"]
+
+# Function to tidy course feedback question labels
+def clean_course_questions(course_feedback_df):
+    """Strip the '.1', '.2' suffixes pandas adds to repeated question columns, and extra whitespace"""
+    cleaned = course_feedback_df.copy()
+    cleaned["Question"] = (
+        cleaned["Question"].astype(str)
+        .str.replace(r"\.\d+$", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    return cleaned
+
+# Function to aggregate course feedback on the rating cube machinery
+def build_course_cube(course_feedback_df):
+    """
+    Aggregate course feedback into one row per (Course, Question) with Sum, SumSq, Count,
+    answer histogram, mean ('Rating'), 'Std' and 'CI'.
+    """
+    if course_feedback_df is None or course_feedback_df.empty:
+        return None
+    ratings = clean_course_questions(course_feedback_df)
+    ratings["Rating"] = pd.to_numeric(ratings["Rating"], errors="coerce")
+    return build_rating_cube(ratings, keys=COURSE_CUBE_KEYS)
+
+# Function to summarize courses from the course cube
+def course_summary(course_cube):
+    """
+    Roll the course cube up to one row per course.
+
+    Returns:
+    - DataFrame with 'Course', 'Students' (most answers to any one question), 'Questions',
+      'Rating', 'Std', 'CI', 'Count' and the histogram columns, best rated first
+    """
+    summary = rollup_rating_cube(course_cube, ["Course"])
+    per_course = course_cube.groupby("Course", sort=False)
+    summary["Students"] = summary["Course"].map(per_course["Count"].max())
+    summary["Questions"] = summary["Course"].map(per_course.size())
+    return summary.sort_values("Rating", ascending=False).reset_index(drop=True)
+
+# Function to find the top of the rating scale used by course feedback
+def rating_scale(cube):
+    """Return the highest answer value given (at least 3), so charts fit 1-3 and 1-5 scales"""
+    present = [value for value, column in enumerate(HISTOGRAM_COLUMNS, 1)
+               if column in cube.columns and cube[column].sum() > 0]
+    return max(present + [3])
+
+# Function to format the answer histogram of a cube row as percentages
+def histogram_shares(cube, scale):
+    """Return a DataFrame with the share (%) of answers at each value 1..scale per row"""
+    counts = cube[HISTOGRAM_COLUMNS[:scale]].to_numpy(dtype=float)
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.where(totals > 0, counts / totals * 100, np.nan)
+    return pd.DataFrame(shares, columns=[f"% {value}" for value in range(1, scale + 1)], index=cube.index)
@@ -0,0 +1,173 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# File where confirmed course name -> code mappings are remembered between runs
+LEARNED_MAPPINGS_PATH = os.environ.get("FEEDBACK_COURSE_ALIASES", "course_code_aliases.json")
+
+# Fuzzy matches need this Dice similarity over character trigrams
+MIN_FUZZY_SCORE = 0.6
+
+# A runner-up within this margin of the best match makes the match ambiguous
+AMBIGUITY_MARGIN = 0.05
+
+# Function to normalize course names for matching
+def normalize_course_names(names):
+    """
+    Normalize course names so cosmetic differences don't block a match.
+
+    Examples:
+    - "Feedback on Analog & Digital Electronics\\xa0" -> "analog and digital electronics"
+    - "Lab 1- Programming with Python Lab" -> "lab 1 programming with python lab"
+    """
+    return (
+        pd.Series(list(names), dtype=object).fillna("").astype(str)
+        .str.replace("\xa0", " ", regex=False)
+        .str.replace(r"^\s*feedback on\s+", "", case=False, regex=True)
+        .str.replace("&", " and ", regex=False)
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+# Function to read a course code mapping table
+def mapping_from_frame(mapping_df):
+    """
+    Return {course name: course code} from a table with 'course_name' and 'course_code' columns (any case).
+
+    Raises:
+    - ValueError if either column is missing
+    """
+    columns = {str(col).lower(): col for col in mapping_df.columns}
+    if "course_name" not in columns or "course_code" not in columns:
+        raise ValueError("The mapping file should have columns for 'course_name' and 'course_code'.")
+    return dict(zip(mapping_df[columns["course_name"]], mapping_df[columns["course_code"]]))
+
+# Function to split a normalized name into character trigrams
+def char_trigrams(text):
+    """Return the set of character trigrams of a name, padded so word edges count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Function to read learned mappings from disk
+def load_learned_mappings(path=LEARNED_MAPPINGS_PATH):
+    """Load remembered {normalized course name: course code} mappings, or {} if none are saved"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return {str(name): str(code) for name, code in json.load(handle).items()}
+    except (OSError, ValueError):
+        return {}
+
+# Function to remember confirmed mappings on disk
+def save_learned_mappings(mappings, path=LEARNED_MAPPINGS_PATH):
+    """Merge {course name: course code} pairs into the learned mappings file and return the result"""
+    learned = load_learned_mappings(path)
+    names = list(mappings)
+    for normalized, code in zip(normalize_course_names(names), (mappings[name] for name in names)):
+        if normalized and code:
+            learned[normalized] = str(code)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(learned, handle, indent=2, sort_keys=True)
+    return learned
+
+class CourseCodeResolver:
+    """Resolve course names to codes by normalized exact match, learned mappings, then a trigram index"""
+
+    def __init__(self, mapping, learned=None):
+        names = list(mapping)
+        codes = [str(mapping[name]) for name in names]
+        normalized = normalize_course_names(names)
+        table = pd.DataFrame({"Name": names, "Normalized": normalized, "Code": codes})
+        table = table[table["Normalized"] != ""].drop_duplicates(subset=["Normalized", "Code"])
+
+        # Normalized names that map to more than one code can never be resolved automatically
+        code_counts = table.groupby("Normalized")["Code"].nunique()
+        self.conflicts = set(code_counts[code_counts > 1].index)
+        self.exact = dict(zip(table["Normalized"], table["Code"]))
+        self.exact_names = dict(zip(table["Normalized"], table["Name"]))
+        self.learned = dict(learned or {})
+
+        # Candidate list and trigram -> candidate ids postings for fuzzy lookup
+        self.candidates = table.reset_index(drop=True)
+        postings = {}
+        sizes = []
+        for candidate_id, text in enumerate(self.candidates["Normalized"]):
+            grams = char_trigrams(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(candidate_id)
+        self.postings = {gram: np.asarray(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self.sizes = np.asarray(sizes, dtype=float)
+
+    def _fuzzy_scores(self, normalized_names):
+        """Return a (names × candidates) matrix of trigram Dice similarities"""
+        n_names, n_candidates = len(normalized_names), len(self.candidates)
+        query_ids, candidate_ids, query_sizes = [], [], []
+        for query_id, text in enumerate(normalized_names):
+            grams = char_trigrams(text)
+            query_sizes.append(len(grams))
+            for gram in grams:
+                ids = self.postings.get(gram)
+                if ids is not None:
+                    candidate_ids.append(ids)
+                    query_ids.append(np.full(len(ids), query_id, dtype=np.int64))
+        if not candidate_ids or n_candidates == 0:
+            return np.zeros((n_names, n_candidates))
+
+        # Shared trigram counts for every (name, candidate) pair in one bincount
+        flat = np.concatenate(query_ids) * n_candidates + np.concatenate(candidate_ids)
+        shared = np.bincount(flat, minlength=n_names * n_candidates).reshape(n_names, n_candidates)
+        return 2 * shared / (np.asarray(query_sizes, dtype=float)[:, None] + self.sizes[None, :])
+
+    def resolve_all(self, course_names):
+        """
+        Resolve every course name in one pass.
+
+        Returns:
+        - DataFrame with 'Course', 'Course Code', 'Match' (exact, learned, fuzzy,
+          ambiguous or unmatched), 'Matched Name', 'Score' and 'Alternatives'
+        """
+        courses = pd.unique(pd.Series(list(course_names), dtype=object).dropna())
+        result = pd.DataFrame({"Course": courses, "Normalized": normalize_course_names(courses)})
+        result["Course Code"] = result["Normalized"].map(self.exact)
+        result["Match"] = np.where(result["Course Code"].notna(), "exact", "unmatched")
+        result["Matched Name"] = result["Normalized"].map(self.exact_names).fillna("")
+        result["Score"] = np.where(result["Course Code"].notna(), 1.0, 0.0)
+        result["Alternatives"] = ""
+
+        conflicted = result["Normalized"].isin(self.conflicts)
+        result.loc[conflicted, ["Course Code", "Match", "Matched Name"]] = [None, "ambiguous", ""]
+        result.loc[conflicted, "Alternatives"] = result.loc[conflicted, "Normalized"].map(
+            lambda name: ", ".join(self.candidates.loc[self.candidates["Normalized"] == name, "Code"])
+        )
+
+        learned = result["Course Code"].isna() & result["Normalized"].isin(self.learned)
+        result.loc[learned, "Course Code"] = result.loc[learned, "Normalized"].map(self.learned)
+        result.loc[learned, ["Match", "Score"]] = ["learned", 1.0]
+
+        pending = result.index[(result["Match"] == "unmatched").to_numpy()]
+        if len(pending) and len(self.candidates):
+            scores = self._fuzzy_scores(result.loc[pending, "Normalized"].tolist())
+            order = np.argsort(-scores, axis=1)
+            codes = self.candidates["Code"].to_numpy()
+            names = self.candidates["Name"].to_numpy()
+            for row, ranked, row_scores in zip(pending, order, scores):
+                best = ranked[0]
+                if row_scores[best] < MIN_FUZZY_SCORE:
+                    continue
+                close = [idx for idx in ranked[1:4]
+                         if row_scores[idx] >= row_scores[best] - AMBIGUITY_MARGIN and codes[idx] != codes[best]]
+                result.at[row, "Matched Name"] = names[best]
+                result.at[row, "Score"] = round(float(row_scores[best]), 3)
+                if close:
+                    result.at[row, "Match"] = "ambiguous"
+                    result.at[row, "Alternatives"] = ", ".join(codes[[best] + close])
+                else:
+                    result.at[row, "Course Code"] = codes[best]
+                    result.at[row, "Match"] = "fuzzy"
+
+        return result.drop(columns=["Normalized"])
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Unreferenced datasets are evicted once the registry holds more than this
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("FEEDBACK_DATASET_BUDGET_MB", "512")) * 1024 * 1024)
+
+# Function to estimate how much memory a dataset's tables use
+def estimate_memory(value, _seen=None):
+    """Return the approximate size in bytes of DataFrames, arrays and the objects holding them"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_memory(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_memory(item, seen) for item in value)
+    if hasattr(value, "__dict__"):
+        return estimate_memory(vars(value), seen)
+    return sys.getsizeof(value)
+
+class DatasetHandle:
+    """
+    A session's reference to a registered dataset.
+
+    Tables are read as attributes (handle.faculty_ratings_df) and are None when the
+    dataset has no such table. The reference is released when the handle is
+    released explicitly or garbage collected with the session.
+    """
+
+    def __init__(self, registry, key):
+        self.key = key
+        self._registry = registry
+        self._release = weakref.finalize(self, registry.release, key)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._registry.tables(self.key).get(name)
+
+    def release(self):
+        """Drop this session's reference; safe to call more than once"""
+        self._release()
+
+class DatasetRegistry:
+    """Process-wide store of processed datasets keyed by content hash, shared by every session"""
+
+    def __init__(self, memory_budget=MEMORY_BUDGET_BYTES):
+        self.memory_budget = memory_budget
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def register(self, key, tables):
+        """
+        Store the tables under key (or reuse the copy already stored) and return a handle.
+
+        Parameters:
+        - key: Hashable content key, e.g. ('raw', dataset_hash(raw_df))
+        - tables: Dict of table name -> DataFrame or derived object
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = {"tables": dict(tables), "size": estimate_memory(tables), "refs": 0}
+            return self._acquire(key)
+
+    def acquire(self, key):
+        """Return a new handle to the dataset stored under key, or None if it is not stored"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._acquire(key)
+
+    def _acquire(self, key):
+        entry = self._entries[key]
+        entry["refs"] += 1
+        self._entries.move_to_end(key)
+        handle = DatasetHandle(self, key)
+        self._evict()
+        return handle
+
+    def release(self, key):
+        """Drop one reference to the dataset; it stays cached until memory is needed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+            self._evict()
+
+    def tables(self, key):
+        """Return the dict of tables stored under key"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["tables"] if entry is not None else {}
+
+    def memory_used(self):
+        """Return the estimated bytes held by all stored datasets"""
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def stats(self):
+        """Return a DataFrame with one row per stored dataset: key, size in MB and session references"""
+        with self._lock:
+            rows = [(key, entry["size"] / (1024 * 1024), entry["refs"]) for key, entry in self._entries.items()]
+        return pd.DataFrame(rows, columns=["Dataset", "Size (MB)", "Sessions"])
+
+    def _evict(self):
+        """Drop least recently used unreferenced datasets until the registry fits its budget"""
+        total = sum(entry["size"] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget:
+                break
+            entry = self._entries[key]
+            if entry["refs"] == 0:
+                total -= entry["size"]
+                del self._entries[key]
+
+_registry = None
+_registry_lock = threading.Lock()
+
+# Function to get the process-wide dataset registry
+def get_dataset_registry():
+    """Return the shared DatasetRegistry, creating it on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
@@ -0,0 +1,330 @@
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+import pandas as pd
+
+from course_codes import CourseCodeResolver, load_learned_mappings, mapping_from_frame
+from feedback_pipeline import process_feedback_files, process_raw_feedback
+from pivot_export import PIVOT_FORMATS, build_pivot_tables, export_pivots
+from processed_input import load_processed_ratings, read_processed_file
+from profiling import RunProfiler, call_with_profile, profile_stage
+from program_info import extract_info_from_filename
+from report_archive import ArchiveWriter
+from rating_stats import SCORE_METHODS
+from report_content import ReportContext, department_report_pages, report_file_details, report_overall_scores
+
+# Command-line entry points that only import Streamlit for the load test, and only import
+# Matplotlib and ReportLab in the commands that render, so batch workers start quickly.
+# The serve command loads Matplotlib and ReportLab with the first PDF or chart request.
+
+# Modules timed by the importtime command when none are given
+DEFAULT_IMPORT_MODULES = [
+    "pandas", "streamlit", "matplotlib.figure", "reportlab.platypus",
+    "feedback_pipeline", "report_rendering", "feedback_cli"
+]
+
+# Function to measure how long modules take to import in a fresh interpreter
+def measure_import_times(modules):
+    """
+    Import each module in a new Python process with -X importtime and report its cost.
+
+    Returns:
+    - List of (module, seconds) tuples; the time includes everything the module imports
+    """
+    timings = []
+    for module in modules:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+        # The last line belongs to the top-level module: "import time: self | cumulative | name"
+        cumulative = re.findall(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)", result.stderr)
+        micros = next((int(total) for total, name in reversed(cumulative) if name == module), 0)
+        timings.append((module, micros / 1e6))
+    return timings
+
+# Function to read a raw feedback export
+def read_raw_feedback(path):
+    """Read a raw feedback export from CSV or Excel"""
+    if path.lower().endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+# Function to process one or several raw feedback exports
+def process_inputs(paths, progress=None, profiler=None):
+    """Process a single export as it is, or several exports together in worker processes"""
+    if len(paths) == 1:
+        with profile_stage(profiler, "Read export"):
+            raw_df = read_raw_feedback(paths[0])
+        return process_raw_feedback(raw_df, progress=progress, profiler=profiler)
+    files = []
+    for path in paths:
+        with open(path, "rb") as handle:
+            files.append((os.path.basename(path), handle.read()))
+    return process_feedback_files(files, progress=progress, profiler=profiler)
+
+# Function to start a profile when --profile was given
+def start_profiler(args):
+    """Return a RunProfiler labelled with the command and inputs, or None without --profile"""
+    if not args.profile:
+        return None
+    return RunProfiler(f"{args.command} {' '.join(os.path.basename(path) for path in args.input)}")
+
+# Function to write the profile artifact
+def write_profile(profiler, path):
+    """Write the profile ZIP (summary, stage timings and pstats file) when profiling is on"""
+    if profiler is None:
+        return
+    with open(path, "wb") as handle:
+        handle.write(profiler.artifact())
+    print(f"{path}: profile of {len(profiler.stages)} stages", file=sys.stderr)
+
+# Function to resolve course codes for the report headers
+def read_course_codes(path, course_names):
+    """Resolve course names against a mapping file (course_name, course_code) and the learned mappings"""
+    if not path:
+        return {}
+    mapping = mapping_from_frame(read_raw_feedback(path))
+    resolved = CourseCodeResolver(mapping, learned=load_learned_mappings()).resolve_all(course_names)
+    resolved = resolved.dropna(subset=["Course Code"])
+    return {**mapping, **dict(zip(resolved["Course"], resolved["Course Code"]))}
+
+# Function to run the process command
+def run_process(args):
+    """Process raw feedback exports and write the long tables as CSV files"""
+    profiler = start_profiler(args)
+    result = process_inputs(
+        args.input, progress=lambda stage, fraction: print(f"[{fraction:4.0%}] {stage}", file=sys.stderr),
+        profiler=profiler
+    )
+    os.makedirs(args.output, exist_ok=True)
+    with profile_stage(profiler, "Write CSV files"):
+        for name in ["faculty_ratings", "comments", "course_feedback"]:
+            table = result[f"{name}_df"]
+            if table is not None:
+                path = os.path.join(args.output, f"{name}.csv")
+                table.to_csv(path, index=False)
+                print(f"{path}: {len(table)} rows")
+    write_profile(profiler, args.profile)
+    return 0
+
+# Function to run the pivot command
+def run_pivot(args):
+    """Process raw exports (or load processed files) and write the standard pivots as one workbook or ZIP"""
+    profiler = start_profiler(args)
+    if args.processed:
+        with profile_stage(profiler, "Load processed files"):
+            frames = [read_processed_file(path) for path in args.input]
+            result = load_processed_ratings(pd.concat(frames, ignore_index=True))
+    else:
+        result = process_inputs(args.input, profiler=profiler)
+    with profile_stage(profiler, "Pivot export"):
+        pivots = build_pivot_tables(result["rating_cube"], result.get("course_cube"), responses_known=result.get("responses_known", True))
+        data, extension, _ = export_pivots(pivots, args.format)
+    output = args.output or f"feedback_pivots.{extension}"
+    with open(output, "wb") as handle:
+        handle.write(data)
+    print(f"{output}: " + ", ".join(f"{name} ({len(pivot)} rows)" for name, pivot in pivots.items()))
+    write_profile(profiler, args.profile)
+    return 0
+
+# Function to run the report command
+def run_report(args):
+    """Process a raw export and render every faculty's PDF, text report and chart into a ZIP, in parallel"""
+    # Matplotlib and ReportLab are only loaded by this command
+    rendering = importlib.import_module("report_rendering")
+
+    profiler = start_profiler(args)
+    result = process_inputs(args.input, profiler=profiler)
+    # Program and semester come from the file name only when every file agrees on them
+    infos = [extract_info_from_filename(os.path.basename(path)) for path in args.input]
+    info = {key: infos[0][key] if all(i[key] == infos[0][key] for i in infos) else None for key in ["program", "semester"]}
+    context = ReportContext(
+        start_year=args.start_year,
+        end_year=args.start_year + 1,
+        program=args.program or info["program"],
+        semester=args.semester or info["semester"],
+        course_codes=read_course_codes(args.course_codes, result["rating_cube"]["Course"].unique()),
+        score_method=args.score,
+        overall_scores=report_overall_scores(result["rating_cube"], args.score)
+    )
+    pages = list(department_report_pages(result["rating_cube"], result["comments_df"]))
+    faculty_data, course_names, themes = zip(*pages) if pages else ((), (), ())
+
+    # The context and each faculty's tables are pickled to the workers; results come back in order.
+    # When profiling, each render is profiled in its worker and merged into the run's profile.
+    with ArchiveWriter(path=args.output) as archive, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        if profiler is None:
+            renders = pool.map(rendering.render_faculty_artifacts, faculty_data, course_names, repeat(context), themes)
+        else:
+            renders = pool.map(call_with_profile, repeat(rendering.render_faculty_artifacts), faculty_data, course_names, repeat(context), themes)
+        for done, (data, course_name, artifacts) in enumerate(zip(faculty_data, course_names, renders), 1):
+            prefix, details = report_file_details(data, course_name)
+            if profiler is not None:
+                artifacts, seconds, stats = artifacts
+                profiler.add_stats(f"Render {prefix}", seconds, stats)
+            archive.add(f"{prefix}_ratings_report.pdf", artifacts["pdf"], kind="pdf", **details)
+            archive.add(f"{prefix}_ratings_report.txt", artifacts["text"], kind="text", **details)
+            archive.add(f"{prefix}_ratings_chart.png", artifacts["chart"], kind="chart", **details)
+            print(f"[{done}/{len(pages)}] {prefix}", file=sys.stderr)
+    print(f"{args.output}: {len(archive.manifest)} files")
+    write_profile(profiler, args.profile)
+    return 0
+
+# Function to run the harness command
+def run_harness_command(args):
+    """Check the reshaping engines against the reference output and timing baseline; exit status 1 on failure"""
+    # Imported here so the other commands do not pay for it
+    harness = importlib.import_module("golden_harness")
+    result = harness.run_harness(
+        sample_path=args.sample,
+        engines=args.engines,
+        baseline_path=args.baseline,
+        save_baseline_path=args.save_baseline,
+        tolerance=args.tolerance,
+        repeats=args.repeats
+    )
+    print(harness.format_harness_report(result))
+    return 0 if result["passed"] else 1
+
+# Function to run the loadtest command
+def run_loadtest(args):
+    """Simulate concurrent dashboard sessions and print latency percentiles and memory"""
+    # Streamlit is only imported by this command
+    load_test = importlib.import_module("load_test")
+    result = load_test.run_load_test(
+        users=args.users, faculty_switches=args.switches, sample_path=args.sample, distinct=not args.same_file
+    )
+    print(load_test.format_load_report(result, args.users))
+    if args.output:
+        result["records"].to_csv(args.output, index=False)
+        print(f"{args.output}: {len(result['records'])} timings")
+    return 1 if result["errors"] else 0
+
+# Function to run the serve command
+def run_serve(args):
+    """Load each export as its own dataset and serve its reports over HTTP until interrupted"""
+    # Imported here so the other commands do not pay for it
+    service_module = importlib.import_module("report_service")
+    service = service_module.ReportService(cache_entries=args.cache_entries or service_module.RESPONSE_CACHE_ENTRIES)
+    for path in args.input:
+        with open(path, "rb") as handle:
+            content = handle.read()
+        if args.processed:
+            kind, build = "processed", lambda path=path: load_processed_ratings(read_processed_file(path))
+        else:
+            kind, build = "raw", lambda path=path: process_inputs([path])
+        info = extract_info_from_filename(os.path.basename(path))
+
+        # Header details per export; course codes are resolved against the export's courses
+        def make_context(tables, info=info):
+            rating_cube = tables["rating_cube"]
+            course_names = rating_cube["Course"].unique() if "Course" in rating_cube.columns else []
+            # Response-based scores need response counts, which averages files may not have
+            score_method = args.score if tables.get("responses_known", True) else "mean"
+            return ReportContext(
+                start_year=args.start_year,
+                end_year=args.start_year + 1,
+                program=args.program or info["program"],
+                semester=args.semester or info["semester"],
+                course_codes=read_course_codes(args.course_codes, course_names),
+                score_method=score_method,
+                overall_scores=report_overall_scores(rating_cube, score_method)
+            )
+
+        dataset_id = service.add_dataset(os.path.basename(path), kind, [content], build, make_context)
+        print(f"{path}: dataset {dataset_id}", file=sys.stderr)
+    service_module.serve(service, host=args.host, port=args.port, workers=args.workers or service_module.SERVICE_WORKERS)
+    return 0
+
+# Function to run the importtime command
+def run_importtime(args):
+    """Print the import cost of each module"""
+    for module, seconds in measure_import_times(args.modules or DEFAULT_IMPORT_MODULES):
+        print(f"{module:<24} {seconds * 1000:8.1f} ms")
+    return 0
+
+# Function to build the command-line parser
+def build_parser():
+    """Return the argument parser with one subcommand per entry point"""
+    parser = argparse.ArgumentParser(description="Faculty feedback tools that run without the dashboard")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="Process a raw feedback export into long CSV tables")
+    process.add_argument("input", nargs="+", help="Raw feedback exports (CSV or Excel); several are combined")
+    process.add_argument("--output", default="processed", help="Directory for the CSV files")
+    process.add_argument("--profile", metavar="ZIP", help="Profile the run and write the profile ZIP here")
+    process.set_defaults(run=run_process)
+
+    pivot = commands.add_parser("pivot", help="Write the faculty, section, course and response-count pivots as one workbook")
+    pivot.add_argument("input", nargs="+", help="Raw feedback exports (CSV or Excel); several are combined")
+    pivot.add_argument("--processed", action="store_true", help="The inputs are processed files (cube, averages, long or wide) rather than raw exports")
+    pivot.add_argument("--format", choices=list(PIVOT_FORMATS), default="xlsx", help="One Excel workbook, or a ZIP of CSV or Parquet files")
+    pivot.add_argument("--output", help="File to write (default: feedback_pivots.xlsx or .zip)")
+    pivot.add_argument("--profile", metavar="ZIP", help="Profile the run and write the profile ZIP here")
+    pivot.set_defaults(run=run_pivot)
+
+    report = commands.add_parser("report", help="Render every faculty's reports into a ZIP archive using worker processes")
+    report.add_argument("input", nargs="+", help="Raw feedback exports (CSV or Excel); several are combined")
+    report.add_argument("--output", default="feedback_reports.zip", help="ZIP file to write")
+    report.add_argument("--start-year", type=int, default=datetime.now().year, help="First year of the academic year")
+    report.add_argument("--program", help="Program code (default: taken from the file name, e.g. BT-AIML)")
+    report.add_argument("--semester", help="Semester (default: taken from the file name, e.g. Sem-3)")
+    report.add_argument("--course-codes", help="Course code mapping file with course_name and course_code columns")
+    report.add_argument("--score", choices=list(SCORE_METHODS), default="mean", help="Overall score in the reports: " + "; ".join(f"{name} = {text.lower()}" for name, text in SCORE_METHODS.items()))
+    report.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    report.add_argument("--profile", metavar="ZIP", help="Profile processing and every render and write the profile ZIP here")
+    report.set_defaults(run=run_report)
+
+    harness = commands.add_parser("harness", help="Check reshaping engines against the reference output and timings")
+    harness.add_argument("--sample", help="Raw export to derive the synthetic variants from (default: the bundled sample)")
+    harness.add_argument("--engines", nargs="+", help="Engines to check against the reference (default: all)")
+    harness.add_argument("--baseline", help="Timing baseline JSON to check for regressions")
+    harness.add_argument("--save-baseline", help="Write this run's timings to this JSON file")
+    harness.add_argument("--tolerance", type=float, help="Allowed slowdown against the baseline, e.g. 0.5 for 50%% (default: FEEDBACK_PERF_TOLERANCE or 0.5)")
+    harness.add_argument("--repeats", type=int, help="Timed runs per engine and variant; the fastest counts (default: FEEDBACK_TIMING_REPEATS or 3)")
+    harness.set_defaults(run=run_harness_command)
+
+    loadtest = commands.add_parser("loadtest", help="Simulate concurrent dashboard users and report latency and memory")
+    loadtest.add_argument("--users", type=int, default=int(os.environ.get("FEEDBACK_LOAD_USERS", 4)), help="Simultaneous sessions")
+    loadtest.add_argument("--switches", type=int, default=3, help="Faculty selections per session after processing")
+    loadtest.add_argument("--sample", help="Raw export each user uploads (default: the bundled sample)")
+    loadtest.add_argument("--same-file", action="store_true", help="Upload the same file in every session, so processing is shared")
+    loadtest.add_argument("--output", help="CSV file for every recorded timing")
+    loadtest.set_defaults(run=run_loadtest)
+
+    serve = commands.add_parser("serve", help="Serve per-faculty PDF, chart, text and JSON reports over local HTTP")
+    serve.add_argument("input", nargs="+", help="Feedback exports to serve, each as its own dataset")
+    serve.add_argument("--processed", action="store_true", help="The inputs are processed files (cube, averages, long or wide) rather than raw exports")
+    serve.add_argument("--host", default=os.environ.get("FEEDBACK_SERVICE_HOST", "127.0.0.1"), help="Address to listen on")
+    serve.add_argument("--port", type=int, default=int(os.environ.get("FEEDBACK_SERVICE_PORT", 8600)), help="Port to listen on")
+    serve.add_argument("--workers", type=int, help="Threads answering requests (default: FEEDBACK_SERVICE_WORKERS or CPUs + 2, at most 8)")
+    serve.add_argument("--cache-entries", type=int, help="Rendered responses kept in memory (default: FEEDBACK_SERVICE_CACHE_ENTRIES or 256)")
+    serve.add_argument("--start-year", type=int, default=datetime.now().year, help="First year of the academic year")
+    serve.add_argument("--program", help="Program code (default: taken from each file name, e.g. BT-AIML)")
+    serve.add_argument("--semester", help="Semester (default: taken from each file name, e.g. Sem-3)")
+    serve.add_argument("--course-codes", help="Course code mapping file with course_name and course_code columns")
+    serve.add_argument("--score", choices=list(SCORE_METHODS), default="mean", help="Overall score in the reports and JSON (see report --help)")
+    serve.set_defaults(run=run_serve)
+
+    importtime = commands.add_parser("importtime", help="Measure how long modules take to import")
+    importtime.add_argument("modules", nargs="*", help=f"Modules to time (default: {' '.join(DEFAULT_IMPORT_MODULES)})")
+    importtime.set_defaults(run=run_importtime)
+    return parser
+
+# Function to run the command line
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
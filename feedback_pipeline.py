@@ -0,0 +1,774 @@
+import io
+import logging
+import os
+import re
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from comment_search import CommentIndex
+from course_analytics import build_course_cube
+from ingest_worker import INGEST_WORKERS, discard_ingest_pool, get_ingest_pool, ingest_file
+from profiling import call_with_profile, profile_stage
+from program_info import extract_info_from_filename
+from rating_stats import build_rating_cube
+
+# Verification summaries of processed data are logged here at DEBUG level
+logger = logging.getLogger(__name__)
+
+# Patterns that identify a faculty name column inside a course block
+FACULTY_COLUMN_PATTERNS = ["name of the faculty", "faculty name", "name of faculty"]
+
+# How often the row loop reports progress
+PROGRESS_EVERY_ROWS = 25
+
+# Engine that turns raw rows into long tables (see RESHAPE_ENGINES); 'reference' is the original row loop
+RESHAPE_ENGINE = os.environ.get("FEEDBACK_RESHAPE_ENGINE", "vectorized")
+
+# Function to verify data processing
+def verify_data_processing(faculty_ratings_df, comments_df, course_feedback_df):
+    """Log a verification summary of the processed tables, per course, at DEBUG level"""
+    # Skipped entirely unless debug logging is on, so jobs, the service and the harness pay nothing
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    lines = ["Data Processing Verification:", "-" * 50]
+    
+    # Verify faculty ratings
+    lines += ["", "Faculty Ratings Summary:", f"Total records: {len(faculty_ratings_df)}", "", "Unique courses:"]
+    lines += [f"- {course}: {count} ratings" for course, count in faculty_ratings_df['Course'].value_counts().sort_index().items()]
+    
+    # Verify faculty-course combinations
+    faculty_course = faculty_ratings_df.groupby(['Faculty Name', 'Course']).size().reset_index()
+    lines += ["", "Faculty-Course combinations:"]
+    lines += [f"- {faculty} - {course}" for faculty, course in zip(faculty_course['Faculty Name'], faculty_course['Course'])]
+    
+    # Verify comments
+    if not comments_df.empty:
+        lines += ["", "Comments Summary:", f"Total comments: {len(comments_df)}", "", "Comments per course:"]
+        lines += [f"- {course}: {count} comments" for course, count in comments_df['Course'].value_counts().sort_index().items()]
+    
+    # Verify course feedback
+    if not course_feedback_df.empty:
+        lines += ["", "Course Feedback Summary:", f"Total feedback entries: {len(course_feedback_df)}", "", "Feedback per course:"]
+        lines += [f"- {course}: {count} feedback entries" for course, count in course_feedback_df['Course'].value_counts().sort_index().items()]
+    logger.debug("\n".join(lines))
+
+# Function to extract section information from faculty name
+def extract_section_from_faculty_name(faculty_name):
+    """
+    Extract section information from faculty name field
+    Examples:
+    - "Section A - Dr. Smith" returns "A", "Dr. Smith"
+    - "Dr. Smith - Section B" returns "B", "Dr. Smith"
+    """
+    faculty_name = str(faculty_name).strip()
+    
+    # Try to match "Section X - Faculty Name" pattern
+    pattern1 = re.search(r'(?i)section\s+([A-Z0-9]+)\s*[-:]?\s*(.*)', faculty_name)
+    if pattern1:
+        section = pattern1.group(1).strip()
+        name = pattern1.group(2).strip()
+        return section, name
+    
+    # Try to match "Faculty Name - Section X" pattern - FIX: moved flag to beginning or use re.IGNORECASE
+    pattern2 = re.search(r'(?i)(.*?)\s*[-:]\s*section\s+([A-Z0-9]+)', faculty_name)
+    if pattern2:
+        name = pattern2.group(1).strip()
+        section = pattern2.group(2).strip()
+        return section, name
+        
+    # If no section info found, return None for section
+    return None, faculty_name
+
+# Function to find the columns that belong to one faculty in a course block
+def get_columns_for_faculty(all_columns, course_columns, faculty_col_idx):
+    """
+    Get columns that are likely related to the faculty at faculty_col_idx.
+    Uses proximity in the column layout to determine relevant columns.
+    
+    Parameters:
+    - all_columns: List of all column names in the dataframe
+    - course_columns: List of column indices for the current course
+    - faculty_col_idx: Index of the specific faculty column to process
+    
+    Returns:
+    - List of column indices relevant to this faculty
+    """
+    # Start with all columns in this course block
+    relevant_cols = course_columns.copy()
+    
+    # If there's only one faculty column, return all columns
+    faculty_cols = [i for i in course_columns if 'Name of the Faculty' in all_columns[i]]
+    if len(faculty_cols) <= 1:
+        return course_columns
+    
+    # Sort faculty columns
+    faculty_cols.sort()
+    
+    # Find boundaries of this faculty's section
+    # Find position of current faculty column in the sorted list
+    current_idx = faculty_cols.index(faculty_col_idx)
+    
+    # Set start boundary (beginning of course or after previous faculty)
+    start_boundary = 0 if current_idx == 0 else faculty_cols[current_idx - 1]
+    
+    # Set end boundary (end of course or before next faculty)
+    end_boundary = float('inf') if current_idx == len(faculty_cols) - 1 else faculty_cols[current_idx + 1]
+    
+    # Filter to columns between boundaries
+    relevant_cols = [col for col in course_columns if start_boundary <= col < end_boundary]
+    
+    return relevant_cols
+
+# Function to split the raw columns into per-course blocks
+def identify_course_columns(columns):
+    """
+    Identify which columns belong to which course/faculty block
+    
+    Parameters:
+    - columns: List of column names in the dataframe
+    
+    Returns:
+    - List of tuples with (course_name, [column_indices])
+    """
+    course_blocks = []
+    current_block = []
+    current_course = None
+
+    for i, col in enumerate(columns):
+        if isinstance(col, str) and col.startswith('Feedback on '):
+            if current_block:
+                course_blocks.append((current_course, current_block))
+                current_block = []
+            current_course = col
+            current_block = []
+        elif current_course is not None:
+            current_block.append(i)
+
+    # Add the last block
+    if current_block:
+        course_blocks.append((current_course, current_block))
+
+    return course_blocks
+
+# Default exclusion rules for the response quality stage
+DEFAULT_QUALITY_RULES = {
+    "drop_duplicate_srn": True,   # Keep only the latest submission of each SRN
+    "drop_straight_lined": True,  # Drop students who gave the same answer to every faculty question
+    "max_variance": 0.0,          # Answer variance at or below this counts as straight-lined
+    "min_answers": 5              # Students with fewer answers are never judged straight-lined
+}
+
+# Format of the 'Completion Date and Time' column in the raw export
+COMPLETION_TIME_FORMAT = "%d-%m-%Y %H:%M"
+
+# Function to find the rating columns of the raw export
+def identify_rating_columns(columns):
+    """Return the faculty rating and course feedback question columns"""
+    return [col for col in columns if 'Please give a rating' in col or 'The course' in col]
+
+# Function to parse completion timestamps of the raw export
+def parse_completion_times(values):
+    """Parse 'Completion Date and Time' values (dd-mm-YYYY HH:MM) into a datetime Series; unparseable values become NaT"""
+    values = pd.Series(values)
+    parsed = pd.to_datetime(values, format=COMPLETION_TIME_FORMAT, errors="coerce")
+    unparsed = parsed.isna() & values.notna()
+    if unparsed.any():
+        # Fall back to day-first parsing for exports with seconds or other separators
+        parsed[unparsed] = pd.to_datetime(values[unparsed], dayfirst=True, errors="coerce")
+    return parsed
+
+# Function to flag low-quality student submissions
+def check_response_quality(raw_df, rules=None):
+    """
+    Flag duplicate and straight-lined submissions over the whole wide response matrix at once.
+
+    Straight-lining is judged on the faculty rating questions, which share one 1-5 scale.
+
+    Parameters:
+    - raw_df: DataFrame of the raw feedback export (one row per student)
+    - rules: Dict overriding DEFAULT_QUALITY_RULES
+
+    Returns:
+    - Tuple (keep, report): a boolean numpy array over raw_df rows, and a DataFrame
+      with one row per dropped submission ('Row', 'Student', 'SRN', 'Completed',
+      'Answers', 'Variance', 'Reason')
+    """
+    rules = {**DEFAULT_QUALITY_RULES, **(rules or {})}
+    columns = ["Row", "Student", "SRN", "Completed", "Answers", "Variance", "Reason"]
+    keep = np.ones(len(raw_df), dtype=bool)
+    if raw_df.empty or 'SRN' not in raw_df.columns:
+        return keep, pd.DataFrame(columns=columns)
+
+    # Answer count and variance per student over the 1-5 faculty questions only; the 1-3 course
+    # questions are on another scale, so top answers everywhere (all 5s and 3s) would not count
+    rating_cols = [col for col in raw_df.columns if 'Please give a rating' in col]
+    matrix = raw_df[rating_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    answered = ~np.isnan(matrix)
+    answers = answered.sum(axis=1)
+    values = np.where(answered, matrix, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = values.sum(axis=1) / answers
+        variance = (values ** 2).sum(axis=1) / answers - mean ** 2
+    variance = np.where(answers > 0, np.maximum(variance, 0.0), np.nan)
+
+    srn = raw_df['SRN'].astype("string").str.strip().str.upper()
+    students = raw_df['Name of the Student'] if 'Name of the Student' in raw_df.columns else pd.Series(None, index=raw_df.index)
+    if 'Completion Date and Time' in raw_df.columns:
+        completed = parse_completion_times(raw_df['Completion Date and Time'])
+    else:
+        completed = pd.Series(pd.NaT, index=raw_df.index, dtype="datetime64[ns]")
+    candidates = (srn.notna() & (srn != "") & students.notna()).to_numpy()
+
+    reasons = np.full(len(raw_df), "", dtype=object)
+
+    if rules["drop_duplicate_srn"]:
+        # Sort by SRN then completion time; every submission but the last of an SRN is a duplicate
+        order = pd.DataFrame({"SRN": srn.to_numpy(), "Completed": completed.to_numpy(), "Row": np.arange(len(raw_df))})[candidates]
+        order = order.sort_values(["SRN", "Completed", "Row"], na_position="first", kind="stable")
+        duplicate_rows = order.loc[order.duplicated(subset="SRN", keep="last"), "Row"].to_numpy()
+        reasons[duplicate_rows] = "duplicate SRN (older submission)"
+
+    if rules["drop_straight_lined"]:
+        straight = candidates & (answers >= rules["min_answers"]) & (variance <= rules["max_variance"] + 1e-9)
+        straight &= reasons == ""
+        reasons[straight] = [f"straight-lined (all answers {value:g})" for value in mean[straight]]
+
+    dropped = reasons != ""
+    keep &= ~dropped
+    report = pd.DataFrame({
+        "Row": np.flatnonzero(dropped),
+        "Student": students.to_numpy()[dropped],
+        "SRN": srn.to_numpy()[dropped],
+        "Completed": completed.to_numpy()[dropped],
+        "Answers": answers[dropped],
+        "Variance": variance[dropped],
+        "Reason": reasons[dropped]
+    }, columns=columns)
+    return keep, report
+
+# Function to list the submissions of the raw export
+def build_submissions(raw_df):
+    """Return one row per student submission: 'Student', 'SRN', 'Status' and the parsed 'Completed' time"""
+    submissions = pd.DataFrame({
+        'Student': raw_df['Name of the Student'] if 'Name of the Student' in raw_df.columns else None,
+        'SRN': raw_df['SRN'] if 'SRN' in raw_df.columns else None,
+        'Status': raw_df['Status'] if 'Status' in raw_df.columns else None
+    }, index=raw_df.index)
+    if 'Completion Date and Time' in raw_df.columns:
+        submissions['Completed'] = parse_completion_times(raw_df['Completion Date and Time'])
+    else:
+        submissions['Completed'] = pd.NaT
+    return submissions.dropna(subset=['Student', 'SRN']).reset_index(drop=True)
+
+# Function to transform a raw feedback export into the processed datasets
+def process_raw_feedback(raw_df, progress=None, quality_rules=None, profiler=None):
+    """
+    Reshape raw survey rows into long faculty ratings, comments and course feedback,
+    then aggregate them for the dashboard.
+    
+    Parameters:
+    - raw_df: DataFrame of the raw feedback export (one row per student)
+    - progress: Optional callable progress(stage, fraction) called as stages advance;
+      it may raise to cancel processing
+    - quality_rules: Optional dict overriding DEFAULT_QUALITY_RULES
+    - profiler: Optional RunProfiler that profiles the reshape and aggregation stages
+    
+    Returns:
+    - Dictionary with faculty_ratings_df, comments_df, course_feedback_df,
+      avg_ratings, rating_cube, course_cube, comment_index, quality_report and submissions
+    """
+    with profile_stage(profiler, "Reshape raw rows"):
+        tables = reshape_raw_feedback(raw_df, progress, quality_rules)
+    with profile_stage(profiler, "Aggregate"):
+        return aggregate_feedback(tables, progress)
+
+# Function to reshape raw rows one student at a time (the reference engine)
+def reshape_rows_reference(raw_df, course_blocks, progress=None):
+    """
+    Walk every student row and course block and collect long faculty ratings, comments and course feedback.
+    
+    This is the original row loop; other engines must produce exactly the same tables
+    (see golden_harness).
+    
+    Returns:
+    - Tuple (faculty_ratings_df, comments_df, course_feedback_df) before names and categories are cleaned
+    """
+    # Initialize empty lists to store the transformed data
+    student_names = []
+    srns = []
+    sections = []
+    faculty_names = []
+    courses = []
+    rating_types = []
+    ratings = []
+    course_feedbacks = []
+    comments = []
+
+    # Process each row
+    total_rows = max(len(raw_df), 1)
+    for row_number, (index, row) in enumerate(raw_df.iterrows()):
+        if progress is not None and row_number % PROGRESS_EVERY_ROWS == 0:
+            progress("Reshaping responses", row_number / total_rows)
+        
+        student_name = row.get('Name of the Student', None)
+        srn = row.get('SRN', None)
+        section = row.get('Section', None)  # This stays as a backup
+
+        if pd.isna(student_name) or pd.isna(srn):
+            continue
+
+        # Process each course block
+        for course_name, column_indices in course_blocks:
+            # Use broader pattern matching for faculty columns
+            faculty_cols = [i for i in column_indices if 
+                        any(pattern in raw_df.columns[i].lower() for pattern in FACULTY_COLUMN_PATTERNS)]
+
+            # Process each faculty in this course block
+            for faculty_col_idx in faculty_cols:
+                # Extract faculty name
+                raw_faculty_name = str(row[raw_df.columns[faculty_col_idx]])
+                if pd.isna(raw_faculty_name) or raw_faculty_name.strip() == '':
+                    continue
+
+                # Extract section and clean faculty name
+                section_from_faculty, faculty_name = extract_section_from_faculty_name(raw_faculty_name)
+
+                # Use section from faculty name if available, otherwise use the section column
+                effective_section = section_from_faculty if section_from_faculty else section
+
+                # Find question columns related to this faculty
+                # Use column proximity to connect questions to faculty
+                relevant_cols = get_columns_for_faculty(raw_df.columns, column_indices, faculty_col_idx)
+
+                # Extract rating questions for this faculty
+                question_cols = [i for i in relevant_cols if 'Please give a rating' in raw_df.columns[i]]
+
+                # Process each question related to this faculty
+                for q_col in question_cols:
+                    # ...existing code to process ratings...
+                    question = raw_df.columns[q_col]
+                    rating = row[raw_df.columns[q_col]]
+
+                    if not pd.isna(rating):
+                        student_names.append(student_name)
+                        srns.append(srn)
+                        sections.append(effective_section)  # Use the extracted section
+                        faculty_names.append(faculty_name)  # Use the clean faculty name
+                        courses.append(course_name)
+                        rating_types.append(question)
+                        ratings.append(rating)
+
+                # Get comments if available
+                comment_col = [i for i in relevant_cols if raw_df.columns[i] == 'Comments']
+                if comment_col:
+                    comment = row[raw_df.columns[comment_col[0]]]
+                    if not pd.isna(comment):
+                        comments.append({
+                            'Student': student_name,
+                            'SRN': srn,
+                            'Faculty': faculty_name,
+                            'Course': course_name,
+                            'Comment': comment
+                        })
+
+                # Get course feedback questions
+                course_feedback_cols = [i for i in relevant_cols if 'The course' in raw_df.columns[i]]
+                for cf_col in course_feedback_cols:
+                    question = raw_df.columns[cf_col]
+                    rating = row[raw_df.columns[cf_col]]
+
+                    if not pd.isna(rating):
+                        course_feedbacks.append({
+                            'Student': student_name,
+                            'SRN': srn,
+                            'Course': course_name,
+                            'Question': question,
+                            'Rating': rating
+                        })
+
+    # Create the main faculty ratings DataFrame
+    faculty_ratings_df = pd.DataFrame({
+        'Student Name': student_names,
+        'SRN': srns,
+        'Section': sections,
+        'Faculty Name': faculty_names,
+        'Course': courses,
+        'Rating Category': rating_types,
+        'Rating': ratings
+    })
+
+    # Create the comments DataFrame
+    comments_df = pd.DataFrame(comments)
+
+    # Create the course feedback DataFrame
+    course_feedback_df = pd.DataFrame(course_feedbacks)
+
+    return faculty_ratings_df, comments_df, course_feedback_df
+
+# Function to work out, once per file, which columns each faculty's rows come from
+def build_reshape_plan(columns, course_blocks):
+    """
+    List the faculty columns of every course block with the columns the row loop reads for them.
+    
+    Parameters:
+    - columns: Column names of the raw export
+    - course_blocks: Output of identify_course_columns
+    
+    Returns:
+    - List of dicts in row-loop order with 'course', 'faculty' (column index), 'questions',
+      'comment' (index or None) and 'course_feedback' (lists of column indices)
+    """
+    plan = []
+    for course_name, column_indices in course_blocks:
+        faculty_cols = [i for i in column_indices if
+                        any(pattern in columns[i].lower() for pattern in FACULTY_COLUMN_PATTERNS)]
+        for faculty_col_idx in faculty_cols:
+            relevant_cols = get_columns_for_faculty(columns, column_indices, faculty_col_idx)
+            comment_cols = [i for i in relevant_cols if columns[i] == 'Comments']
+            plan.append({
+                'course': course_name,
+                'faculty': faculty_col_idx,
+                'questions': [i for i in relevant_cols if 'Please give a rating' in columns[i]],
+                'comment': comment_cols[0] if comment_cols else None,
+                'course_feedback': [i for i in relevant_cols if 'The course' in columns[i]]
+            })
+    return plan
+
+# Function to reshape raw rows a column block at a time (the vectorized engine)
+def reshape_rows_vectorized(raw_df, course_blocks, progress=None):
+    """
+    Produce the same tables as reshape_rows_reference from whole-column array selections.
+    
+    The column plan does not depend on the row, so each faculty column's answers are taken
+    for all students at once and the long rows are put back in the row loop's order
+    (student, then course block and faculty, then question).
+    
+    Returns:
+    - Tuple (faculty_ratings_df, comments_df, course_feedback_df) before names and categories are cleaned
+    """
+    columns = raw_df.columns
+    # The same cell objects iterrows hands to the row loop
+    values = raw_df.to_numpy()
+    
+    def column_values(name):
+        if name in columns:
+            return values[:, columns.get_loc(name)]
+        return np.full(len(raw_df), None, dtype=object)
+    
+    student_values = column_values('Name of the Student')
+    srn_values = column_values('SRN')
+    section_values = column_values('Section')
+    rows = np.flatnonzero(~(pd.isna(student_values) | pd.isna(srn_values)))
+    
+    plan = build_reshape_plan(columns, course_blocks)
+    ratings = []
+    comments = []
+    course_feedbacks = []
+    faculty_cache = {}
+    for step, entry in enumerate(plan):
+        if progress is not None:
+            progress("Reshaping responses", step / max(len(plan), 1))
+        
+        # Blank faculty cells are skipped; missing ones become 'nan' exactly as str() makes them in the row loop
+        raw_names = [str(value) for value in values[rows, entry['faculty']]]
+        named = np.array([name.strip() != '' for name in raw_names], dtype=bool)
+        faculty_rows = rows[named]
+        if len(faculty_rows) == 0:
+            continue
+        parsed = [faculty_cache.setdefault(name, extract_section_from_faculty_name(name))
+                  for name, keep in zip(raw_names, named) if keep]
+        faculty_names = np.array([name for _, name in parsed], dtype=object)
+        sections = np.array(
+            [section_from_faculty if section_from_faculty else section
+             for (section_from_faculty, _), section in zip(parsed, section_values[faculty_rows])],
+            dtype=object
+        )
+        
+        # Ratings: one long row per answered question, keyed for re-ordering
+        for order, q_col in enumerate(entry['questions']):
+            answers = values[faculty_rows, q_col]
+            answered = ~pd.isna(answers)
+            ratings.append((faculty_rows[answered], step, order, sections[answered], faculty_names[answered],
+                            entry['course'], columns[q_col], answers[answered]))
+        
+        if entry['comment'] is not None:
+            texts = values[faculty_rows, entry['comment']]
+            answered = ~pd.isna(texts)
+            comments.append((faculty_rows[answered], step, 0, faculty_names[answered], entry['course'], texts[answered]))
+        
+        for order, cf_col in enumerate(entry['course_feedback']):
+            answers = values[faculty_rows, cf_col]
+            answered = ~pd.isna(answers)
+            course_feedbacks.append((faculty_rows[answered], step, order, entry['course'], columns[cf_col], answers[answered]))
+    
+    faculty_ratings = _row_loop_order(ratings)
+    faculty_ratings_df = pd.DataFrame({
+        'Student Name': student_values[faculty_ratings[0]].tolist(),
+        'SRN': srn_values[faculty_ratings[0]].tolist(),
+        'Section': faculty_ratings[1].tolist(),
+        'Faculty Name': faculty_ratings[2].tolist(),
+        'Course': faculty_ratings[3].tolist(),
+        'Rating Category': faculty_ratings[4].tolist(),
+        'Rating': faculty_ratings[5].tolist()
+    })
+    
+    # Empty comment and course feedback tables have no columns, as in the row loop
+    comments_df = pd.DataFrame()
+    if comments:
+        comment_rows = _row_loop_order(comments)
+        comments_df = pd.DataFrame({
+            'Student': student_values[comment_rows[0]].tolist(),
+            'SRN': srn_values[comment_rows[0]].tolist(),
+            'Faculty': comment_rows[1].tolist(),
+            'Course': comment_rows[2].tolist(),
+            'Comment': comment_rows[3].tolist()
+        })
+    
+    course_feedback_df = pd.DataFrame()
+    if course_feedbacks:
+        feedback_rows = _row_loop_order(course_feedbacks)
+        course_feedback_df = pd.DataFrame({
+            'Student': student_values[feedback_rows[0]].tolist(),
+            'SRN': srn_values[feedback_rows[0]].tolist(),
+            'Course': feedback_rows[1].tolist(),
+            'Question': feedback_rows[2].tolist(),
+            'Rating': feedback_rows[3].tolist()
+        })
+    
+    return faculty_ratings_df, comments_df, course_feedback_df
+
+# Function to put vectorized pieces back into row-loop order
+def _row_loop_order(pieces):
+    # Each piece is (rows, plan step, column order, *fields); fields are arrays or one scalar per piece
+    if not pieces:
+        return [np.array([], dtype=np.intp)] + [np.array([], dtype=object)] * 5
+    sizes = [len(piece[0]) for piece in pieces]
+    rows = np.concatenate([piece[0] for piece in pieces])
+    steps = np.repeat([piece[1] for piece in pieces], sizes)
+    orders = np.repeat([piece[2] for piece in pieces], sizes)
+    # Student first, then course block and faculty, then question
+    sort = np.lexsort((orders, steps, rows))
+    fields = []
+    for field in range(3, len(pieces[0])):
+        parts = [piece[field] if isinstance(piece[field], np.ndarray) else np.full(size, piece[field], dtype=object)
+                 for piece, size in zip(pieces, sizes)]
+        fields.append(np.concatenate(parts).astype(object)[sort])
+    return [rows[sort]] + fields
+
+# Row reshaping engines; golden_harness checks every engine against the reference
+RESHAPE_ENGINES = {
+    'reference': reshape_rows_reference,
+    'vectorized': reshape_rows_vectorized
+}
+
+# Function to reshape a raw feedback export into long tables
+def reshape_raw_feedback(raw_df, progress=None, quality_rules=None, engine=None):
+    """
+    Reshape raw survey rows into long faculty ratings, comments and course feedback.
+    
+    Parameters:
+    - engine: Name of the row reshaping engine in RESHAPE_ENGINES (defaults to RESHAPE_ENGINE)
+    
+    Returns:
+    - Dictionary with faculty_ratings_df, comments_df, course_feedback_df, quality_report and submissions
+    """
+    if progress is not None:
+        progress("Checking response quality", 0.0)
+    
+    # Drop duplicate and straight-lined submissions before anything is counted
+    keep, quality_report = check_response_quality(raw_df, quality_rules)
+    raw_df = raw_df[keep]
+    
+    # One row per kept submission with its completion time, for the response timeline
+    submissions = build_submissions(raw_df)
+    
+    # Identify course blocks
+    course_blocks = identify_course_columns(raw_df.columns)
+    
+    # Turn each student's answers into long rows with the selected engine
+    engine = engine or RESHAPE_ENGINE
+    if engine not in RESHAPE_ENGINES:
+        raise ValueError(f"Unknown reshaping engine '{engine}'. Use one of: {', '.join(RESHAPE_ENGINES)}.")
+    reshape_rows = RESHAPE_ENGINES[engine]
+    faculty_ratings_df, comments_df, course_feedback_df = reshape_rows(raw_df, course_blocks, progress)
+
+    # Clean faculty names
+    faculty_ratings_df['Faculty Name'] = faculty_ratings_df['Faculty Name'].astype(str).str.replace(r"Section[ -]?[A-Z]?[ -]?", "", regex=True).str.strip()
+
+    # Make sure section values are strings so they can be matched and grouped
+    faculty_ratings_df['Section'] = faculty_ratings_df['Section'].astype(str).fillna('')
+
+    # Clean the rating categories
+    faculty_ratings_df['Rating Category'] = (
+        faculty_ratings_df['Rating Category']
+        .str.strip()
+        .str.lower()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.split("(").str[0]
+        .str.strip()
+    )
+
+    # Convert rating to numeric
+    faculty_ratings_df['Rating'] = pd.to_numeric(faculty_ratings_df['Rating'], errors='coerce')
+    
+    return {
+        'faculty_ratings_df': faculty_ratings_df,
+        'comments_df': comments_df,
+        'course_feedback_df': course_feedback_df,
+        'quality_report': quality_report,
+        'submissions': submissions
+    }
+
+# Function to aggregate reshaped feedback for the dashboard
+def aggregate_feedback(tables, progress=None):
+    """
+    Add averages, the rating and course cubes and the comment index to reshaped tables.
+    
+    Parameters:
+    - tables: Dictionary from reshape_raw_feedback (or several of them combined)
+    - progress: Optional callable progress(stage, fraction)
+    
+    Returns:
+    - The tables plus avg_ratings, rating_cube, course_cube and comment_index
+    """
+    faculty_ratings_df = tables['faculty_ratings_df']
+    comments_df = tables['comments_df']
+    course_feedback_df = tables['course_feedback_df']
+    
+    if progress is not None:
+        progress("Aggregating ratings", 0.0)
+    
+    # Compute averages for visualization
+    avg_ratings = (
+        faculty_ratings_df.groupby(["Faculty Name", "Rating Category"], as_index=False)
+        .agg({"Rating": "mean"})
+    )
+    
+    # Aggregate once for the department-wide views
+    rating_cube = build_rating_cube(faculty_ratings_df)
+    
+    # Aggregate course feedback on the same machinery
+    course_cube = build_course_cube(course_feedback_df)
+    
+    if progress is not None:
+        progress("Indexing comments", 0.0)
+    
+    # Index comments once for search
+    comment_index = CommentIndex(comments_df)
+    
+    # Verify data processing
+    verify_data_processing(faculty_ratings_df, comments_df, course_feedback_df)
+    
+    return {
+        **tables,
+        'avg_ratings': avg_ratings,
+        'rating_cube': rating_cube,
+        'course_cube': course_cube,
+        'comment_index': comment_index
+    }
+
+# Function to read an uploaded raw feedback file from its bytes
+def read_feedback_file(name, content):
+    """Read a raw feedback export (CSV or Excel) from the file's bytes"""
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(content))
+    return pd.read_excel(io.BytesIO(content))
+
+# Function to parse and reshape one file of a multi-file upload
+def ingest_feedback_file(name, content, quality_rules=None):
+    """
+    Read and reshape one raw export, tagging every table with the file's program and semester.
+
+    A module-level function of picklable arguments, so it can run in a worker process.
+
+    Returns:
+    - Dictionary from reshape_raw_feedback; each table gains 'Program' and 'Semester'
+      columns, and the quality report a 'File' column
+    """
+    info = extract_info_from_filename(name)
+    tables = reshape_raw_feedback(read_feedback_file(name, content), quality_rules=quality_rules)
+    tags = {'Program': info['program'] or os.path.splitext(name)[0], 'Semester': info['semester'] or ''}
+    tagged = {key: table.assign(**tags) for key, table in tables.items()}
+    tagged['quality_report'] = tagged['quality_report'].assign(File=name)
+    return tagged
+
+# Function to combine the reshaped tables of several files
+def combine_feedback_tables(parts):
+    """
+    Concatenate tables from ingest_feedback_file into one set.
+
+    When the files cover more than one program or semester, sections are prefixed with
+    them (e.g. 'AIML-A', 'CSE-A', or 'AIML Sem 3-A' across semesters) so that
+    same-named sections of different programs stay apart in every section view.
+    """
+    combined = {key: pd.concat([part[key] for part in parts], ignore_index=True) for key in parts[0]}
+    ratings = combined['faculty_ratings_df']
+    programs = ratings['Program'].astype(str)
+    semesters = ratings['Semester'].astype(str)
+    if programs.nunique() > 1 or semesters.nunique() > 1:
+        label = programs if semesters.nunique() == 1 else programs + " Sem " + semesters
+        sections = ratings['Section'].astype(str)
+        ratings['Section'] = label.where(sections == "", label + "-" + sections)
+    return combined
+
+# Function to process several raw feedback files into one dataset
+def process_feedback_files(files, progress=None, quality_rules=None, max_workers=None, profiler=None):
+    """
+    Parse and reshape several raw exports in worker processes, then aggregate them together.
+
+    Parameters:
+    - files: List of (file name, file bytes); program and semester come from the names
+    - progress: Optional callable progress(stage, fraction); it may raise to cancel
+    - quality_rules: Optional dict overriding DEFAULT_QUALITY_RULES
+    - max_workers: 1 reshapes every file in this process; otherwise the files go to the
+      shared ingest pool of INGEST_WORKERS processes (see ingest_worker)
+    - profiler: Optional RunProfiler; each file is profiled in its worker and merged into it
+
+    Returns:
+    - Dictionary like process_raw_feedback, with 'Program' and 'Semester' on every table
+    """
+    workers = min(max_workers or INGEST_WORKERS, len(files))
+    parts = [None] * len(files)
+    done = 0
+    if progress is not None:
+        progress(f"Reading {len(files)} files", 0.0)
+    if workers <= 1:
+        for number, (name, content) in enumerate(files):
+            with profile_stage(profiler, f"Reshape {name}"):
+                parts[number] = ingest_feedback_file(name, content, quality_rules)
+            done += 1
+            if progress is not None:
+                progress(f"Reshaped {done} of {len(files)} files", done / len(files))
+    else:
+        pool = get_ingest_pool()
+        futures = {
+            (pool.submit(call_with_profile, ingest_file, name, content, quality_rules) if profiler is not None
+             else pool.submit(ingest_file, name, content, quality_rules)): number
+            for number, (name, content) in enumerate(files)
+        }
+        try:
+            for future in as_completed(futures):
+                number = futures[future]
+                if profiler is not None:
+                    parts[number], seconds, stats = future.result()
+                    profiler.add_stats(f"Reshape {files[number][0]}", seconds, stats)
+                else:
+                    parts[number] = future.result()
+                done += 1
+                if progress is not None:
+                    progress(f"Reshaped {done} of {len(files)} files", done / len(files))
+        except BrokenProcessPool:
+            discard_ingest_pool(pool)
+            raise
+        finally:
+            # The pool is shared, so only this upload's files that have not started are dropped
+            for future in futures:
+                future.cancel()
+
+    # Combine in upload order so results do not depend on which worker finished first
+    with profile_stage(profiler, "Aggregate"):
+        combined = combine_feedback_tables(parts)
+        return aggregate_feedback(combined, progress)
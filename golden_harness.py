@@ -0,0 +1,254 @@
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from feedback_pipeline import RESHAPE_ENGINES, aggregate_feedback, reshape_raw_feedback
+
+# Golden-output and timing harness for the row reshaping engines: every engine must produce
+# exactly the reference row loop's long tables and aggregates, on the sample export and on
+# synthetic variants of it, and must not get slower than a saved timing baseline.
+
+# Sample export the variants are derived from
+HARNESS_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feedback-raw data.csv")
+
+# Students in the bundled sample who gave every faculty question the same answer; the default
+# quality rules must flag them
+SAMPLE_STRAIGHT_LINED_SRNS = ["R23EA020", "R23EA152", "R23EA179", "R23EA142", "R23EA017"]
+
+# Tables that must match the reference exactly
+LONG_TABLES = ["faculty_ratings_df", "comments_df", "course_feedback_df", "quality_report", "submissions"]
+AGGREGATE_TABLES = ["avg_ratings", "rating_cube", "course_cube"]
+
+# Allowed slowdown against the baseline before a timing counts as a regression (0.5 = 50% slower)
+PERF_TOLERANCE = float(os.environ.get("FEEDBACK_PERF_TOLERANCE", 0.5))
+
+# Slowdowns smaller than this many seconds are treated as timer noise
+PERF_NOISE_FLOOR = 0.1
+
+# Runs per engine and variant; the fastest run is kept
+TIMING_REPEATS = int(os.environ.get("FEEDBACK_TIMING_REPEATS", 3))
+
+# Student rows of the scaled-up variant used for timing
+SCALED_ROWS = 2000
+
+# Function to read a frame back the way an uploaded CSV is read
+def _round_trip(df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+# Function to list the faculty columns of the raw export
+def _faculty_columns(raw_df):
+    return [col for col in raw_df.columns if "faculty" in str(col).lower()]
+
+# Function to build a block with two faculty columns
+def _with_second_faculty(raw_df, seed):
+    """Give the first block with a 'Name of the Faculty' column a second faculty and a copy of its questions"""
+    rng = np.random.default_rng(seed)
+    columns = list(raw_df.columns)
+    faculty_col = next(col for col in columns if str(col).startswith("Name of the Faculty"))
+    start = columns.index(faculty_col)
+    questions = []
+    for col in columns[start + 1:]:
+        if "Please give a rating" not in str(col):
+            break
+        questions.append(col)
+
+    # The second faculty's columns go between the questions and the block's comments
+    names = raw_df[_faculty_columns(raw_df)[-1]].to_numpy()
+    added = {"Name of the Faculty (second)": rng.permutation(names)}
+    for col in questions:
+        added[f"{col} second"] = rng.permutation(raw_df[col].to_numpy())
+    insert_at = start + 1 + len(questions)
+    parts = [raw_df.iloc[:, :insert_at], pd.DataFrame(added, index=raw_df.index), raw_df.iloc[:, insert_at:]]
+    return pd.concat(parts, axis=1)
+
+# Function to build the synthetic variants of the sample export
+def synthetic_variants(raw_df, seed=0, scaled_rows=SCALED_ROWS):
+    """
+    Derive edge-case exports from a raw export.
+
+    Returns:
+    - Dict of variant name to DataFrame, each read back from CSV like an upload:
+      'sample', 'multi_faculty' (two faculty in one block), 'missing_srn' (blank SRNs and
+      student names), 'blank_faculty' (missing and whitespace faculty cells),
+      'section_prefix' (sections written into faculty names) and 'scaled' (repeated rows)
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(raw_df))
+    variants = {"sample": raw_df}
+
+    variants["multi_faculty"] = _with_second_faculty(raw_df, seed)
+
+    missing = raw_df.copy()
+    missing.loc[rows % 7 == 3, "SRN"] = np.nan
+    missing.loc[rows % 11 == 5, "Name of the Student"] = np.nan
+    variants["missing_srn"] = missing
+
+    blank = raw_df.copy()
+    for number, col in enumerate(_faculty_columns(raw_df)):
+        blank[col] = blank[col].astype(object)
+        blank.loc[(rows + number) % 5 == 0, col] = np.nan
+        blank.loc[(rows + number) % 5 == 1, col] = "   "
+    variants["blank_faculty"] = blank
+
+    prefixed = raw_df.copy()
+    for col in _faculty_columns(raw_df):
+        names = prefixed[col].astype(object)
+        letters = rng.choice(list("ABC"), size=len(prefixed))
+        styles = rows % 3
+        prefixed[col] = [
+            name if pd.isna(name) else
+            f"Section {letter} - {name}" if style == 0 else
+            f"{name} - Section {letter}" if style == 1 else
+            f"Section-{letter} {name}"
+            for name, letter, style in zip(names, letters, styles)
+        ]
+    variants["section_prefix"] = prefixed
+
+    # Repeated students get unique SRNs so the duplicate rule keeps them all
+    copies = -(-scaled_rows // max(len(raw_df), 1))
+    scaled = pd.concat([raw_df] * copies, ignore_index=True).head(scaled_rows)
+    scaled["SRN"] = scaled["SRN"].astype(object).where(scaled["SRN"].isna(), scaled["SRN"].astype(str) + "-" + (scaled.index // max(len(raw_df), 1)).astype(str))
+    variants["scaled"] = scaled
+
+    return {name: _round_trip(df) for name, df in variants.items()}
+
+# Function to run one engine over one export
+def run_engine(raw_df, engine, quality_rules=None):
+    """
+    Reshape and aggregate an export with one engine, timing the two stages.
+
+    Returns:
+    - Tuple (tables, timings) with the pipeline's tables and {'reshape': s, 'aggregate': s}
+    """
+    start = time.perf_counter()
+    tables = reshape_raw_feedback(raw_df, quality_rules=quality_rules, engine=engine)
+    reshaped = time.perf_counter()
+    tables = aggregate_feedback(tables)
+    finished = time.perf_counter()
+    return tables, {"reshape": reshaped - start, "aggregate": finished - reshaped}
+
+# Function to compare an engine's tables with the reference tables
+def compare_tables(expected, actual):
+    """Return a list of 'table: difference' messages; empty when every table matches exactly"""
+    mismatches = []
+    for name in LONG_TABLES + AGGREGATE_TABLES:
+        left, right = expected.get(name), actual.get(name)
+        if left is None or right is None:
+            if (left is None) != (right is None):
+                mismatches.append(f"{name}: present in only one engine's output")
+            continue
+        try:
+            pd.testing.assert_frame_equal(left, right, check_exact=True)
+        except AssertionError as error:
+            mismatches.append(f"{name}: {' '.join(str(error).split())[:300]}")
+    return mismatches
+
+# Function to check the quality flags of the bundled sample
+def check_sample_quality(tables):
+    """Return a message for each known straight-liner of the bundled sample the quality report misses"""
+    report = tables.get("quality_report")
+    flagged = set() if report is None else set(report.loc[report["Reason"].str.startswith("straight-lined"), "SRN"])
+    return [f"quality_report: straight-lined SRN {srn} not flagged" for srn in SAMPLE_STRAIGHT_LINED_SRNS if srn not in flagged]
+
+# Function to find timings that regressed against a baseline
+def find_regressions(timings, baseline, tolerance=None):
+    """
+    Compare timings with a baseline of the same shape.
+
+    Parameters:
+    - timings, baseline: Dicts of 'variant/engine/stage' to seconds
+    - tolerance: Allowed relative slowdown (defaults to PERF_TOLERANCE)
+
+    Returns:
+    - List of messages for stages slower than baseline × (1 + tolerance) by more than the noise floor
+    """
+    tolerance = PERF_TOLERANCE if tolerance is None else tolerance
+    regressions = []
+    for key, seconds in sorted(timings.items()):
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if seconds > reference * (1 + tolerance) and seconds - reference > PERF_NOISE_FLOOR:
+            regressions.append(f"{key}: {seconds:.3f}s vs baseline {reference:.3f}s (+{seconds / reference - 1:.0%})")
+    return regressions
+
+# Function to run the whole harness
+def run_harness(sample_path=None, engines=None, baseline_path=None, save_baseline_path=None,
+                tolerance=None, repeats=None, seed=0):
+    """
+    Check every engine against the reference on the sample and its synthetic variants, and time them.
+
+    On the bundled sample, the reference output must also flag the sample's known straight-liners.
+
+    Parameters:
+    - sample_path: Raw export to derive the variants from (defaults to HARNESS_SAMPLE)
+    - engines: Engine names to check (defaults to every engine in RESHAPE_ENGINES)
+    - baseline_path: Optional JSON of earlier timings to check for regressions
+    - save_baseline_path: Optional path to write this run's timings to as the new baseline
+    - tolerance: Allowed relative slowdown against the baseline (defaults to PERF_TOLERANCE)
+    - repeats: Timed runs per engine and variant; the fastest is kept (defaults to TIMING_REPEATS)
+
+    Returns:
+    - Dictionary with 'mismatches' and 'regressions' (lists of messages), 'timings'
+      (DataFrame of variant, engine, stage, seconds and rows) and 'passed'
+    """
+    raw_df = pd.read_csv(sample_path or HARNESS_SAMPLE)
+    engines = [engine for engine in (engines or RESHAPE_ENGINES) if engine != "reference"]
+    mismatches = []
+    timings = {}
+    records = []
+    for variant, variant_df in synthetic_variants(raw_df, seed).items():
+        for engine in ["reference"] + engines:
+            best = None
+            for _ in range(max(repeats or TIMING_REPEATS, 1)):
+                tables, stage_times = run_engine(variant_df, engine)
+                best = stage_times if best is None else {stage: min(best[stage], seconds) for stage, seconds in stage_times.items()}
+            if engine == "reference":
+                expected = tables
+                if variant == "sample" and not sample_path:
+                    mismatches.extend(f"sample/reference/{message}" for message in check_sample_quality(tables))
+            else:
+                mismatches.extend(f"{variant}/{engine}/{message}" for message in compare_tables(expected, tables))
+            for stage, seconds in best.items():
+                timings[f"{variant}/{engine}/{stage}"] = seconds
+                records.append({"Variant": variant, "Engine": engine, "Stage": stage, "Seconds": seconds,
+                                "Rows": len(tables["faculty_ratings_df"])})
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as handle:
+            regressions = find_regressions(timings, json.load(handle), tolerance)
+    if save_baseline_path:
+        with open(save_baseline_path, "w") as handle:
+            json.dump(timings, handle, indent=2, sort_keys=True)
+
+    return {
+        "mismatches": mismatches,
+        "regressions": regressions,
+        "timings": pd.DataFrame(records, columns=["Variant", "Engine", "Stage", "Seconds", "Rows"]),
+        "passed": not mismatches and not regressions
+    }
+
+# Function to format the harness result as text
+def format_harness_report(result):
+    """Return the timing table, any mismatches and regressions and the verdict as text"""
+    timings = result["timings"]
+    table = timings.pivot_table(index=["Variant", "Rows"], columns=["Stage", "Engine"], values="Seconds")
+    lines = ["Stage timings (seconds, best run):", table.to_string(float_format=lambda value: f"{value:.3f}"), ""]
+    if result["mismatches"]:
+        lines.append("Output mismatches:")
+        lines.extend(f"  {message}" for message in result["mismatches"])
+    else:
+        lines.append("All engines match the reference output on every variant, and the sample's straight-liners are flagged.")
+    if result["regressions"]:
+        lines.append("Timing regressions:")
+        lines.extend(f"  {message}" for message in result["regressions"])
+    lines.append("PASSED" if result["passed"] else "FAILED")
+    return "\n".join(lines)
@@ -0,0 +1,54 @@
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes used to ingest several uploaded files at once
+INGEST_WORKERS = int(os.environ.get("FEEDBACK_INGEST_WORKERS", os.cpu_count() or 1))
+
+# Start method of ingest workers. Forking the app's multithreaded process (Streamlit server,
+# job threads) can deadlock on a lock held by another thread, so workers start from a fresh
+# interpreter and only import this module and the pipeline
+INGEST_START_METHOD = os.environ.get("FEEDBACK_INGEST_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Modules a forkserver imports once, so each worker it forks starts with them loaded
+INGEST_PRELOAD_MODULES = ["feedback_pipeline"]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to parse and reshape one uploaded file in a worker process
+def ingest_file(name, content, quality_rules=None):
+    """Worker entry point: run feedback_pipeline.ingest_feedback_file on one (name, bytes) upload"""
+    pipeline = importlib.import_module("feedback_pipeline")
+    return pipeline.ingest_feedback_file(name, content, quality_rules)
+
+# Function to get the process-wide ingest pool
+def get_ingest_pool():
+    """
+    Return the shared worker pool, creating it on first use.
+
+    The pool lives as long as the process, so its workers are started once rather than
+    for every upload. Workers do not re-run the app script: app.py names its module
+    '__main__', which the start-up of fresh worker processes skips.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(INGEST_START_METHOD)
+            if INGEST_START_METHOD == "forkserver":
+                context.set_forkserver_preload(INGEST_PRELOAD_MODULES)
+            _pool = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=context)
+        return _pool
+
+# Function to drop a pool whose worker died
+def discard_ingest_pool(pool):
+    """Forget a broken pool so the next upload starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,164 @@
+import itertools
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = 3600
+
+# Worker threads of each job pool; processing and report builds have their own pools, so an
+# upload is never queued behind other sessions' department builds
+JOB_POOL_WORKERS = {
+    "processing": int(os.environ.get("FEEDBACK_PROCESSING_WORKERS", 2)),
+    "reports": int(os.environ.get("FEEDBACK_REPORT_WORKERS", 2))
+}
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+class Job:
+    """A unit of background work with stage progress, cancellation and a result"""
+
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = QUEUED
+        self.stage = "Waiting to start"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_requested = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def report(self, stage, fraction=None):
+        """Record progress from inside the job; raises JobCancelled if the job was cancelled"""
+        if self._cancel_requested.is_set():
+            raise JobCancelled(self.label)
+        self.stage = stage
+        if fraction is not None:
+            self.progress = min(max(float(fraction), 0.0), 1.0)
+
+    def cancel(self):
+        """Ask the job to stop at its next progress report"""
+        self._cancel_requested.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished_at = time.time()
+
+class JobRegistry:
+    """Thread pool plus a registry of submitted jobs, shared by every session in the process"""
+
+    def __init__(self, max_workers=2, name="job"):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"feedback-{name}")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, label, func, *args, **kwargs):
+        """
+        Run func(*args, progress=job.report, **kwargs) in the background.
+
+        Returns:
+        - The Job, whose status, stage, progress and result can be polled
+        """
+        self._forget_old_jobs()
+        with self._lock:
+            job = Job(f"{self.name}-{next(self._ids)}", label)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job._cancel_requested.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return None
+        job.status = RUNNING
+        job.stage = "Starting"
+        job.started_at = time.time()
+        try:
+            job.result = func(*args, progress=job.report, **kwargs)
+            job.stage = "Finished"
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.stage = "Cancelled"
+            job.status = CANCELLED
+        except Exception as error:
+            job.error = error
+            job.stage = "Failed"
+            job.status = FAILED
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Return the job with this id, or None if it is unknown or expired"""
+        self._forget_old_jobs()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def take(self, job_id):
+        """
+        Remove a finished job from the registry once its session has picked it up.
+
+        The registry then no longer holds the job's result, so a large result lives only as
+        long as the caller keeps it.
+
+        Returns:
+        - The finished Job, or None if it is unknown, expired or still running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.finished:
+                return None
+            return self._jobs.pop(job_id)
+
+    def queued_ahead(self, job):
+        """Return how many queued jobs were submitted before this one, i.e. start before it"""
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == QUEUED and other.submitted_at < job.submitted_at)
+
+    def jobs(self):
+        """Return all known jobs, newest first"""
+        self._forget_old_jobs()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def _forget_old_jobs(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job.finished and job.finished_at and job.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+# Function to get a process-wide job registry
+def get_job_registry(pool="processing"):
+    """Return the shared JobRegistry of a pool in JOB_POOL_WORKERS, creating it on first use"""
+    if pool not in JOB_POOL_WORKERS:
+        raise ValueError(f"Unknown job pool '{pool}'. Use one of: {', '.join(JOB_POOL_WORKERS)}.")
+    with _registry_lock:
+        if pool not in _registries:
+            _registries[pool] = JobRegistry(max_workers=JOB_POOL_WORKERS[pool], name=pool)
+        return _registries[pool]
@@ -0,0 +1,250 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from dataset_registry import estimate_memory, get_dataset_registry
+from report_content import ReportContext, department_report_pages
+
+# Concurrent-session load test: simulated coordinators drive the dashboard through
+# Streamlit's AppTest, each in its own thread of one server process, while the
+# process's memory is sampled.
+#
+# AppTest installs a process-wide Runtime for the length of every script run, so script
+# runs take turns behind a lock; background processing jobs and report rendering still
+# overlap. Rerun latency therefore includes the time queued behind other sessions, much
+# as CPU-bound reruns queue for the interpreter lock in a real server.
+
+# Dashboard script and the sample export each simulated user uploads
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+LOAD_TEST_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feedback-raw data.csv")
+
+# Simulated users and how often each switches faculty
+LOAD_TEST_USERS = int(os.environ.get("FEEDBACK_LOAD_USERS", 4))
+FACULTY_SWITCHES = 3
+
+# Seconds a single rerun, or waiting for processing, may take before a user fails
+RERUN_TIMEOUT = 300
+
+# Seconds between reruns while a user waits for the processing job
+POLL_INTERVAL = 0.5
+
+# Seconds between memory samples
+MEMORY_SAMPLE_INTERVAL = 0.2
+
+# Actions that are not a single rerun and are left out of the rerun latency
+NON_RERUN_ACTIONS = ["processing wait", "download reports"]
+
+# Script runs of all simulated sessions take turns (see above)
+_script_run_lock = threading.Lock()
+
+# Function to read the process's resident memory
+def resident_memory():
+    """Return the current resident set size in bytes (Linux /proc), or the peak so far elsewhere"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is in KB on Linux and bytes on macOS; only reached off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class MemorySampler:
+    """Background thread recording the process's resident memory until stopped"""
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.baseline = resident_memory()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="load-test-memory", daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, resident_memory())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return (baseline, peak, final) resident memory in bytes"""
+        self._stop.set()
+        self._thread.join()
+        final = resident_memory()
+        self.peak = max(self.peak, final)
+        return self.baseline, self.peak, final
+
+# Function to give each simulated user their own export
+def user_upload(raw_df, user_number, distinct=True):
+    """
+    Return the (file name, bytes, mime type) a user uploads.
+
+    With distinct=True each user's first column is tagged so every upload hashes differently
+    and is processed on its own, as on results day; otherwise all users share one dataset.
+    """
+    if distinct:
+        raw_df = raw_df.copy()
+        raw_df[raw_df.columns[0]] = raw_df[raw_df.columns[0]].astype(str) + f" #{user_number}"
+    return (f"Feedback-Sem-3-BT-LOAD{user_number}.csv", raw_df.to_csv(index=False).encode("utf-8"), "text/csv")
+
+# Function to find a widget by the start of its label
+def _widget(app, kind, label):
+    widget = next((widget for widget in getattr(app, kind) if widget.label.startswith(label)), None)
+    if widget is None:
+        # Errors the page caught itself explain why the widget is missing
+        shown = "; ".join(str(error.value) for error in app.error)
+        raise LookupError(f"No widget labelled '{label}...' on the page" + (f" ({shown})" if shown else ""))
+    return widget
+
+# Function to check whether the processed-data view is on the page
+def _shows_processed_data(app):
+    return any(selector.label.startswith("🎓 Select") for selector in app.selectbox)
+
+# Function to play one coordinator's session
+def simulate_user(user_number, upload, faculty_switches=FACULTY_SWITCHES, start_barrier=None):
+    """
+    Open the dashboard, upload and process an export, switch faculty and view, and download reports.
+
+    Returns:
+    - Tuple (records, memory): a list of {'User', 'Action', 'Seconds', 'Queued'} dicts, one per
+      rerun plus the processing wait and the report download, and a dict of the session's memory
+    """
+    records = []
+    app = AppTest.from_file(APP_PATH, default_timeout=RERUN_TIMEOUT)
+
+    def rerun(action, change=None):
+        if change is not None:
+            change()
+        start = time.perf_counter()
+        with _script_run_lock:
+            started = time.perf_counter()
+            app.run()
+        records.append({"User": user_number, "Action": action, "Seconds": time.perf_counter() - start,
+                        "Queued": started - start})
+        if app.exception:
+            raise RuntimeError(f"User {user_number}, {action}: {app.exception[0].value}")
+
+    if start_barrier is not None:
+        start_barrier.wait()
+    rerun("open")
+    rerun("upload", lambda: _widget(app, "file_uploader", "Upload Raw Feedback").set_value(upload))
+
+    # Processing runs as a background job; the page reruns while it waits, like the polling fragment
+    waiting_since = time.perf_counter()
+    rerun("process", lambda: _widget(app, "button", "Process Raw Data").click())
+    # The rerun that picks up the result ends early, so wait until the faculty selector is drawn too
+    while app.session_state["dataset"] is None or not _shows_processed_data(app):
+        if time.perf_counter() - waiting_since > RERUN_TIMEOUT:
+            raise RuntimeError(f"User {user_number}: processing did not finish in {RERUN_TIMEOUT}s")
+        time.sleep(POLL_INTERVAL)
+        rerun("poll")
+    records.append({"User": user_number, "Action": "processing wait", "Seconds": time.perf_counter() - waiting_since, "Queued": 0.0})
+
+    for switch in range(faculty_switches):
+        selector = _widget(app, "selectbox", "🎓 Select")
+        option = selector.options[(user_number + switch + 1) % len(selector.options)]
+        rerun("switch faculty", lambda: selector.set_value(option))
+    rerun("switch view", lambda: _widget(app, "radio", "Choose Visualization Type").set_value("Table"))
+
+    # AppTest cannot run deferred download callbacks, so render what the download buttons render
+    rendering = importlib.import_module("report_rendering")
+    dataset = app.session_state["dataset"]
+    pages = list(department_report_pages(dataset.rating_cube, dataset.comments_df, dataset_key=dataset.key))
+    faculty_data, course_name, themes = pages[user_number % len(pages)]
+    context = ReportContext(start_year=app.session_state["start_year"], end_year=app.session_state["end_year"],
+                            program=app.session_state["program"], semester=app.session_state["semester"])
+    start = time.perf_counter()
+    rendering.render_faculty_artifacts(faculty_data, course_name, context, themes)
+    records.append({"User": user_number, "Action": "download reports", "Seconds": time.perf_counter() - start, "Queued": 0.0})
+
+    # Session state without the dataset, which lives once in the shared registry
+    state = app.session_state.to_dict()
+    shared = {key: size for key, size, _ in get_dataset_registry().stats().itertuples(index=False)}
+    memory = {
+        "User": user_number,
+        "Session State (KB)": estimate_memory({key: value for key, value in state.items() if key != "dataset"}) / 1024,
+        "Dataset (MB, shared)": shared.get(dataset.key, 0.0)
+    }
+    return records, memory
+
+# Function to run the load test
+def run_load_test(users=LOAD_TEST_USERS, faculty_switches=FACULTY_SWITCHES, sample_path=None, distinct=True):
+    """
+    Simulate concurrent coordinators, each in its own thread, and measure latency and memory.
+
+    Parameters:
+    - users: Number of simultaneous sessions
+    - faculty_switches: Faculty selections per session after processing
+    - sample_path: Raw export every user uploads (defaults to LOAD_TEST_SAMPLE)
+    - distinct: Give every user a different export so none reuses another's processing
+
+    Returns:
+    - Dictionary with 'records' (one row per action), 'latency' (count, p50, p95, max and median
+      time queued per action plus all reruns), 'sessions' (memory per session), 'memory' (process MB:
+      baseline, peak, final and growth per session), 'errors' and 'seconds' (wall time)
+    """
+    raw_df = pd.read_csv(sample_path or LOAD_TEST_SAMPLE)
+    uploads = [user_upload(raw_df, user_number, distinct) for user_number in range(users)]
+    barrier = threading.Barrier(users, timeout=RERUN_TIMEOUT)
+    records, sessions, errors = [], [], []
+
+    sampler = MemorySampler().start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="load-test-user") as pool:
+        futures = [pool.submit(simulate_user, user_number, uploads[user_number], faculty_switches, barrier)
+                   for user_number in range(users)]
+        for future in futures:
+            try:
+                user_records, memory = future.result()
+                records.extend(user_records)
+                sessions.append(memory)
+            except Exception as error:
+                errors.append(f"{type(error).__name__}: {error}")
+    seconds = time.perf_counter() - start
+    baseline, peak, final = sampler.stop()
+
+    records = pd.DataFrame(records, columns=["User", "Action", "Seconds", "Queued"])
+    reruns = records[~records["Action"].isin(NON_RERUN_ACTIONS)].assign(Action="all reruns")
+    grouped = pd.concat([records, reruns]).groupby("Action", sort=False)
+    latency = grouped["Seconds"].agg(count="count", p50="median", p95=lambda values: values.quantile(0.95), max="max")
+    latency["queued p50"] = grouped["Queued"].median()
+    megabyte = 1024 * 1024
+    return {
+        "records": records,
+        "latency": latency,
+        "sessions": pd.DataFrame(sessions, columns=["User", "Session State (KB)", "Dataset (MB, shared)"]),
+        "memory": {
+            "baseline": baseline / megabyte,
+            "peak": peak / megabyte,
+            "final": final / megabyte,
+            "per session": (peak - baseline) / megabyte / max(users, 1)
+        },
+        "errors": errors,
+        "seconds": seconds
+    }
+
+# Function to format the load test result as text
+def format_load_report(result, users):
+    """Return the latency table, memory figures and any errors as text"""
+    memory = result["memory"]
+    lines = [
+        f"{users} simulated users finished in {result['seconds']:.1f}s",
+        "",
+        "Latency (seconds):",
+        result["latency"].to_string(float_format=lambda value: f"{value:.3f}"),
+        "",
+        f"Process memory: {memory['baseline']:.0f} MB before, {memory['peak']:.0f} MB peak, "
+        f"{memory['final']:.0f} MB after; {memory['per session']:.1f} MB growth per session",
+        "",
+        "Memory per session:",
+        result["sessions"].to_string(index=False, float_format=lambda value: f"{value:.2f}")
+    ]
+    if result["errors"]:
+        lines += ["", "Errors:"] + [f"  {error}" for error in result["errors"]]
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from rating_stats import pivot_rating_cube, rollup_rating_cube
+
+# Standard cross-tab pivots built from the rating and course cubes, so their size follows
+# the number of groups (faculty, sections, courses, questions) rather than the raw rows.
+
+# Export formats: file extension and MIME type
+PIVOT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("zip", "application/zip"),
+    "parquet": ("zip", "application/zip")
+}
+
+# Decimal places kept for mean ratings
+PIVOT_DECIMALS = 2
+
+# Function to add an overall column to a pivot
+def _with_overall(cube, pivot, index):
+    overall = rollup_rating_cube(cube, [index]).set_index(index)["Rating"]
+    return pivot.assign(Overall=overall.reindex(pivot.index))
+
+# Function to build the standard pivots
+def build_pivot_tables(rating_cube, course_cube=None, responses_known=True):
+    """
+    Build the standard cross-tabs from the aggregated cubes, without touching row-level data.
+
+    Parameters:
+    - rating_cube: Output of build_rating_cube
+    - course_cube: Optional output of build_course_cube
+    - responses_known: False when the cube's counts are weights rather than responses
+      (averages without counts); 'Response Counts' is then left out
+
+    Returns:
+    - Dict of sheet name -> DataFrame: 'Faculty x Category' and 'Section x Faculty' mean
+      ratings with an overall column, 'Course x Question' mean ratings and 'Response Counts'
+      (students, answers and mean rating per section, faculty and course)
+    """
+    pivots = {}
+    pivots["Faculty x Category"] = _with_overall(
+        rating_cube, pivot_rating_cube(rating_cube, "Faculty Name", "Rating Category"), "Faculty Name"
+    )
+    if "Section" in rating_cube.columns:
+        pivots["Section x Faculty"] = _with_overall(
+            rating_cube, pivot_rating_cube(rating_cube, "Section", "Faculty Name"), "Section"
+        )
+    if course_cube is not None and not course_cube.empty:
+        pivots["Course x Question"] = _with_overall(
+            course_cube, pivot_rating_cube(course_cube, "Course", "Question"), "Course"
+        )
+
+    # Students per group is the largest number answering any one category, as in the leaderboard
+    if responses_known:
+        keys = [key for key in ["Section", "Faculty Name", "Course"] if key in rating_cube.columns]
+        per_category = rollup_rating_cube(rating_cube, keys + ["Rating Category"])
+        counts = per_category.groupby(keys, sort=True, dropna=False).agg(
+            Students=("Count", "max"), Answers=("Count", "sum"), Sum=("Sum", "sum"), Categories=("Count", "size")
+        )
+        counts["Rating"] = counts.pop("Sum") / counts["Answers"]
+        pivots["Response Counts"] = counts
+
+    return {name: pivot.round(PIVOT_DECIMALS) for name, pivot in pivots.items()}
+
+# Function to write the pivots as one Excel workbook
+def write_pivot_workbook(pivots):
+    """Return the pivots as XLSX bytes, one sheet each with the header row and labels frozen"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for name, pivot in pivots.items():
+            pivot.to_excel(writer, sheet_name=name[:31])
+            writer.sheets[name[:31]].freeze_panes = writer.sheets[name[:31]].cell(row=2, column=pivot.index.nlevels + 1)
+    return buffer.getvalue()
+
+# Function to write the pivots as a ZIP of CSV or Parquet files
+def write_pivot_files(pivots, file_format):
+    """Return a ZIP with one CSV or Parquet file per pivot; Parquet keeps the labels as columns"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, pivot in pivots.items():
+            file_name = name.lower().replace(" ", "_")
+            if file_format == "csv":
+                archive.writestr(f"{file_name}.csv", pivot.to_csv())
+            else:
+                table = pivot.reset_index()
+                table.columns = [str(col) for col in table.columns]
+                archive.writestr(f"{file_name}.parquet", table.to_parquet(index=False))
+    return buffer.getvalue()
+
+# Function to export the pivots in one of the supported formats
+def export_pivots(pivots, file_format="xlsx"):
+    """
+    Serialize the pivots.
+
+    Parameters:
+    - pivots: Output of build_pivot_tables
+    - file_format: 'xlsx' (one workbook), 'csv' or 'parquet' (a ZIP with one file per pivot)
+
+    Returns:
+    - Tuple (bytes, file extension, MIME type)
+    """
+    if file_format not in PIVOT_FORMATS:
+        raise ValueError(f"Unknown pivot format '{file_format}'. Use one of: {', '.join(PIVOT_FORMATS)}.")
+    extension, mime = PIVOT_FORMATS[file_format]
+    data = write_pivot_workbook(pivots) if file_format == "xlsx" else write_pivot_files(pivots, file_format)
+    return data, extension, mime
@@ -0,0 +1,149 @@
+import os
+
+import pandas as pd
+
+from rating_stats import CUBE_KEYS, add_distribution_stats, build_rating_cube, rollup_rating_cube
+
+# File types accepted by the processed-data mode
+PROCESSED_FILE_TYPES = ["csv", "xlsx", "parquet", "feather"]
+
+# Shapes of processed files the app understands
+SCHEMA_CUBE = "cube"          # Rating cube export: Sum/Count (and SumSq, histogram) per group
+SCHEMA_LONG = "long"          # Row-level ratings, e.g. the faculty_ratings.xlsx download
+SCHEMA_AVERAGES = "averages"  # One mean rating per faculty and category
+SCHEMA_WIDE = "wide"          # One row per faculty with a column per rating question
+
+SCHEMA_DESCRIPTIONS = {
+    SCHEMA_CUBE: "pre-aggregated rating cube (sums, counts and histograms)",
+    SCHEMA_LONG: "row-level ratings (one row per student answer)",
+    SCHEMA_AVERAGES: "average ratings per faculty and category",
+    SCHEMA_WIDE: "one row per faculty with a column per rating question"
+}
+
+# Keys of the per-faculty view used by the processed-data mode
+FACULTY_VIEW_KEYS = ["Faculty Name", "Rating Category"]
+
+# Function to read a processed file of any supported type
+def read_processed_file(file, name=None):
+    """
+    Read a processed ratings file by its extension.
+
+    Parameters:
+    - file: Path or file-like object (e.g. a Streamlit upload)
+    - name: File name used to pick the reader (defaults to file.name or the path)
+
+    Returns:
+    - DataFrame
+    """
+    name = name or getattr(file, "name", None) or str(file)
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension == "csv":
+        return pd.read_csv(file, encoding="utf-8")
+    if extension in ("xlsx", "xls"):
+        return pd.read_excel(file, engine="openpyxl")
+    if extension == "parquet":
+        return pd.read_parquet(file)
+    if extension in ("feather", "arrow"):
+        return pd.read_feather(file)
+    raise ValueError(f"Unsupported file type '.{extension}'. Use one of: {', '.join(PROCESSED_FILE_TYPES)}.")
+
+# Function to find the question columns of a wide file
+def identify_wide_rating_columns(columns):
+    """Return columns that look like rating questions in a wide file"""
+    return [col for col in columns if any(x in str(col).lower() for x in ["course", "rating", "evaluation"])]
+
+# Function to detect which export shape a processed file has
+def detect_schema(df):
+    """
+    Detect the shape of a processed ratings file.
+
+    Returns:
+    - One of SCHEMA_CUBE, SCHEMA_LONG, SCHEMA_AVERAGES or SCHEMA_WIDE
+
+    Raises:
+    - ValueError if the file has no faculty column or no ratings
+    """
+    columns = set(df.columns)
+    has_faculty = "Faculty Name" in columns
+    if has_faculty and "Rating Category" in columns and {"Sum", "Count"} <= columns:
+        return SCHEMA_CUBE
+    if has_faculty and {"Rating Category", "Rating"} <= columns:
+        # Student columns, or repeated faculty/category pairs, mean row-level answers
+        keys = [key for key in CUBE_KEYS if key in columns]
+        if {"SRN", "Student Name"} & columns or df.duplicated(subset=keys).any():
+            return SCHEMA_LONG
+        return SCHEMA_AVERAGES
+    if not any("faculty" in str(col).lower() for col in df.columns):
+        raise ValueError("No Faculty Name column found! Check your file.")
+    if not identify_wide_rating_columns(df.columns):
+        raise ValueError("No Rating columns found! Check your file.")
+    return SCHEMA_WIDE
+
+# Function to reshape a wide file into row-level ratings
+def melt_wide_ratings(df):
+    """Melt a wide file (a column per rating question) into 'Faculty Name', 'Rating Category', 'Rating' rows"""
+    faculty_col = [col for col in df.columns if "faculty" in str(col).lower()][0]
+
+    # Clean Faculty Names if not already cleaned
+    if "Faculty Name" not in df.columns:
+        df = df.assign(**{"Faculty Name": df[faculty_col].astype(str).str.replace(r"Section[ -]?[A-Z]?[ -]?", "", regex=True).str.strip()})
+    df = df.dropna(subset=["Faculty Name"])
+
+    rating_cols = [col for col in identify_wide_rating_columns(df.columns) if col != "Faculty Name"]
+    melted_df = df.melt(id_vars=["Faculty Name"], value_vars=rating_cols, var_name="Rating Category", value_name="Rating")
+
+    # Fix Duplicate Questions: Normalize Category Names
+    melted_df["Rating Category"] = (
+        melted_df["Rating Category"]
+        .str.strip()
+        .str.lower()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.split("(").str[0]
+        .str.strip()
+    )
+    melted_df = melted_df.dropna(subset=["Rating"])
+    melted_df["Rating"] = pd.to_numeric(melted_df["Rating"], errors="coerce")
+    return melted_df
+
+# Function to turn a processed file into the per-faculty averages and the rating cube
+def load_processed_ratings(df, schema=None):
+    """
+    Load a processed file into the tables the processed-data mode shows.
+
+    Cube and average files are loaded without grouping (only the mean, spread and CI
+    are derived from their sums and counts); row-level and wide files are aggregated.
+
+    An averages file without a Count column has unknown response counts: each average then
+    counts once in means, 'responses_known' is False and the per-faculty view has no Count.
+
+    Returns:
+    - Dictionary with 'schema', 'avg_ratings' (one row per faculty and category),
+      'rating_cube' and 'responses_known'
+    """
+    schema = schema or detect_schema(df)
+    responses_known = True
+    if schema == SCHEMA_CUBE:
+        # Already aggregated: only the derived columns are recomputed
+        rating_cube = add_distribution_stats(df.dropna(subset=["Faculty Name"]).reset_index(drop=True))
+    elif schema == SCHEMA_AVERAGES:
+        # One row per group already: weight each mean by its response count when the file has one,
+        # otherwise every average weighs the same (its Count of 1 is a weight, not a response count)
+        averages = df.dropna(subset=["Faculty Name"]).reset_index(drop=True)
+        keys = [key for key in CUBE_KEYS if key in averages.columns]
+        ratings = pd.to_numeric(averages["Rating"], errors="coerce")
+        responses_known = "Count" in averages.columns
+        count = pd.to_numeric(averages["Count"], errors="coerce").fillna(0) if responses_known else ratings.notna().astype(int)
+        rating_cube = add_distribution_stats(averages[keys].assign(Sum=ratings.fillna(0) * count, Count=count))
+    else:
+        ratings = df if schema == SCHEMA_LONG else melt_wide_ratings(df)
+        rating_cube = build_rating_cube(ratings.dropna(subset=["Faculty Name"]))
+
+    # Per-faculty view; a cube already keyed by faculty and category is used as it is
+    keys = [key for key in CUBE_KEYS if key in rating_cube.columns]
+    if keys == FACULTY_VIEW_KEYS:
+        avg_ratings = rating_cube
+    else:
+        avg_ratings = rollup_rating_cube(rating_cube, FACULTY_VIEW_KEYS)
+    if not responses_known:
+        avg_ratings = avg_ratings.drop(columns=["Count"])
+    return {"schema": schema, "avg_ratings": avg_ratings, "rating_cube": rating_cube, "responses_known": responses_known}
@@ -0,0 +1,178 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import threading
+import time
+import zipfile
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+# Profiling is opt-in; FEEDBACK_PROFILE=1 turns it on for every run by default
+PROFILE_BY_DEFAULT = os.environ.get("FEEDBACK_PROFILE", "").lower() in ("1", "true", "yes")
+
+# Number of functions listed in the profile summary
+PROFILE_TOP_FUNCTIONS = int(os.environ.get("FEEDBACK_PROFILE_TOP", 40))
+
+# Held while a cProfile is enabled in this process; Python 3.12+ allows only one active profiler
+_profiler_slot = threading.Lock()
+
+# Function to start a cProfile unless another one is already running
+def _start_profile():
+    """Return an enabled cProfile.Profile holding the profiler slot, or None when another profiler is active"""
+    if not _profiler_slot.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiling tool (a debugger, an outer cProfile) is active
+        _profiler_slot.release()
+        return None
+    return profile
+
+# Function to stop a profile started by _start_profile
+def _stop_profile(profile):
+    profile.disable()
+    _profiler_slot.release()
+
+class RunProfiler:
+    """
+    Per-run profile: wall-clock time of each named stage plus one cProfile of everything run inside the stages.
+
+    Stages may run in different threads (background jobs, download callbacks); stats from
+    worker processes are merged with add_stats. A nested stage is timed but profiled by
+    its outermost stage. Only one stage in the process is profiled at a time (Python 3.12+
+    allows a single active profiler); stages overlapping it are timed only.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.created_at = datetime.now()
+        self.stages = []
+        self._stats = None
+        self._lock = threading.Lock()
+        self._active = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        """Time and profile the code run inside the with block as one stage"""
+        depth = getattr(self._active, "depth", 0)
+        profile = _start_profile() if depth == 0 else None
+        where = threading.current_thread().name
+        if depth == 0 and profile is None:
+            where += " (timed only, another stage was being profiled)"
+        self._active.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            if profile is not None:
+                _stop_profile(profile)
+            self._active.depth = depth
+            self._record(name, time.perf_counter() - start, depth, where, profile)
+
+    def add_stats(self, name, seconds, stats, where="worker process"):
+        """Merge a stage profiled elsewhere, e.g. the (seconds, stats) returned by call_with_profile"""
+        self._record(name, seconds, 0, where, stats)
+
+    def _record(self, name, seconds, depth, where, profile):
+        with self._lock:
+            self.stages.append({"Stage": name, "Seconds": seconds, "Depth": depth, "Where": where})
+            if profile is None:
+                return
+            stats = _stats_from(profile)
+            if self._stats is None:
+                self._stats = stats
+            else:
+                self._stats.add(stats)
+
+    def stage_table(self):
+        """Return the recorded stages as a DataFrame in the order they finished"""
+        return pd.DataFrame(self.stages, columns=["Stage", "Seconds", "Depth", "Where"])
+
+    def summary(self, limit=PROFILE_TOP_FUNCTIONS):
+        """Return a text summary: the stage timings and the most expensive functions by cumulative time"""
+        with self._lock:
+            lines = [f"Profile: {self.label}", f"Started: {self.created_at:%Y-%m-%d %H:%M:%S}", "", "Stages:"]
+            for stage in self.stages:
+                indent = "  " * (stage["Depth"] + 1)
+                lines.append(f"{indent}{stage['Stage']:<{40 - len(indent)}} {stage['Seconds']:9.3f}s  ({stage['Where']})")
+            if self._stats is None:
+                lines.append("\nNo profiled stages yet.")
+                return "\n".join(lines) + "\n"
+            stream = io.StringIO()
+            stats = pstats.Stats(stream=stream)
+            stats.add(self._stats)
+            stats.sort_stats("cumulative").print_stats(limit)
+        return "\n".join(lines) + "\n\n" + stream.getvalue()
+
+    def artifact(self):
+        """
+        Return the run's profile as ZIP bytes.
+
+        Returns:
+        - ZIP with summary.txt, stages.csv and profile.prof (pstats format, for snakeviz or pstats)
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("summary.txt", self.summary())
+            archive.writestr("stages.csv", self.stage_table().to_csv(index=False))
+            with self._lock:
+                if self._stats is not None:
+                    archive.writestr("profile.prof", marshal.dumps(self._stats.stats))
+        return buffer.getvalue()
+
+    def file_name(self):
+        """Return a file name for the artifact built from the label and start time"""
+        label = "".join(char if char.isalnum() else "_" for char in self.label).strip("_").lower()
+        return f"profile_{label}_{self.created_at:%Y%m%d_%H%M%S}.zip"
+
+# Function to turn a finished profile or a stats dict into pstats.Stats
+def _stats_from(profile):
+    stats = pstats.Stats()
+    if isinstance(profile, dict):
+        stats.stats = profile
+    else:
+        profile.create_stats()
+        stats.stats = profile.stats
+    stats.get_top_level_stats()
+    return stats
+
+# Function to profile a stage only when a profiler is given
+def profile_stage(profiler, name):
+    """Return profiler.stage(name), or a no-op context when profiling is off (profiler is None)"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+# Function to run a call as a profiled stage
+def profiled(profiler, name, func, *args, **kwargs):
+    """Call func(*args, **kwargs) inside profile_stage(profiler, name) and return its result"""
+    with profile_stage(profiler, name):
+        return func(*args, **kwargs)
+
+# Function to profile a call in a worker process
+def call_with_profile(func, *args, **kwargs):
+    """
+    Run func under cProfile; a module-level function so it can be sent to worker processes.
+
+    Returns:
+    - (result, seconds, stats) where stats is the picklable pstats dict for RunProfiler.add_stats,
+      or None when another profiler was already active in the process
+    """
+    profile = _start_profile()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        if profile is not None:
+            _stop_profile(profile)
+    seconds = time.perf_counter() - start
+    if profile is None:
+        return result, seconds, None
+    profile.create_stats()
+    return result, seconds, profile.stats
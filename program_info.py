@@ -0,0 +1,41 @@
+import re
+
+# Function to extract semester and program from filename
+def extract_info_from_filename(filename):
+    """Extract semester and program information from feedback filename"""
+    info = {
+        'semester': None,
+        'program': None
+    }
+    
+    # Look for pattern like 'Sem-3' in the filename
+    sem_match = re.search(r'Sem-(\d+)', filename)
+    if sem_match:
+        info['semester'] = sem_match.group(1)
+    
+    # Look for program code like 'BT-AIML' in the filename
+    prog_match = re.search(r'BT-([A-Z]+)', filename)
+    if prog_match:
+        info['program'] = prog_match.group(1)
+    
+    return info
+
+# Function to get the full name of a program code
+def get_full_program_name(program_code):
+    """
+    Convert program code to full program name
+    """
+    program_mapping = {
+        "AIML": "B.Tech in Computer Science and Engineering (Artificial Intelligence and Machine Learning)",
+        "CSE": "B.Tech in Computer Science and Engineering",
+        "CSIT": "B.Tech in Computer Science and Information Technology",
+        "CSSE": "B.Tech in Computer Science and Systems Engineering", 
+        "ISE": "B.Tech in Information Science and Engineering",
+        "DS": "B.Tech in Computer Science and Engineering (Data Science)",
+        "CS": "B.Tech in Computer Science and Engineering",
+        "ECE": "B.Tech in Electronics and Communication Engineering",
+        "EEE": "B.Tech in Electrical and Electronics Engineering",
+        "MECH": "B.Tech in Mechanical Engineering",
+        "CIVIL": "B.Tech in Civil Engineering"
+    }
+    return program_mapping.get(program_code, program_code)
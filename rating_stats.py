@@ -0,0 +1,213 @@
+import os
+
+import pandas as pd
+import numpy as np
+
+# Grouping levels of the rating cube, from coarsest to finest
+CUBE_KEYS = ["Section", "Faculty Name", "Course", "Rating Category"]
+
+# Answer histogram columns for the 1-5 rating scale
+HISTOGRAM_COLUMNS = [f"Rated {value}" for value in range(1, 6)]
+
+# Columns that can be summed when rolling the cube up to coarser keys
+ADDITIVE_COLUMNS = ["Sum", "SumSq", "Count"] + HISTOGRAM_COLUMNS
+
+# Ways of combining an entity's category ratings into one overall score
+SCORE_METHODS = {
+    "mean": "Mean of category averages",
+    "weighted": "Response-weighted average",
+    "shrunk": "Response-weighted, shrunk toward the section or department average"
+}
+
+# Students at the prior average that shrinkage adds to every entity; larger values pull small groups harder
+SHRINKAGE_PRIOR_RESPONSES = float(os.environ.get("FEEDBACK_SHRINKAGE_PRIOR", 10))
+
+# Two-sided 95% Student's t critical values for 1-30 degrees of freedom
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+
+# Function to look up t critical values for an array of degrees of freedom
+def t_critical_95(dof):
+    """Return two-sided 95% t critical values (NaN where dof < 1)"""
+    dof = np.asarray(dof, dtype=float)
+    table = np.asarray(T_CRITICAL_95)
+    z = 1.959964
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Cornish-Fisher style expansion is accurate to ~0.003 beyond the table
+        large = z + (z ** 3 + z) / (4 * dof)
+        small = table[np.clip(dof, 1, 30).astype(int) - 1]
+    return np.where(dof < 1, np.nan, np.where(dof <= 30, small, large))
+
+# Function to derive mean, spread and confidence interval from the additive columns
+def add_distribution_stats(cube):
+    """Add 'Rating' (mean), 'Std' and 'CI' (95% half-width) columns computed from Sum/SumSq/Count"""
+    count = cube["Count"].to_numpy(dtype=float)
+    total = cube["Sum"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cube["Rating"] = total / count
+        if "SumSq" in cube.columns:
+            variance = (cube["SumSq"].to_numpy(dtype=float) - total ** 2 / count) / (count - 1)
+            std = np.sqrt(np.where(count > 1, np.clip(variance, 0, None), np.nan))
+            cube["Std"] = std
+            cube["CI"] = t_critical_95(count - 1) * std / np.sqrt(count)
+    return cube
+
+# Function to aggregate row-level ratings into the rating cube
+def build_rating_cube(ratings_df, keys=None):
+    """
+    Aggregate ratings into one row per group in a single vectorized pass.
+
+    Parameters:
+    - ratings_df: DataFrame with a 'Rating' column and some of the CUBE_KEYS columns
+    - keys: Grouping columns (defaults to whichever CUBE_KEYS are present)
+
+    Returns:
+    - DataFrame with the key columns plus 'Sum', 'SumSq', 'Count', the
+      'Rated 1'..'Rated 5' answer histogram, 'Rating' (mean), 'Std' and 'CI'
+    """
+    keys = [key for key in (keys or CUBE_KEYS) if key in ratings_df.columns]
+
+    # Keep numeric ratings only
+    ratings = pd.to_numeric(ratings_df["Rating"], errors="coerce").to_numpy(dtype=float)
+    valid = ~np.isnan(ratings)
+    ratings = ratings[valid]
+    grouper = ratings_df.loc[valid, keys].groupby(keys, sort=False, dropna=False)
+
+    # Group codes follow the same order as the group keys returned by size()
+    codes = grouper.ngroup().to_numpy()
+    cube = grouper.size().reset_index(name="Count")
+    n_groups = len(cube)
+
+    # Accumulate sums, sums of squares and counts with one bincount each
+    cube["Sum"] = np.bincount(codes, weights=ratings, minlength=n_groups)
+    cube["SumSq"] = np.bincount(codes, weights=ratings ** 2, minlength=n_groups)
+    cube["Count"] = np.bincount(codes, minlength=n_groups)
+
+    # Histogram of whole-number answers on the 1-5 scale
+    on_scale = (ratings == np.round(ratings)) & (ratings >= 1) & (ratings <= 5)
+    bins = codes[on_scale] * 5 + ratings[on_scale].astype(int) - 1
+    histogram = np.bincount(bins, minlength=n_groups * 5).reshape(n_groups, 5)
+    cube[HISTOGRAM_COLUMNS] = histogram
+
+    return add_distribution_stats(cube)
+
+# Function to roll the cube up to coarser keys
+def rollup_rating_cube(cube, keys):
+    """Roll the rating cube up to the given keys, recomputing response-weighted stats"""
+    additive = [col for col in ADDITIVE_COLUMNS if col in cube.columns]
+    rolled = cube.groupby(keys, sort=False, dropna=False)[additive].sum().reset_index()
+    return add_distribution_stats(rolled)
+
+# Function to pivot the cube into a matrix of mean ratings
+def pivot_rating_cube(cube, index, columns):
+    """
+    Build an index × columns matrix of mean ratings from the rating cube.
+
+    Parameters:
+    - cube: Output of build_rating_cube
+    - index: Column whose values become the matrix rows (e.g. 'Faculty Name')
+    - columns: Column whose values become the matrix columns (e.g. 'Rating Category')
+
+    Returns:
+    - DataFrame of mean ratings with NaN where a combination has no responses
+    """
+    rolled = rollup_rating_cube(cube, [index, columns])
+    return rolled.pivot(index=index, columns=columns, values="Rating").sort_index()
+
+# Function to compute overall scores for every entity at once
+def overall_scores(cube, keys=("Faculty Name",), method="weighted", shrink_toward=None,
+                   prior_responses=SHRINKAGE_PRIOR_RESPONSES):
+    """
+    Combine each entity's category ratings into one overall score, from the cube's sums and counts.
+
+    Parameters:
+    - cube: Output of build_rating_cube
+    - keys: Columns identifying an entity (e.g. ('Section', 'Faculty Name'))
+    - method: 'mean' (plain mean of the category means), 'weighted' (every answer counts
+      once, so categories more students answered weigh more) or 'shrunk' (the weighted
+      score pulled toward the prior average, harder for entities with fewer students)
+    - shrink_toward: Key column whose groups give the prior (e.g. 'Section'), or None for
+      the department average; only used by 'shrunk'
+    - prior_responses: Strength of the prior in students; only used by 'shrunk'
+
+    Returns:
+    - DataFrame with the key columns plus 'Rating' and 'Responses' (the largest number of
+      students answering any one category)
+    """
+    if method not in SCORE_METHODS:
+        raise ValueError(f"Unknown score method '{method}'. Use one of: {', '.join(SCORE_METHODS)}.")
+    keys = list(keys)
+    per_category = rollup_rating_cube(cube, keys + ["Rating Category"])
+    scores = per_category.groupby(keys, sort=False, dropna=False).agg(
+        Sum=("Sum", "sum"), Count=("Count", "sum"), Responses=("Count", "max"), Mean=("Rating", "mean")
+    ).reset_index()
+
+    weighted = scores["Sum"] / scores["Count"]
+    if method == "mean":
+        scores["Rating"] = scores["Mean"]
+    elif method == "weighted":
+        scores["Rating"] = weighted
+    else:
+        # Prior: the response-weighted average of the entity's group, or of the whole department
+        if shrink_toward in keys:
+            totals = scores.groupby(shrink_toward, sort=False, dropna=False)[["Sum", "Count"]].transform("sum")
+            prior = totals["Sum"] / totals["Count"]
+        else:
+            prior = scores["Sum"].sum() / scores["Count"].sum()
+        responses = scores["Responses"]
+        scores["Rating"] = (responses * weighted + prior_responses * prior) / (responses + prior_responses)
+    return scores.drop(columns=["Sum", "Count", "Mean"])
+
+# Function to score entities (faculty or section-faculty) for rankings
+def score_rating_cube(cube, keys=("Faculty Name",), category=None, min_responses=1, percentile_within=None,
+                      method="weighted", shrink_toward=None):
+    """
+    Compute one score row per entity with response count and percentile rank.
+
+    Parameters:
+    - cube: Output of build_rating_cube
+    - keys: Columns identifying a ranked entity (e.g. ('Section', 'Faculty Name'))
+    - category: Rating Category to rank on, or None for all categories combined
+    - min_responses: Entities with fewer responses than this are left out
+    - percentile_within: Column to compute percentiles within (e.g. 'Section'),
+      or None for percentiles across the whole department
+    - method: Overall score method, see overall_scores
+    - shrink_toward: Column whose groups 'shrunk' scores are pulled toward, or None for the department
+
+    Returns:
+    - DataFrame with the key columns plus 'Rating', 'Responses' and 'Percentile'
+    """
+    if category is not None:
+        cube = cube[cube["Rating Category"] == category]
+
+    # Shrinkage priors come from every entity, before small ones are filtered out
+    scores = overall_scores(cube, keys, method=method, shrink_toward=shrink_toward)
+    scores = scores[scores["Responses"] >= min_responses]
+
+    if percentile_within and percentile_within in scores.columns:
+        ranks = scores.groupby(percentile_within, dropna=False)["Rating"].rank(pct=True)
+    else:
+        ranks = scores["Rating"].rank(pct=True)
+    scores["Percentile"] = (ranks * 100).round(1)
+    return scores.reset_index(drop=True)
+
+# Function to pick the top or bottom N scores without a full sort
+def select_extremes(scores, n=10, lowest=True):
+    """Return the n lowest (or highest) rated rows, ordered, using partial selection"""
+    n = min(int(n), len(scores))
+    if n <= 0:
+        return scores.iloc[0:0]
+
+    values = scores["Rating"].to_numpy(dtype=float)
+    values = values if lowest else -values
+    if n < len(values):
+        candidates = np.argpartition(values, n - 1)[:n]
+    else:
+        candidates = np.arange(len(values))
+
+    # Order only the selected rows, breaking ties by the larger response count
+    order = np.lexsort((-scores["Responses"].to_numpy()[candidates], values[candidates]))
+    return scores.iloc[candidates[order]].reset_index(drop=True)
@@ -1,5 +1,6 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from course_codes import CourseCodeResolver, load_learned_mappings
 
 # Load main feedback data
 feedback_df = pd.read_excel('/content/faculty_ratings (1).xlsx')
@@ -26,9 +27,17 @@ feedback_df['Faculty Name'] = (
 feedback_df['Course'] = feedback_df['Course'].str.replace(r'^Feedback on\s+', '', regex=True).str.strip()
 course_codes_df['Course'] = course_codes_df['Course'].str.strip()
 
+# Resolve course codes for every course at once (normalized, learned and fuzzy matches)
+resolver = CourseCodeResolver(
+    dict(zip(course_codes_df['Course'], course_codes_df['Course Code'])),
+    learned=load_learned_mappings()
+)
+resolution = resolver.resolve_all(feedback_df['Course'].unique())
+print(resolution[resolution['Match'] != 'exact'].to_string(index=False))
+
 # Merge course codes into main data
 merged_df = pd.merge(feedback_df, 
-                     course_codes_df[['Course', 'Course Code']], 
+                     resolution[['Course', 'Course Code']], 
                      on='Course', 
                      how='left')
 
@@ -0,0 +1,136 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+# Directory for generated archives (defaults to the system temp directory)
+EXPORT_DIR = os.environ.get("FEEDBACK_EXPORT_DIR") or tempfile.gettempdir()
+
+# Chunk size used when copying artifacts into the archive
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Function to make a safe archive member name
+def safe_member_name(name):
+    """Replace path separators and characters that are awkward in file names"""
+    name = re.sub(r"[\\/:*?\"<>|]+", "-", str(name))
+    return re.sub(r"\s+", " ", name).strip(" .") or "unnamed"
+
+class _HashingWriter:
+    """File-like wrapper that counts and hashes the bytes written through it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.stream.write(data)
+        self.size += len(data)
+        self.sha256.update(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+class ArchiveWriter:
+    """
+    Write generated artifacts straight into a ZIP file on disk, one at a time.
+
+    Each artifact is compressed as soon as it is added, so only the artifact being
+    produced is held in memory. Closing the writer adds manifest.csv and
+    manifest.json listing every member with its size, SHA-256 and any details.
+
+    Usage:
+        with ArchiveWriter() as archive:
+            archive.add("report.pdf", pdf_buffer, kind="pdf", faculty="Dr. Smith")
+        path = archive.path
+    """
+
+    def __init__(self, path=None, prefix="feedback_reports_"):
+        if path is None:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            handle, path = tempfile.mkstemp(prefix=prefix, suffix=".zip", dir=EXPORT_DIR)
+            os.close(handle)
+        self.path = path
+        self.manifest = []
+        self._names = set()
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        if exc_type is not None:
+            self.remove()
+        return False
+
+    def _unique_name(self, name):
+        name = "/".join(safe_member_name(part) for part in str(name).split("/"))
+        base, ext = os.path.splitext(name)
+        candidate, number = name, 2
+        while candidate in self._names:
+            candidate = f"{base} ({number}){ext}"
+            number += 1
+        self._names.add(candidate)
+        return candidate
+
+    @contextmanager
+    def open(self, name, **details):
+        """Open a new member for writing; text or bytes written to it go straight into the archive"""
+        name = self._unique_name(name)
+        with self._zip.open(name, "w", force_zip64=True) as member:
+            writer = _HashingWriter(member)
+            yield writer
+        self.manifest.append({"name": name, "bytes": writer.size, "sha256": writer.sha256.hexdigest(), **details})
+
+    def add(self, name, content, **details):
+        """
+        Add one artifact to the archive.
+
+        Parameters:
+        - name: Member name (path separators inside parts are replaced)
+        - content: bytes, str, or a readable file-like object such as a BytesIO
+        - details: Extra manifest columns, e.g. kind='pdf', faculty='Dr. Smith'
+
+        Returns:
+        - The member name actually used
+        """
+        with self.open(name, **details) as member:
+            if isinstance(content, (bytes, bytearray, str)):
+                member.write(content)
+            else:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                shutil.copyfileobj(content, member, COPY_CHUNK_BYTES)
+        return self.manifest[-1]["name"]
+
+    def close(self):
+        """Write the manifest and finish the ZIP file"""
+        if self._zip is None:
+            return
+        columns = []
+        for entry in self.manifest:
+            columns += [key for key in entry if key not in columns]
+        manifest_csv = io.StringIO()
+        writer = csv.DictWriter(manifest_csv, fieldnames=columns or ["name"])
+        writer.writeheader()
+        writer.writerows(self.manifest)
+        self._zip.writestr("manifest.csv", manifest_csv.getvalue())
+        self._zip.writestr("manifest.json", json.dumps(self.manifest, indent=2, default=str))
+        self._zip.close()
+        self._zip = None
+
+    def remove(self):
+        """Delete the archive file from disk"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,198 @@
+from datetime import datetime
+
+import pandas as pd
+
+from comment_themes import cached_comment_themes
+from program_info import get_full_program_name
+from rating_stats import HISTOGRAM_COLUMNS, overall_scores, rollup_rating_cube
+
+# What goes into a report, kept apart from Streamlit and from the Matplotlib/ReportLab
+# renderers so reports can be assembled in worker processes, the CLI and benchmarks.
+
+# Heading of the overall score in reports, by score method
+SCORE_LABELS = {
+    "mean": "Overall Average",
+    "weighted": "Overall Average (response-weighted)",
+    "shrunk": "Overall Score (adjusted for response count)"
+}
+
+class ReportContext:
+    """
+    Header details shared by the reports of one feedback export.
+
+    Holds only plain values, so it pickles cleanly into process pools.
+
+    Attributes:
+    - start_year, end_year: Academic year shown on each report
+    - program: Program code such as 'AIML' (or None)
+    - semester: Semester number as text (or None)
+    - course_codes: Dict of course name -> course code
+    - score_method: How the overall score is computed ('mean', 'weighted' or 'shrunk')
+    - overall_scores: Dict of (section, faculty) -> overall score from report_overall_scores
+    """
+
+    def __init__(self, start_year=None, end_year=None, program=None, semester=None, course_codes=None,
+                 score_method="mean", overall_scores=None):
+        self.start_year = start_year
+        self.end_year = end_year
+        self.program = program
+        self.semester = semester
+        self.course_codes = dict(course_codes or {})
+        self.score_method = score_method
+        self.overall_scores = dict(overall_scores or {})
+
+    def __repr__(self):
+        return (f"ReportContext(start_year={self.start_year!r}, end_year={self.end_year!r}, program={self.program!r}, "
+                f"semester={self.semester!r}, course_codes={len(self.course_codes)} codes, "
+                f"score_method={self.score_method!r}, overall_scores={len(self.overall_scores)} scores)")
+
+    @property
+    def academic_year(self):
+        """Academic year as 'YYYY-YYYY'"""
+        return f"{self.start_year}-{self.end_year}"
+
+    @property
+    def program_name(self):
+        """Full program name, or None if no program is set"""
+        return get_full_program_name(self.program) if self.program else None
+
+    def course_code(self, course_name):
+        """Return the course code of a course name, or '' if it is unknown"""
+        return self.course_codes.get(course_name, "")
+
+    @property
+    def score_label(self):
+        """Heading of the overall score for the score method"""
+        return SCORE_LABELS.get(self.score_method, SCORE_LABELS["mean"])
+
+    def overall_rating(self, faculty_data):
+        """
+        Return a faculty's overall score by the score method.
+
+        The score is looked up by section and faculty (section None when faculty_data has no
+        Section column); faculty without a precomputed score get the mean of their category ratings.
+        """
+        faculty = faculty_data["Faculty Name"].iloc[0]
+        section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else None
+        score = self.overall_scores.get((section, faculty))
+        return faculty_data["Rating"].mean() if score is None else score
+
+# Function to compute every faculty's overall score for the reports
+def report_overall_scores(rating_cube, method):
+    """
+    Score every section-faculty pair and every faculty at once, for ReportContext.overall_scores.
+
+    Section-faculty scores are shrunk toward their section's average and faculty scores toward
+    the department's, when the method is 'shrunk'.
+
+    Returns:
+    - Dict of (section, faculty) -> score, with section None for a faculty across all sections
+    """
+    if rating_cube is None or rating_cube.empty:
+        return {}
+    faculty = overall_scores(rating_cube, ["Faculty Name"], method=method)
+    scores = {(None, name): rating for name, rating in zip(faculty["Faculty Name"], faculty["Rating"])}
+    if "Section" in rating_cube.columns:
+        sections = overall_scores(rating_cube, ["Section", "Faculty Name"], method=method, shrink_toward="Section")
+        scores.update(zip(zip(sections["Section"], sections["Faculty Name"]), sections["Rating"]))
+    return scores
+
+# Function to generate faculty report
+def generate_faculty_report(faculty_data, themes=None, context=None):
+    """
+    Generate a text report with rating categories and values, plus recurring comment themes if given.
+
+    The overall score follows context's score method; without a context it is the mean of the category ratings.
+    """
+    faculty_name = faculty_data["Faculty Name"].iloc[0]
+    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+    
+    # Include section in the header if available
+    header = f"Faculty Rating Report for: {faculty_name}"
+    if section:
+        header = f"Faculty Rating Report for: Section {section} - {faculty_name}"
+    
+    report = header + "\n"
+    report += f"Generated on: {datetime.now().strftime('%Y-%m-%d')}\n"
+    report += "=" * 50 + "\n\n"
+    
+    # Add overall score
+    if context is None:
+        report += f"OVERALL AVERAGE: {faculty_data['Rating'].mean():.2f} / 5.0\n"
+    else:
+        report += f"{context.score_label.upper()}: {context.overall_rating(faculty_data):.2f} / 5.0\n"
+    if "Count" in faculty_data.columns:
+        report += f"RESPONSES: {int(faculty_data['Count'].max())}\n"
+    report += "\n"
+    report += "RATINGS BY CATEGORY:\n"
+    report += "-" * 50 + "\n\n"
+    
+    # Sort ratings from highest to lowest
+    sorted_data = faculty_data.sort_values(by="Rating", ascending=False)
+    
+    # Add each category and its rating, with its distribution when available
+    for _, row in sorted_data.iterrows():
+        category = row["Rating Category"].title()
+        rating = row["Rating"]
+        report += f"{category}: {rating:.2f}\n"
+        if "Count" in faculty_data.columns:
+            report += f"    {format_distribution(row)}\n"
+    
+    # Add recurring themes from student comments
+    if themes is not None and not themes.empty:
+        report += "\nRECURRING COMMENT THEMES:\n"
+        report += "-" * 50 + "\n\n"
+        for _, row in themes.iterrows():
+            report += f"{row['Theme']} ({row['Mentions']} comments)\n"
+    
+    return report
+
+# Function to format the distribution statistics of one category
+def format_distribution(row):
+    """Format response count, standard deviation, 95% CI and answer histogram of a cube row"""
+    text = f"n={int(row['Count'])}"
+    if "Std" in row.index and pd.notna(row["Std"]):
+        text += f", SD {row['Std']:.2f}, 95% CI ±{row['CI']:.2f}"
+    if all(col in row.index for col in HISTOGRAM_COLUMNS):
+        histogram = " ".join(f"{value}:{int(row[col])}" for value, col in enumerate(HISTOGRAM_COLUMNS, 1))
+        text += f" [{histogram}]"
+    return text
+
+# Function to list the per-faculty reports of a department booklet
+def department_report_pages(rating_cube, comments_df=None, responses_known=True, dataset_key=None):
+    """
+    Yield (faculty_data, course_name, themes) for every faculty, or section-faculty pair, in the rating cube.
+
+    The per-faculty rows are rolled up from the shared cube, so no raw ratings are regrouped.
+    When responses_known is False (averages without counts) the rows carry no Count, so the
+    reports show no response counts. dataset_key, the registered dataset's key, lets the
+    comment themes be looked up without hashing the comments.
+    """
+    keys = [key for key in ["Section", "Faculty Name"] if key in rating_cube.columns]
+    per_faculty = rollup_rating_cube(rating_cube, keys + ["Rating Category"])
+    if not responses_known:
+        per_faculty = per_faculty.drop(columns=["Count"])
+    courses = rating_cube.groupby(keys, sort=False)["Course"].first() if "Course" in rating_cube.columns else None
+    
+    all_themes = None
+    if comments_df is not None and not comments_df.empty:
+        all_themes, _ = cached_comment_themes(comments_df, dataset_key=dataset_key)
+    
+    for group, faculty_data in per_faculty.groupby(keys, sort=True):
+        faculty_name = faculty_data["Faculty Name"].iloc[0]
+        course_name = courses.loc[group] if courses is not None else "N/A"
+        themes = all_themes[all_themes["Faculty"] == faculty_name] if all_themes is not None else None
+        yield faculty_data, course_name, themes
+
+# Function to name the files of one faculty report
+def report_file_details(faculty_data, course_name):
+    """
+    Return (prefix, details) for one faculty's report files.
+
+    prefix starts every file name ('Section_A_Dr. Smith' or 'Dr. Smith'); details has the
+    'faculty', 'section' and 'course' columns listed in archive manifests.
+    """
+    faculty = faculty_data["Faculty Name"].iloc[0]
+    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+    prefix = f"Section_{section}_{faculty}" if section else f"{faculty}"
+    return prefix, {"faculty": faculty, "section": section, "course": course_name.replace("Feedback on ", "").strip()}
@@ -0,0 +1,658 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus.tableofcontents import TableOfContents
+
+from course_analytics import rating_scale
+from report_content import generate_faculty_report
+from rating_stats import HISTOGRAM_COLUMNS
+
+# Chart and PDF rendering. Matplotlib and ReportLab are only imported with this
+# module, which app.py loads on the first render rather than at startup.
+
+# Resolution for on-screen previews and for downloaded images
+PREVIEW_DPI = 72
+EXPORT_DPI = 300
+
+# Function to convert Matplotlib figure to ReportLab Image
+def fig_to_image(fig):
+    """Convert a Matplotlib figure to a ReportLab Image"""
+    canvas = FigureCanvasAgg(fig)
+    buf = io.BytesIO()
+    canvas.print_png(buf)
+    buf.seek(0)
+    return Image(buf, width=7*inch, height=4*inch)
+
+# Logo shown at the top right of every PDF report page
+REPORT_LOGO_PATH = os.environ.get("FEEDBACK_REPORT_LOGO", "REVA_logo.png")
+
+# Institution named at the top of every PDF report
+REPORT_INSTITUTION = os.environ.get("FEEDBACK_REPORT_INSTITUTION", "School of Computing and Information Technology")
+
+# Signature boxes at the bottom of every PDF report (comma-separated in the environment)
+REPORT_SIGNATORIES = [name.strip() for name in os.environ.get("FEEDBACK_REPORT_SIGNATORIES", "IQAC,HOD,DIRECTOR").split(",") if name.strip()]
+
+class ReportTheme:
+    """
+    Styles, logo and layout shared by every PDF report.
+
+    Building the style sheet and reading the logo happen once in the constructor,
+    so one theme serves any number of reports. get_report_theme() returns the
+    process-wide default; pass another ReportTheme to the generate_* functions to
+    change the institution, signatories or logo.
+    """
+
+    def __init__(self, institution=REPORT_INSTITUTION, signatories=REPORT_SIGNATORIES, logo_path=REPORT_LOGO_PATH, logo_size=(180, 50)):
+        self.institution = institution
+        self.signatories = list(signatories)
+        self.logo_path = logo_path
+        self.logo_size = logo_size
+        
+        # Column widths of the header block (label | gap | value) and width of the signature row
+        self.header_col_widths = [4.0*inch, 0.1*inch, 2.4*inch]
+        self.body_width = 6.0*inch
+        
+        # Column widths of the ratings tables: with distribution columns, without them, and per course question
+        self.stats_col_widths = [4.1*inch, 0.8*inch, 0.6*inch, 0.6*inch, 0.9*inch]
+        self.plain_col_widths = [5*inch, 1*inch]
+        self.course_col_widths = [3.2*inch, 0.6*inch, 0.5*inch, 0.5*inch, 0.7*inch, 1.5*inch]
+        
+        self.styles = getSampleStyleSheet()
+
+        # Create custom styles for different alignments with reduced line spacing
+        self.center = ParagraphStyle(
+            'CenterHeader',
+            parent=self.styles['Heading1'],
+            fontSize=14,
+            alignment=1,  # Center alignment
+            spaceAfter=5
+        )
+
+        self.left = ParagraphStyle(
+            'LeftAligned',
+            parent=self.styles['Normal'],
+            fontSize=12,
+            alignment=0,  # Left alignment
+            spaceBefore=2,  # Reduced from 5
+            spaceAfter=2,   # Reduced from 5
+            leading=14      # Control line height
+        )
+
+        self.right = ParagraphStyle(
+            'RightAligned',
+            parent=self.styles['Normal'],
+            fontSize=12,
+            alignment=2,  # Right alignment
+            spaceBefore=2,  # Reduced from 5
+            spaceAfter=2,   # Reduced from 5
+            leading=14      # Control line height
+        )
+
+        self.header_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  # Changed from TOP to MIDDLE
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),     # Reduced from 0
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),  # Reduced from 0
+        ])
+
+        # Style the ratings table with word wrap and vertical alignment
+        self.ratings_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),    
+            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),  
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BOX', (0, 0), (-1, -1), 2, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('WORDWRAP', (0, 0), (-1, -1), True),  
+        ])
+
+        self.footer_table_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 30),  # Space for signature
+        ])
+
+        # Entries on the contents page of combined reports
+        self.contents_style = ParagraphStyle('ContentsEntry', parent=self.styles['Normal'], fontSize=10, leading=13)
+
+        # Read the logo once; reports are built without it if the file is missing
+        try:
+            with open(logo_path, "rb") as logo_file:
+                self.logo = logo_file.read()
+        except (OSError, TypeError):
+            self.logo = None
+
+    def logo_flowables(self):
+        """Return the right-aligned logo and the space below it, or nothing without a logo"""
+        if self.logo is None:
+            return []
+        logo = Image(io.BytesIO(self.logo), width=self.logo_size[0], height=self.logo_size[1])
+        logo.hAlign = 'RIGHT'
+        return [logo, Spacer(1, 10)]
+
+    def header_table(self, data):
+        """Return the header block table for rows of (label, gap, value) cells"""
+        table = Table(data, colWidths=self.header_col_widths, rowHeights=[18]*len(data))
+        table.setStyle(self.header_table_style)
+        return table
+
+    def footer_table(self):
+        """Return the row of signature boxes"""
+        if not self.signatories:
+            return Spacer(1, 0)
+        width = self.body_width / len(self.signatories)
+        table = Table([self.signatories], colWidths=[width] * len(self.signatories))
+        table.setStyle(self.footer_table_style)
+        return table
+
+_report_theme = None
+_report_theme_lock = threading.Lock()
+
+# Function to get the process-wide report theme
+def get_report_theme():
+    """Return the shared default ReportTheme, building it on first use"""
+    global _report_theme
+    with _report_theme_lock:
+        if _report_theme is None:
+            _report_theme = ReportTheme()
+        return _report_theme
+
+# Function to create a PDF document with the report page layout
+def create_report_document(pdf_buffer, doc_class=SimpleDocTemplate):
+    """Create a Letter-size document with reduced margins"""
+    return doc_class(
+        pdf_buffer,
+        pagesize=letter,
+        rightMargin=36,  # 0.5 inch
+        leftMargin=36,   # 0.5 inch
+        topMargin=36,    # 0.5 inch
+        bottomMargin=36  # 0.5 inch
+    )
+
+# Function to build the flowables of one faculty report
+def build_report_elements(faculty_data, course_name, context, themes, report_theme):
+    """Return the ReportLab flowables of one faculty report, with header details from context, styled by report_theme"""
+    faculty_name = faculty_data["Faculty Name"].iloc[0]
+    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+    styles = report_theme.styles
+    center_style = report_theme.center
+    left_style = report_theme.left
+    right_style = report_theme.right
+    elements = report_theme.logo_flowables()
+    
+    # Clean course name for display
+    clean_course_name = course_name.replace("Feedback on ", "").strip()
+    
+    # CENTER ALIGNED HEADERS
+    # Add centered headers
+    elements.append(Paragraph(report_theme.institution, center_style))
+    elements.append(Paragraph(f"Academic Year {context.academic_year}", center_style))
+    elements.append(Paragraph(f"Feedback on {clean_course_name}", center_style))
+    
+    # Add program name if available
+    if context.program:
+        elements.append(Paragraph(f"{context.program_name}", center_style))
+    
+    elements.append(Spacer(1, 10))
+    
+    # Create a table for the 3-column layout with tighter spacing
+    data = []
+    
+    # Row 1: Faculty name | Empty | Semester
+    row1 = [
+        Paragraph(f"Name of the Faculty: {faculty_name}", left_style),
+        "",
+        Paragraph(f"Semester: {context.semester}" if context.semester else "", right_style)
+    ]
+    data.append(row1)
+    
+    # Row 2: Course name | Empty | Section
+    row2 = [
+        Paragraph(f"Course name: {clean_course_name}", left_style),
+        "",
+        Paragraph(f"Section: {section}" if section else "", right_style)
+    ]
+    data.append(row2)
+    
+    # Row 3: Course code | Empty | Empty
+    course_code = context.course_code(clean_course_name)
+    if course_code:
+        row3 = [
+            Paragraph(f"Course Code: {course_code}", left_style),
+            "",
+            ""
+        ]
+        data.append(row3)
+    
+    # Create the table with further adjusted column widths - minimize center gap
+    elements.append(report_theme.header_table(data))
+    
+    elements.append(Spacer(1, 20))
+    
+    # Overall score by the context's score method
+    overall = context.overall_rating(faculty_data)
+    elements.append(Paragraph(f"{context.score_label}: {overall:.2f} / 5.0", styles['Heading3']))
+    elements.append(Spacer(1, 20))
+    
+    # Prepare table data, adding distribution columns when the data carries them
+    sorted_data = faculty_data.sort_values(by="Rating", ascending=False)
+    has_stats = all(col in faculty_data.columns for col in ["Count", "Std", "CI"])
+    if has_stats:
+        table_data = [["Rating Category", "Score", "N", "SD", "95% CI"]]  # Header row
+        col_widths = report_theme.stats_col_widths
+        wrap_length = 58
+    else:
+        table_data = [["Rating Category", "Score"]]  # Header row
+        col_widths = report_theme.plain_col_widths
+        wrap_length = 70
+    
+    for _, row in sorted_data.iterrows():
+        # Split long category names into multiple lines
+        category = row["Rating Category"].title()
+        if len(category) > wrap_length:
+            # Split at space nearest to middle
+            mid = category[:wrap_length].rfind(' ')
+            if mid == -1:  # No space found, force split
+                mid = wrap_length
+            category = category[:mid] + '\n' + category[mid:].strip()
+        
+        table_row = [category, f"{row['Rating']:.2f}"]
+        if has_stats:
+            table_row += [
+                f"{int(row['Count'])}",
+                f"{row['Std']:.2f}" if pd.notna(row['Std']) else "-",
+                f"±{row['CI']:.2f}" if pd.notna(row['CI']) else "-"
+            ]
+        table_data.append(table_row)
+    
+    # Create table with increased width and automatic word wrapping
+    table = Table(table_data, colWidths=col_widths)
+    table.setStyle(report_theme.ratings_table_style)
+    elements.append(table)
+    
+    # Add recurring themes from student comments
+    if themes is not None and not themes.empty:
+        elements.append(Spacer(1, 15))
+        elements.append(Paragraph("Recurring Comment Themes", styles['Heading3']))
+        theme_text = ", ".join(f"{row['Theme']} ({row['Mentions']})" for _, row in themes.iterrows())
+        elements.append(Paragraph(theme_text, left_style))
+    
+    elements.append(Spacer(1, 30))
+
+    # Create and add bar chart with increased height
+    fig = Figure(figsize=(10, 8))  # Increased height from 6 to 8
+    ax = fig.subplots()
+    bars = ax.bar(faculty_data["Rating Category"], faculty_data["Rating"], color="skyblue", width=0.4,  # Reduced width for taller appearance
+                  yerr=faculty_data["CI"].fillna(0) if "CI" in faculty_data.columns else None, capsize=3)
+    ax.set_title(f"Ratings Distribution", fontsize=12)
+    ax.set_xlabel("Rating Category", fontsize=10)
+    ax.set_ylabel("Rating", fontsize=10)
+    ax.set_ylim(0, 5.5)  # Set y-axis limit to make bars appear taller
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.2f}',
+                ha='center', va='bottom')
+    
+    fig.tight_layout()
+    
+    # Convert figure to ReportLab Image with increased height
+    chart_img = fig_to_image(fig)
+    chart_img.hAlign = 'CENTER'
+    chart_img._height = 5*inch  # Increase image height in the PDF
+    elements.append(chart_img)
+    
+    # Add a spacer that will push the footer towards the bottom of the page
+    elements.append(Spacer(1, 1.5*inch))  # Add extra space to push footer down
+    
+    # Add footer signatures
+    elements.append(report_theme.footer_table())
+    
+    return elements
+
+# Function to generate the PDF report of one faculty
+def generate_pdf_report(faculty_data, course_name, context, themes=None, report_theme=None):
+    """Generate a PDF report with ratings in table format and recurring comment themes if given (default theme unless report_theme is passed)"""
+    # Create buffer for PDF with reduced margins
+    pdf_buffer = io.BytesIO()
+    doc = create_report_document(pdf_buffer)
+    
+    # Build PDF
+    doc.build(build_report_elements(faculty_data, course_name, context, themes, report_theme or get_report_theme()))
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+# Function to generate a horizontal bar chart of course feedback means
+def generate_course_chart(rows, label_column, title, scale):
+    """Generate a horizontal bar chart of mean course feedback with 95% CI error bars"""
+    labels = [shorten_label(label, 60) for label in rows[label_column]]
+    fig = Figure(figsize=(10, max(3, 0.45 * len(rows) + 1.5)))
+    ax = fig.subplots()
+    xerr = rows["CI"].fillna(0) if "CI" in rows.columns else None
+    bars = ax.barh(labels, rows["Rating"], color="mediumseagreen", xerr=xerr, capsize=3)
+    ax.invert_yaxis()  # Keep the table order from top to bottom
+    
+    ax.set_title(title, fontsize=12)
+    ax.set_xlabel(f"Average Rating (1-{scale})", fontsize=10)
+    ax.set_xlim(0, scale + 0.5)
+    
+    # Add the mean and response count next to each bar
+    offsets = xerr if xerr is not None else [0] * len(rows)
+    for bar, rating, count, offset in zip(bars, rows["Rating"], rows["Count"], offsets):
+        ax.text(bar.get_width() + offset + 0.03, bar.get_y() + bar.get_height() / 2,
+                f"{rating:.2f} (n={int(count)})", va="center", fontsize=8)
+    
+    fig.tight_layout()
+    return fig
+
+# Function to build the flowables of one course feedback page
+def build_course_report_elements(question_rows, course_name, scale, context, report_theme):
+    """Return the ReportLab flowables of one course feedback report page"""
+    styles = report_theme.styles
+    center_style = report_theme.center
+    left_style = report_theme.left
+    right_style = report_theme.right
+    elements = report_theme.logo_flowables()
+    
+    clean_course_name = course_name.replace("Feedback on ", "").strip()
+    elements.append(Paragraph(report_theme.institution, center_style))
+    elements.append(Paragraph(f"Academic Year {context.academic_year}", center_style))
+    elements.append(Paragraph(f"Course Feedback on {clean_course_name}", center_style))
+    if context.program:
+        elements.append(Paragraph(context.program_name, center_style))
+    elements.append(Spacer(1, 10))
+    
+    # Course name | Empty | Semester, then the course code if known
+    course_code = context.course_code(clean_course_name)
+    data = [[
+        Paragraph(f"Course name: {clean_course_name}", left_style),
+        "",
+        Paragraph(f"Semester: {context.semester}" if context.semester else "", right_style)
+    ]]
+    if course_code:
+        data.append([Paragraph(f"Course Code: {course_code}", left_style), "", ""])
+    elements.append(report_theme.header_table(data))
+    elements.append(Spacer(1, 20))
+    
+    # Overall mean over every answer to every question
+    overall = question_rows["Sum"].sum() / question_rows["Count"].sum()
+    students = int(question_rows["Count"].max())
+    elements.append(Paragraph(f"Overall Average: {overall:.2f} / {scale}.0 ({students} students)", styles['Heading3']))
+    elements.append(Spacer(1, 15))
+    
+    table_data = [["Question", "Score", "N", "SD", "95% CI", "Answers"]]
+    for _, row in question_rows.iterrows():
+        table_data.append([
+            Paragraph(row["Question"], styles['Normal']),
+            f"{row['Rating']:.2f}",
+            f"{int(row['Count'])}",
+            f"{row['Std']:.2f}" if pd.notna(row['Std']) else "-",
+            f"±{row['CI']:.2f}" if pd.notna(row['CI']) else "-",
+            " ".join(f"{value}:{int(row[column])}" for value, column in enumerate(HISTOGRAM_COLUMNS[:scale], 1))
+        ])
+    table = Table(table_data, colWidths=report_theme.course_col_widths)
+    table.setStyle(report_theme.ratings_table_style)
+    elements.append(table)
+    elements.append(Spacer(1, 10))
+    
+    # Size the chart to keep its aspect ratio so the page fits on one sheet
+    chart = generate_course_chart(question_rows, "Question", "Course Feedback by Question", scale)
+    chart_img = fig_to_image(chart)
+    chart_img.drawWidth = report_theme.body_width
+    chart_img.drawHeight = chart_img.drawWidth * chart.get_figheight() / chart.get_figwidth()
+    chart_img.hAlign = 'CENTER'
+    elements.append(chart_img)
+    
+    elements.append(report_theme.footer_table())
+    return elements
+
+# Function to generate the course feedback PDF of one or more courses
+def generate_course_pdf_report(course_cube, courses, context, report_theme=None):
+    """Generate a PDF with one course feedback page per course, in the given order"""
+    report_theme = report_theme or get_report_theme()
+    scale = rating_scale(course_cube)
+    elements = []
+    for course in courses:
+        if elements:
+            elements.append(PageBreak())
+        question_rows = course_cube[course_cube["Course"] == course].sort_values("Rating", ascending=False)
+        elements.extend(build_course_report_elements(question_rows, course, scale, context, report_theme))
+    
+    pdf_buffer = io.BytesIO()
+    create_report_document(pdf_buffer).build(elements)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+class CombinedReportTemplate(SimpleDocTemplate):
+    """Document template that turns report start markers into PDF bookmarks and table of contents entries"""
+
+    def afterFlowable(self, flowable):
+        title = getattr(flowable, "toc_title", None)
+        if title:
+            self.canv.bookmarkPage(flowable.toc_key)
+            self.canv.addOutlineEntry(title, flowable.toc_key, level=0, closed=True)
+            self.notify('TOCEntry', (0, title, self.page, flowable.toc_key))
+
+# Function to generate one PDF with the reports of many faculty
+def generate_combined_pdf_report(faculty_reports, context, title="Faculty Feedback Reports", report_theme=None):
+    """
+    Generate a single PDF with a table of contents, one bookmarked section per faculty and page breaks between them.
+
+    Every page shares one report theme and goes through one document build
+    (ReportLab lays the story out a second time to fill in the contents page numbers).
+
+    Parameters:
+    - faculty_reports: Iterable of (faculty_data, course_name, themes) tuples, one per report
+    - context: ReportContext with the academic year, program, semester and course codes
+    - title: Heading of the contents page
+    - report_theme: ReportTheme to use (defaults to get_report_theme())
+
+    Returns:
+    - BytesIO with the PDF
+    """
+    report_theme = report_theme or get_report_theme()
+    
+    contents = TableOfContents()
+    contents.levelStyles = [report_theme.contents_style]
+    elements = [Paragraph(title, report_theme.center), Spacer(1, 20), contents]
+    
+    for number, (faculty_data, course_name, themes) in enumerate(faculty_reports, 1):
+        faculty_name = faculty_data["Faculty Name"].iloc[0]
+        section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+        course = course_name.replace("Feedback on ", "").strip()
+        
+        # Zero-height marker at the top of each report for the bookmark and contents entry
+        marker = Spacer(1, 0)
+        marker.toc_title = f"Section {section} - {faculty_name} ({course})" if section else f"{faculty_name} ({course})"
+        marker.toc_key = f"report-{number}"
+        
+        elements.append(PageBreak())
+        elements.append(marker)
+        elements.extend(build_report_elements(faculty_data, course_name, context, themes, report_theme))
+    
+    pdf_buffer = io.BytesIO()
+    doc = create_report_document(pdf_buffer, CombinedReportTemplate)
+    doc.multiBuild(elements)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+# Function to generate table visualization for faculty
+def generate_table_visualization(faculty_data):
+    """Generate a table visualization of faculty ratings as a figure"""
+    if faculty_data.empty:
+        return None
+    
+    faculty_name = faculty_data["Faculty Name"].iloc[0]
+    
+    # Calculate total average
+    total_avg = faculty_data['Rating'].mean().round(4)
+    
+    # Create new row for total average
+    new_row = pd.DataFrame({
+        'Faculty Name': [faculty_name],
+        'Rating Category': ['Total Average'],
+        'Rating': [total_avg]
+    })
+    
+    # Append new row to faculty data
+    viz_data = pd.concat([faculty_data, new_row], ignore_index=True)
+    
+    # Prepare data for table, including response counts when available
+    if 'Count' in faculty_data.columns:
+        viz_data.loc[viz_data.index[-1], 'Count'] = faculty_data['Count'].max()
+        headers = ['Rating Category', 'Average Rating', 'Responses']
+        data = [[category, rating, int(count)] for category, rating, count in viz_data[['Rating Category', 'Rating', 'Count']].values]
+        col_widths = [0.6, 0.22, 0.18]
+    else:
+        headers = ['Rating Category', 'Average Rating']
+        data = viz_data[['Rating Category', 'Rating']].values.tolist()
+        col_widths = [0.7, 0.3]
+    
+    # Create figure and axis outside pyplot so it is released once rendered
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.axis('off')  # Hide axes
+    
+    # Add title
+    ax.set_title(f"Ratings for {faculty_name}", fontsize=14, pad=20)
+    
+    # Create table
+    table = ax.table(
+        cellText=data,
+        colLabels=headers,
+        loc='center',
+        cellLoc='left',
+        colWidths=col_widths
+    )
+    
+    # Set font size and padding
+    table.auto_set_font_size(False)
+    table.set_fontsize(12)
+    table.scale(1, 1.5)
+    
+    fig.tight_layout()
+    return fig
+
+# Function to generate bar chart visualization for faculty
+def generate_bar_chart(avg_ratings, title):
+    """Generate a bar chart of average ratings by category as a figure"""
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    # Show the 95% confidence interval as error bars when available
+    yerr = avg_ratings["CI"].fillna(0) if "CI" in avg_ratings.columns else None
+    bars = ax.bar(avg_ratings["Rating Category"], avg_ratings["Rating"], color="skyblue", width=0.6, yerr=yerr, capsize=4)
+    
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel("Rating Category", fontsize=12)
+    ax.set_ylabel("Average Rating (1-5)", fontsize=12)
+    ax.set_ylim(0, 5.5)  # Keep the same y-limit
+    ax.tick_params(axis="x", labelrotation=45, labelsize=10)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    
+    # Add labels on bars, with the response count when available
+    counts = avg_ratings["Count"] if "Count" in avg_ratings.columns else [None] * len(avg_ratings)
+    offsets = yerr if yerr is not None else [0] * len(avg_ratings)
+    for bar, rating, count, offset in zip(bars, avg_ratings["Rating"], counts, offsets):
+        label = f"{rating:.2f}" if count is None else f"{rating:.2f}\nn={int(count)}"
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + offset, label, ha="center", va="bottom", fontsize=10)
+    
+    fig.tight_layout()
+    return fig
+
+# Function to render a figure to PNG bytes
+def render_figure_png(fig, dpi=EXPORT_DPI):
+    """Render a Matplotlib figure to PNG bytes"""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    return buf.getvalue()
+
+# Function to render chart or table images for the selected faculty
+def render_ratings_image(avg_ratings, title, viz_type, dpi=EXPORT_DPI):
+    """Render the bar chart or table visualization of ratings to PNG bytes"""
+    if viz_type == "Bar Chart":
+        fig = generate_bar_chart(avg_ratings, title)
+    else:
+        fig = generate_table_visualization(avg_ratings)
+        if fig is None:
+            return None
+    return render_figure_png(fig, dpi)
+
+# Function to render every artifact of one faculty report
+def render_faculty_artifacts(faculty_data, course_name, context, themes=None, report_theme=None):
+    """
+    Render the PDF report, text report and bar chart of one faculty.
+
+    A module-level function of picklable arguments, so it can run in a process pool.
+
+    Returns:
+    - Dict with 'pdf' (bytes), 'text' (str) and 'chart' (PNG bytes)
+    """
+    faculty = faculty_data["Faculty Name"].iloc[0]
+    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+    title = f"📈 Average Ratings for Section {section} - {faculty}" if section else f"📈 Average Ratings for {faculty}"
+    return {
+        "pdf": generate_pdf_report(faculty_data, course_name, context, themes, report_theme).getvalue(),
+        "text": generate_faculty_report(faculty_data, themes, context),
+        "chart": render_ratings_image(faculty_data, title, "Bar Chart")
+    }
+
+# Function to shorten long axis labels for matrix views
+def shorten_label(label, max_length=40):
+    """Truncate a label to max_length characters for compact axis ticks"""
+    label = str(label)
+    return label if len(label) <= max_length else label[:max_length - 3].rstrip() + "..."
+
+# Function to generate a heatmap of a ratings matrix
+def generate_heatmap(pivot, title):
+    """Generate a heatmap figure of a ratings matrix (rows × columns of mean ratings)"""
+    n_rows, n_cols = pivot.shape
+    fig = Figure(figsize=(max(8, 0.5 * n_cols + 4), max(4, 0.35 * n_rows + 2)))
+    ax = fig.subplots()
+    
+    image = ax.imshow(np.ma.masked_invalid(pivot.to_numpy(dtype=float)), cmap="RdYlGn", vmin=1, vmax=5, aspect="auto")
+    ax.set_title(title, fontsize=14)
+    ax.set_xticks(range(n_cols))
+    ax.set_xticklabels([shorten_label(col) for col in pivot.columns], rotation=45, ha="right", fontsize=8)
+    ax.set_yticks(range(n_rows))
+    ax.set_yticklabels([shorten_label(row) for row in pivot.index], fontsize=8)
+    
+    # Annotate cells only while the matrix is small enough to stay readable
+    if n_rows * n_cols <= 600:
+        for (row, col), value in np.ndenumerate(pivot.to_numpy(dtype=float)):
+            if not np.isnan(value):
+                ax.text(col, row, f"{value:.1f}", ha="center", va="center", fontsize=7)
+    
+    fig.colorbar(image, ax=ax, label="Average Rating (1-5)")
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,312 @@
+import hashlib
+import importlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from dataset_cache import ResultCache, content_hash
+from dataset_registry import get_dataset_registry
+from rating_stats import rollup_rating_cube
+from report_content import department_report_pages, generate_faculty_report
+
+# Local HTTP service that serves the dashboard's per-faculty reports to other tools.
+# Datasets are loaded once at startup; responses are rendered with the same generators
+# as the dashboard and kept in an LRU cache, and every response carries an ETag.
+#
+#   GET /datasets                                    datasets being served
+#   GET /datasets/<id>/faculty                       faculty (and sections) with their links
+#   GET /datasets/<id>/averages.json                 averages of every faculty and category
+#   GET /datasets/<id>/faculty/<name>/report.pdf     PDF report        (?section=A, or ?section= for none)
+#   GET /datasets/<id>/faculty/<name>/report.txt     text report       (?section=A)
+#   GET /datasets/<id>/faculty/<name>/chart.png      chart or table    (?section=A&view=table)
+#   GET /datasets/<id>/faculty/<name>/averages.json  category averages (?section=A)
+
+# Address the service listens on; local only unless overridden
+SERVICE_HOST = os.environ.get("FEEDBACK_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("FEEDBACK_SERVICE_PORT", 8600))
+
+# Threads answering requests at the same time
+SERVICE_WORKERS = int(os.environ.get("FEEDBACK_SERVICE_WORKERS", min(8, (os.cpu_count() or 1) + 2)))
+
+# Rendered responses kept in memory, least recently used dropped first
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("FEEDBACK_SERVICE_CACHE_ENTRIES", 256))
+
+# Optional directory where processed datasets are pickled, so a restart skips processing
+DATASET_STORE_DIR = os.environ.get("FEEDBACK_DATASET_STORE_DIR")
+
+# Content type of each per-faculty resource
+FACULTY_RESOURCES = {
+    "report.pdf": "application/pdf",
+    "report.txt": "text/plain; charset=utf-8",
+    "chart.png": "image/png",
+    "averages.json": "application/json"
+}
+
+# Chart views accepted by chart.png, mapped to the dashboard's visualization types
+CHART_VIEWS = {"chart": "Bar Chart", "table": "Table"}
+
+class ServiceError(Exception):
+    """A request the service cannot answer, with the HTTP status to answer it with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ReportService:
+    """
+    Datasets being served plus the response cache; answers requests without any HTTP plumbing.
+
+    Responses are cached and tagged by dataset hash, report header details, resource and
+    parameters. Reports print the date they were generated, so the date is part of the key too.
+    """
+
+    def __init__(self, cache_entries=RESPONSE_CACHE_ENTRIES, store_dir=DATASET_STORE_DIR):
+        self.datasets = {}
+        self.responses = ResultCache(max_entries=cache_entries)
+        self.store = ResultCache(max_entries=8, cache_dir=store_dir)
+        self._lock = threading.Lock()
+
+    def add_dataset(self, name, kind, contents, build, make_context):
+        """
+        Load a dataset from the store, or build and store it, and serve it.
+
+        Parameters:
+        - name: Label shown in the dataset list, e.g. the export's file name
+        - kind: 'raw' or 'processed', kept apart in the store
+        - contents: Bytes of the file(s) the dataset comes from, hashed into its id
+        - build: Function returning the dataset's tables when the store does not have them
+        - make_context: Function of the tables returning the ReportContext for the report headers
+
+        Returns:
+        - The dataset id used in URLs
+        """
+        digest = content_hash(*contents)
+        tables = self.store.get_or_compute((kind, digest), build)
+        handle = get_dataset_registry().register(("service", kind, digest), tables)
+        context = make_context(tables)
+        dataset_id = f"{kind[0]}{digest[:11]}"
+        with self._lock:
+            self.datasets[dataset_id] = {"name": name, "digest": digest, "handle": handle, "context": context, "pages": None}
+        return dataset_id
+
+    def _dataset(self, dataset_id):
+        with self._lock:
+            dataset = self.datasets.get(dataset_id)
+        if dataset is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown dataset '{dataset_id}'")
+        return dataset
+
+    def _pages(self, dataset):
+        """Return {(section, faculty): (faculty_data, course_name, themes)}, rolled up once per dataset"""
+        with self._lock:
+            if dataset["pages"] is None:
+                handle = dataset["handle"]
+                dataset["pages"] = {}
+                for faculty_data, course_name, themes in department_report_pages(
+                    handle.rating_cube, handle.comments_df, responses_known=handle.responses_known is not False,
+                    dataset_key=handle.key
+                ):
+                    section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+                    dataset["pages"][(str(section), faculty_data["Faculty Name"].iloc[0])] = (faculty_data, course_name, themes)
+            return dataset["pages"]
+
+    def _faculty_page(self, dataset, faculty, section):
+        pages = self._pages(dataset)
+        sections = sorted(key_section for key_section, name in pages if name == faculty)
+        if not sections:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No faculty named '{faculty}' in this dataset")
+        if section is None:
+            if len(sections) > 1:
+                listed = ", ".join(key_section or "(none)" for key_section in sections)
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"'{faculty}' has ratings in sections {listed}; add ?section=")
+            section = sections[0]
+        if (section, faculty) not in pages:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"'{faculty}' has no section '{section}'")
+        return pages[(section, faculty)]
+
+    def etag(self, key):
+        """Return the ETag of a cache key"""
+        return '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + '"'
+
+    def resolve(self, path, query):
+        """
+        Work out which response a request asks for, without rendering it.
+
+        Parameters:
+        - path: URL path with each part percent-encoded (names may contain "/"), e.g. '/datasets/r1a2b3c/faculty/Dr.%20Smith/report.pdf'
+        - query: Dict of query parameter -> value
+
+        Returns:
+        - Tuple (key, content_type, render): the cache key, the content type and a function returning the body bytes
+
+        Raises:
+        - ServiceError for unknown datasets, faculty or resources and invalid parameters
+        """
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["datasets"]:
+            with self._lock:
+                digests = tuple(sorted(dataset["digest"] for dataset in self.datasets.values()))
+            return ("datasets", digests), "application/json", self._list_datasets
+        if len(parts) < 3 or parts[0] != "datasets":
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No such resource '{path}'")
+
+        dataset = self._dataset(parts[1])
+        # Header details such as the academic year change the reports too
+        base = (dataset["digest"], repr(sorted(vars(dataset["context"]).items())), date.today().isoformat())
+        if parts[2:] == ["faculty"]:
+            return base + ("faculty",), "application/json", lambda: self._list_faculty(parts[1], dataset)
+        if parts[2:] == ["averages.json"]:
+            return base + ("averages",), "application/json", lambda: _json_bytes(_records(self._averages(dataset)))
+        if len(parts) != 5 or parts[2] != "faculty" or parts[4] not in FACULTY_RESOURCES:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No such resource '{path}'")
+
+        faculty, resource = parts[3], parts[4]
+        page = self._faculty_page(dataset, faculty, query.get("section"))
+        section = page[0]["Section"].iloc[0] if "Section" in page[0].columns else ""
+        view = query.get("view", "chart") if resource == "chart.png" else None
+        if view is not None and view not in CHART_VIEWS:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"Unknown view '{view}'; use one of: {', '.join(CHART_VIEWS)}")
+        key = base + (resource, str(section), faculty, view)
+        return key, FACULTY_RESOURCES[resource], lambda: self._render(dataset, page, resource, view)
+
+    def _list_datasets(self):
+        with self._lock:
+            datasets = list(self.datasets.items())
+        return _json_bytes([
+            {"id": dataset_id, "name": dataset["name"], "program": dataset["context"].program,
+             "semester": dataset["context"].semester, "academic_year": dataset["context"].academic_year,
+             "faculty": len(self._pages(dataset))}
+            for dataset_id, dataset in datasets
+        ])
+
+    def _list_faculty(self, dataset_id, dataset):
+        rows = []
+        for (section, faculty), (faculty_data, course_name, _) in self._pages(dataset).items():
+            # The section is always given, since a faculty may also have ratings without one
+            link = f"/datasets/{dataset_id}/faculty/{quote(faculty, safe='')}"
+            suffix = f"?section={quote(section, safe='')}"
+            rows.append({
+                "faculty": faculty, "section": section, "course": str(course_name).replace("Feedback on ", "").strip(),
+                "overall": float(dataset["context"].overall_rating(faculty_data)),
+                "links": {resource: f"{link}/{resource}{suffix}" for resource in FACULTY_RESOURCES}
+            })
+        return _json_bytes(rows)
+
+    def _averages(self, dataset):
+        rating_cube = dataset["handle"].rating_cube
+        keys = [key for key in ["Section", "Faculty Name"] if key in rating_cube.columns]
+        return rollup_rating_cube(rating_cube, keys + ["Rating Category"])
+
+    def _render(self, dataset, page, resource, view):
+        """Render one faculty resource with the dashboard's generators"""
+        faculty_data, course_name, themes = page
+        if resource == "report.txt":
+            return generate_faculty_report(faculty_data, themes, dataset["context"]).encode("utf-8")
+        if resource == "averages.json":
+            return _json_bytes({
+                "faculty": faculty_data["Faculty Name"].iloc[0],
+                "section": str(faculty_data["Section"].iloc[0]) if "Section" in faculty_data.columns else "",
+                "course": str(course_name).replace("Feedback on ", "").strip(),
+                "overall": float(dataset["context"].overall_rating(faculty_data)),
+                "score_method": dataset["context"].score_method,
+                "categories": _records(faculty_data)
+            })
+
+        # Matplotlib and ReportLab are only loaded once a PDF or chart is asked for
+        rendering = importlib.import_module("report_rendering")
+        if resource == "report.pdf":
+            return rendering.generate_pdf_report(faculty_data, course_name, dataset["context"], themes).getvalue()
+        faculty = faculty_data["Faculty Name"].iloc[0]
+        section = faculty_data["Section"].iloc[0] if "Section" in faculty_data.columns else ""
+        title = f"📈 Average Ratings for Section {section} - {faculty}" if section else f"📈 Average Ratings for {faculty}"
+        image = rendering.render_ratings_image(faculty_data, title, CHART_VIEWS[view])
+        if image is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No ratings to draw for '{faculty}'")
+        return image
+
+# Function to turn a DataFrame into JSON-ready records
+def _records(df):
+    # to_json converts NumPy scalars and missing values, which json.dumps cannot
+    return json.loads(df.to_json(orient="records"))
+
+# Function to encode a JSON response body
+def _json_bytes(value):
+    return json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8")
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET requests from the server's ReportService, with ETag revalidation"""
+
+    server_version = "FeedbackReportService/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        service = self.server.service
+        try:
+            key, content_type, render = service.resolve(url.path, query)
+            etag = service.etag(key)
+            # The ETag depends only on the request, so a revalidation is answered without rendering
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body = service.responses.get_or_compute(key, render)
+        except ServiceError as error:
+            self._send(error.status, _json_bytes({"error": str(error)}), "application/json")
+            return
+        except Exception as error:
+            self.log_error("Failed to answer %s: %r", self.path, error)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, _json_bytes({"error": str(error)}), "application/json")
+            return
+        self._send(HTTPStatus.OK, body, content_type, etag)
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that answers each connection on a fixed pool of worker threads"""
+
+    def __init__(self, address, service, workers=SERVICE_WORKERS):
+        super().__init__(address, ReportRequestHandler)
+        self.service = service
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-service")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+# Function to run the service until interrupted
+def serve(service, host=SERVICE_HOST, port=SERVICE_PORT, workers=SERVICE_WORKERS):
+    """Serve the service's datasets over HTTP until Ctrl+C"""
+    server = PooledHTTPServer((host, port), service, workers)
+    print(f"Serving {len(service.datasets)} datasets on http://{host}:{server.server_port}/datasets")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
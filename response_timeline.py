@@ -0,0 +1,104 @@
+import pandas as pd
+
+# Running averages within this distance of the final average count as settled
+SETTLE_TOLERANCE = 0.05
+
+# Period lengths offered for the timeline
+TIMELINE_FREQUENCIES = {"Day": "D", "Week": "W-MON"}
+
+# Group column used when the timeline is not split
+OVERALL_GROUP = "Overall"
+
+# Function to add a completion period column
+def add_period(frame, freq="D"):
+    """Add a 'Period' column with the start of the day/week in which 'Completed' falls"""
+    timed = frame.dropna(subset=["Completed"])
+    return timed.assign(Period=timed["Completed"].dt.to_period(freq).dt.start_time)
+
+# Function to make sure there is a column to group the timeline by
+def with_group(frame, group_key=None):
+    """Return (frame, key), adding a constant 'Overall' column when no group key is given"""
+    if group_key:
+        return frame, group_key
+    return frame.assign(**{OVERALL_GROUP: "All Responses"}), OVERALL_GROUP
+
+# Function to count submissions over time
+def submission_timeline(submissions, group_key=None, freq="D", ratings_df=None):
+    """
+    Count completed submissions per period and their running total.
+
+    Parameters:
+    - submissions: DataFrame with 'SRN', 'Completed' and optionally the group_key column
+    - group_key: Optional column to split the counts by (e.g. 'Section' or 'Course')
+    - freq: Pandas period frequency ('D' for days, 'W-MON' for weeks)
+    - ratings_df: Long ratings to take the group_key from when submissions lack it;
+      a student then counts once for every section or course they rated
+
+    Returns:
+    - DataFrame with the group column, 'Period', 'Submissions' and 'Cumulative'
+    """
+    if group_key and group_key not in submissions.columns and ratings_df is not None:
+        groups = ratings_df[["SRN", group_key]].drop_duplicates()
+        submissions = groups.merge(submissions[["SRN", "Completed"]], on="SRN", how="inner")
+    timed, key = with_group(add_period(submissions, freq), group_key)
+    counts = timed.groupby([key, "Period"], sort=True, dropna=False).size().reset_index(name="Submissions")
+    counts["Cumulative"] = counts.groupby(key, sort=False, dropna=False)["Submissions"].cumsum()
+    return counts
+
+# Function to compute how average ratings drift as responses arrive
+def rating_drift(ratings_df, submissions, group_key=None, freq="D", tolerance=SETTLE_TOLERANCE):
+    """
+    Compute the running average rating per period and its distance from the final average.
+
+    Sums and counts are aggregated once per (group, period) and accumulated with a
+    grouped cumulative sum, so no period is re-filtered.
+
+    Parameters:
+    - ratings_df: Long ratings with 'SRN', 'Rating' and the group_key column
+    - submissions: DataFrame with one row per submission: 'SRN' and 'Completed'
+    - group_key: Optional column to split by (e.g. 'Section' or 'Course')
+    - freq: Pandas period frequency
+    - tolerance: Deviation from the final average that counts as settled
+
+    Returns:
+    - Tuple (drift, settled):
+      drift has the group column, 'Period', 'Responses', 'Students', 'Running Average',
+      'Final Average' and 'Deviation';
+      settled has one row per group with 'Final Average', 'Students' and 'Settled On',
+      the first period after which the running average stays within tolerance
+    """
+    # Look up each rating's completion period by SRN
+    timed_submissions = add_period(submissions.drop_duplicates(subset="SRN", keep="last"), freq)
+    period_by_srn = pd.Series(timed_submissions["Period"].to_numpy(), index=timed_submissions["SRN"].astype(str).to_numpy())
+    ratings = ratings_df.dropna(subset=["Rating"])
+    ratings = ratings.assign(Period=ratings["SRN"].astype(str).map(period_by_srn)).dropna(subset=["Period"])
+    ratings, key = with_group(ratings, group_key)
+
+    per_period = ratings.groupby([key, "Period"], sort=True, dropna=False).agg(
+        Sum=("Rating", "sum"), Responses=("Rating", "size"), Students=("SRN", "nunique")
+    ).reset_index()
+
+    # Each student submits once, so per-period student counts add up
+    running = per_period.groupby(key, sort=False, dropna=False)[["Sum", "Responses", "Students"]].cumsum()
+    drift = per_period[[key, "Period"]].assign(
+        Responses=running["Responses"],
+        Students=running["Students"],
+        **{"Running Average": running["Sum"] / running["Responses"]}
+    )
+    drift["Final Average"] = drift.groupby(key, sort=False, dropna=False)["Running Average"].transform("last")
+    drift["Deviation"] = (drift["Running Average"] - drift["Final Average"]).abs()
+
+    # Settled from the first period whose deviation, and every later one, is within tolerance
+    later_max = drift.iloc[::-1].groupby(key, sort=False, dropna=False)["Deviation"].cummax().iloc[::-1]
+    settled_on = drift[later_max <= tolerance].groupby(key, sort=True, dropna=False)["Period"].first()
+    settled = drift.groupby(key, sort=True, dropna=False)[["Final Average", "Students"]].last()
+    settled["Settled On"] = settled_on
+    return drift, settled.reset_index()
+
+# Function to pivot a timeline into one column per group for charting
+def timeline_chart_data(timeline, value, group_key=None):
+    """Return a DataFrame indexed by period with one column per group, carried forward over gaps"""
+    key = group_key or OVERALL_GROUP
+    chart = timeline.pivot_table(index="Period", columns=key, values=value, aggfunc="last")
+    chart.columns = [str(column) or "(none)" for column in chart.columns]
+    return chart.ffill()